@@ -0,0 +1,329 @@
+"""Throughput and latency of every event and user route.
+
+Seeds BENCH_EVENTS events and BENCH_USERS users into the test database, then
+drives each route with BENCH_CONCURRENCY concurrent clients through the ASGI
+app and reports p50/p95/p99 latency and requests per second:
+
+    pytest benchmarks/bench_api.py -s
+
+Results are compared with the JSON baseline at BENCH_BASELINE (by default
+benchmarks/baselines/api.json) and the run fails when an endpoint's p95 grows,
+or its throughput falls, by more than BENCH_REGRESSION_THRESHOLD. A missing
+baseline is written from the current run; BENCH_UPDATE_BASELINE=1 rewrites it.
+Baselines are only comparable on the machine that produced them, so generate
+them on the CI runner.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from auth.hash_password import get_pwd_context
+from auth.jwt_handler import create_access_token, create_feed_token
+from benchmarks.harness import (
+    drive,
+    find_regressions,
+    format_report,
+    load_baseline,
+    save_baseline,
+)
+from database.connection import (
+    get_read_session,
+    get_read_session_maker,
+    get_session,
+    get_session_maker,
+)
+from database.pagination import SyncToken, encode_sync_token
+from config import get_settings
+from main import app
+from routes.events import event_router
+from routes.users import user_router
+from tests.conftest import DATABASE_URL
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "10000"))
+USERS = int(os.getenv("BENCH_USERS", "100"))
+CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "20"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+SLOW_REQUESTS = int(os.getenv("BENCH_SLOW_REQUESTS", "20"))
+BATCH = int(os.getenv("BENCH_BATCH", "100"))
+THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.25"))
+BASELINE = Path(
+    os.getenv("BENCH_BASELINE", Path(__file__).parent / "baselines" / "api.json")
+)
+UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE") == "1"
+
+BENCH_USER = "bench@server.com"
+PASSWORD = "benchpassword"
+
+SEED_EVENTS = text(
+    """
+    INSERT INTO events (creator, title, date, description, tags, location)
+    SELECT :creator,
+           'word' || (n % 997) || ' meetup',
+           timestamp '2024-01-01' + n * interval '1 hour',
+           'Agenda topic' || (n % 1999),
+           ARRAY['tag' || (n % 500)],
+           (ARRAY['Berlin', 'Paris', 'London', 'online'])[n % 4 + 1]
+    FROM generate_series(1, :count) AS n
+    RETURNING id
+    """
+)
+
+SEED_USERS = text(
+    """
+    INSERT INTO users (email, password)
+    SELECT 'bench' || n || '@server.com', :password
+    FROM generate_series(1, :count) AS n
+    UNION ALL SELECT :user, :password
+    """
+)
+
+SNAPSHOT_XMIN = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def _event(n: int) -> dict:
+    return {
+        "title": f"Bench event {n}",
+        "date": "2024-08-28T14:38:04",
+        "description": "Event description",
+        "tags": ["bench"],
+        "location": "Berlin",
+    }
+
+
+@pytest.fixture
+async def bench_client(monkeypatch):
+    # The load comes from a single client address, so rate limits would
+    # reject most of it.
+    monkeypatch.setattr(get_settings(), "rate_limit_enabled", False)
+    # Calendar feeds leave out past events, and the seeded ones lie in 2024.
+    monkeypatch.setattr(get_settings(), "event_feed_past_days", 36500)
+    # Requests run concurrently, so each one needs its own session from a pool.
+    engine = create_async_engine(
+        DATABASE_URL, pool_size=CONCURRENCY, max_overflow=CONCURRENCY
+    )
+    make_session = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async def session():
+        async with make_session() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session
+    app.dependency_overrides[get_read_session] = session
+    app.dependency_overrides[get_session_maker] = lambda: make_session
+    app.dependency_overrides[get_read_session_maker] = lambda: make_session
+    async with AsyncClient(
+        transport=ASGITransport(app), base_url="http://localhost"
+    ) as client:
+        yield client, make_session
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+async def test_api_throughput(bench_client) -> None:
+    client, make_session = bench_client
+    async with make_session() as session:
+
+        async def seed(count: int) -> list[int]:
+            result = await session.execute(
+                SEED_EVENTS, {"creator": BENCH_USER, "count": count}
+            )
+            return list(result.scalars())
+
+        event_ids = await seed(EVENTS)
+        delete_ids = await seed(REQUESTS)
+        bulk_delete_ids = await seed(SLOW_REQUESTS * BATCH)
+        await session.execute(
+            SEED_USERS,
+            {
+                "password": get_pwd_context().hash(PASSWORD),
+                "count": USERS,
+                "user": BENCH_USER,
+            },
+        )
+        await session.commit()
+        # Token of a client that has synced everything seeded so far.
+        sync_token = encode_sync_token(SyncToken(await session.scalar(SNAPSHOT_XMIN)))
+
+    auth = {"Authorization": f"Bearer {create_access_token(BENCH_USER)}"}
+    # Polls of a few feeds, so most are served from the feed cache.
+    feed_tokens = [create_feed_token(f"tag:tag{n}", BENCH_USER, 0) for n in range(10)]
+
+    scenarios = {
+        ("GET", "/event/"): (
+            REQUESTS,
+            lambda n: client.get(
+                "/event/", params={"tag": f"tag{n % 500}"}, headers=auth
+            ),
+        ),
+        ("GET", "/event/export"): (
+            SLOW_REQUESTS,
+            lambda n: client.get("/event/export", headers=auth),
+        ),
+        ("GET", "/event/search"): (
+            REQUESTS,
+            lambda n: client.get(
+                "/event/search", params={"q": f"word{n % 997}"}, headers=auth
+            ),
+        ),
+        ("GET", "/event/stats/buckets"): (
+            REQUESTS,
+            lambda n: client.get(
+                "/event/stats/buckets",
+                params={"start": "2024-01-01", "end": "2024-02-01", "unit": "week"},
+                headers=auth,
+            ),
+        ),
+        ("GET", "/event/stats/locations"): (
+            REQUESTS,
+            lambda n: client.get(
+                "/event/stats/locations",
+                params={"start": "2024-01-01", "end": "2024-02-01"},
+                headers=auth,
+            ),
+        ),
+        ("GET", "/event/stats/tags"): (
+            REQUESTS,
+            lambda n: client.get(
+                "/event/stats/tags",
+                params={"start": "2024-01-01", "end": "2024-02-01"},
+                headers=auth,
+            ),
+        ),
+        ("GET", "/event/sync"): (
+            REQUESTS,
+            lambda n: client.get(
+                "/event/sync", params={"token": sync_token}, headers=auth
+            ),
+        ),
+        ("GET", "/event/conflicts"): (
+            REQUESTS,
+            lambda n: client.get(
+                "/event/conflicts",
+                params={
+                    "location": "Berlin",
+                    "start": f"2024-01-{n % 28 + 1:02d}T10:00:00",
+                    "end": f"2024-01-{n % 28 + 1:02d}T14:00:00",
+                },
+                headers=auth,
+            ),
+        ),
+        ("GET", "/event/feed/{kind}/{value}/token"): (
+            REQUESTS,
+            lambda n: client.get(f"/event/feed/tag/tag{n % 500}/token", headers=auth),
+        ),
+        ("GET", "/event/feed/{kind}/{value}.ics"): (
+            REQUESTS,
+            lambda n: client.get(
+                f"/event/feed/tag/tag{n % 10}.ics",
+                params={"token": feed_tokens[n % 10]},
+            ),
+        ),
+        # Other users revoke theirs, so the feed tokens above keep working.
+        ("POST", "/event/feed/revoke"): (
+            SLOW_REQUESTS,
+            lambda n: client.post(
+                "/event/feed/revoke",
+                headers={
+                    "Authorization": "Bearer "
+                    + create_access_token(f"bench{n % USERS + 1}@server.com")
+                },
+            ),
+        ),
+        ("GET", "/event/{id}"): (
+            REQUESTS,
+            lambda n: client.get(
+                f"/event/{event_ids[n % len(event_ids)]}", headers=auth
+            ),
+        ),
+        ("POST", "/event/new"): (
+            REQUESTS,
+            lambda n: client.post("/event/new", json=_event(n), headers=auth),
+        ),
+        ("PATCH", "/event/edit/{id}"): (
+            REQUESTS,
+            lambda n: client.patch(
+                f"/event/edit/{event_ids[n % len(event_ids)]}",
+                json={"title": f"Edited {n}"},
+                headers=auth,
+            ),
+        ),
+        ("DELETE", "/event/delete/{id}"): (
+            REQUESTS,
+            lambda n: client.delete(f"/event/delete/{delete_ids[n]}", headers=auth),
+        ),
+        ("POST", "/event/bulk/new"): (
+            SLOW_REQUESTS,
+            lambda n: client.post(
+                "/event/bulk/new",
+                json=[_event(n * BATCH + i) for i in range(BATCH)],
+                headers=auth,
+            ),
+        ),
+        ("PATCH", "/event/bulk/edit"): (
+            SLOW_REQUESTS,
+            lambda n: client.patch(
+                "/event/bulk/edit",
+                json=[
+                    {"id": event_ids[(n * BATCH + i) % len(event_ids)], "tags": []}
+                    for i in range(BATCH)
+                ],
+                headers=auth,
+            ),
+        ),
+        ("POST", "/event/bulk/delete"): (
+            SLOW_REQUESTS,
+            lambda n: client.post(
+                "/event/bulk/delete",
+                json=bulk_delete_ids[n * BATCH : (n + 1) * BATCH],
+                headers=auth,
+            ),
+        ),
+        ("POST", "/user/signup"): (
+            SLOW_REQUESTS,
+            lambda n: client.post(
+                "/user/signup",
+                json={"email": f"signup{n}@server.com", "password": PASSWORD},
+            ),
+        ),
+        ("POST", "/user/signin"): (
+            SLOW_REQUESTS,
+            lambda n: client.post(
+                "/user/signin",
+                data={
+                    "username": f"bench{n % USERS + 1}@server.com",
+                    "password": PASSWORD,
+                },
+            ),
+        ),
+    }
+
+    routes = {
+        (method, prefix + route.path)
+        for prefix, router in (("/event", event_router), ("/user", user_router))
+        for route in router.routes
+        for method in route.methods
+    }
+    # The change stream holds its response open; bench_broker.py measures it.
+    routes.discard(("GET", "/event/stream"))
+    assert routes == set(scenarios), "every route needs a benchmark scenario"
+
+    results = {}
+    for (method, path), (requests, send) in scenarios.items():
+        results[f"{method} {path}"] = await drive(send, requests, CONCURRENCY)
+    print("\n" + format_report(results))
+
+    assert not any(stats["errors"] for stats in results.values())
+
+    baseline = load_baseline(BASELINE)
+    if baseline is None or UPDATE_BASELINE:
+        save_baseline(results, BASELINE)
+        return
+    regressions = find_regressions(results, baseline, THRESHOLD)
+    assert not regressions, "\n".join(regressions)
@@ -0,0 +1,100 @@
+"""Delivery throughput of the event change stream to many subscribers.
+
+Fans BENCH_MESSAGES messages out to BENCH_SUBSCRIBERS concurrent
+subscribers, first through the in-process broker alone, then end to end
+from committed NOTIFYs in the test database through the stream's listener
+connection:
+
+    pytest benchmarks/bench_broker.py -s
+
+Each delivery is one sample: "rps" is deliveries per second and the
+percentiles are the time from publishing (or committing) a message to a
+subscriber receiving it. A last run adds subscribers that never read and
+checks that they are dropped once their buffer is full while the others
+still receive every message.
+"""
+
+import asyncio
+import os
+import time
+
+from benchmarks.harness import format_report, summarize
+from streaming.broker import Broker
+from streaming.changes import ChangeStream, notify_changes, sse_frame
+from tests.conftest import DATABASE_URL
+
+SUBSCRIBERS = int(os.getenv("BENCH_SUBSCRIBERS", "5000"))
+MESSAGES = int(os.getenv("BENCH_MESSAGES", "200"))
+QUEUE_SIZE = int(os.getenv("BENCH_QUEUE_SIZE", "100"))
+
+
+async def consume(subscription, count: int, sent: dict, latencies: list) -> None:
+    for _ in range(count):
+        message = await subscription.get()
+        if message is None:
+            return
+        latencies.append(time.perf_counter() - sent[message])
+
+
+async def fan_out(subscribers: int, stalled: int = 0) -> tuple[dict, Broker]:
+    broker = Broker(QUEUE_SIZE)
+    sent, latencies = {}, []
+    consumers = [
+        asyncio.create_task(consume(broker.subscribe(), MESSAGES, sent, latencies))
+        for _ in range(subscribers)
+    ]
+    # Subscribers that never read, so that more messages than QUEUE_SIZE drop them.
+    idle = [broker.subscribe() for _ in range(stalled)]
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    for n in range(MESSAGES):
+        message = sse_frame({"topic": "event.updated", "payload": {"id": n}})
+        sent[message] = time.perf_counter()
+        broker.publish(message)
+        # Lets subscribers drain between messages, as network writes would.
+        await asyncio.sleep(0)
+    await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - start
+    if MESSAGES > QUEUE_SIZE:
+        assert all(subscription.missed_messages for subscription in idle)
+    return summarize(latencies, elapsed), broker
+
+
+async def test_broker_fan_out() -> None:
+    results = {}
+    for subscribers in (SUBSCRIBERS // 10, SUBSCRIBERS):
+        results[f"broker {subscribers} subs"], _ = await fan_out(subscribers)
+    stats, broker = await fan_out(SUBSCRIBERS, stalled=SUBSCRIBERS // 10)
+    results[f"broker +{SUBSCRIBERS // 10} stalled"] = stats
+    print(f"\n{MESSAGES} messages, queues of {QUEUE_SIZE}")
+    print(format_report(results))
+    assert stats["requests"] == MESSAGES * SUBSCRIBERS
+    assert len(broker) == SUBSCRIBERS
+
+
+async def test_notify_fan_out(test_session_maker) -> None:
+    stream = ChangeStream(Broker(QUEUE_SIZE), DATABASE_URL)
+    sent, latencies = {}, []
+    consumers = [
+        asyncio.create_task(consume(stream.subscribe(), MESSAGES, sent, latencies))
+        for _ in range(SUBSCRIBERS)
+    ]
+    try:
+        await asyncio.wait_for(stream.listening.wait(), 5)
+        start = time.perf_counter()
+        async with test_session_maker() as session:
+            for n in range(MESSAGES):
+                payload = {"id": n}
+                await notify_changes(session, "event.updated", [payload])
+                message = sse_frame({"topic": "event.updated", "payload": payload})
+                sent[message] = time.perf_counter()
+                await session.commit()
+        await asyncio.wait_for(asyncio.gather(*consumers), 60)
+        elapsed = time.perf_counter() - start
+    finally:
+        await stream.close()
+
+    results = {f"notify {SUBSCRIBERS} subs": summarize(latencies, elapsed)}
+    print(f"\n{MESSAGES} committed notifications")
+    print(format_report(results))
+    assert len(latencies) == MESSAGES * SUBSCRIBERS
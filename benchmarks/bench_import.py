@@ -0,0 +1,92 @@
+"""Cold-start cost of importing the application.
+
+Imports `main` in BENCH_IMPORT_RUNS fresh interpreters with `-X importtime`
+and reports the cumulative import time of `main` in milliseconds, plus the
+modules that contribute most to it:
+
+    pytest benchmarks/bench_import.py -s
+
+The interpreters get no database or secret configuration, which checks that
+importing the app needs none. Results are compared with the baseline at
+BENCH_IMPORT_BASELINE (by default benchmarks/baselines/import.json) like the
+API benchmark's: the run fails when p95 grows by more than
+BENCH_REGRESSION_THRESHOLD, and BENCH_UPDATE_BASELINE=1 rewrites it.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.harness import (
+    find_regressions,
+    format_report,
+    load_baseline,
+    save_baseline,
+    summarize,
+)
+
+RUNS = int(os.getenv("BENCH_IMPORT_RUNS", "10"))
+TOP = int(os.getenv("BENCH_IMPORT_TOP", "10"))
+THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.25"))
+BASELINE = Path(
+    os.getenv(
+        "BENCH_IMPORT_BASELINE", Path(__file__).parent / "baselines" / "import.json"
+    )
+)
+UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE") == "1"
+
+ROOT = Path(__file__).resolve().parent.parent
+# Imported lazily on first use; none of them may be pulled in by `import main`.
+LAZY_MODULES = ("passlib", "bcrypt", "uvicorn")
+CHECK = (
+    "import sys, main\n"
+    "from database.connection import engines\n"
+    f"loaded = [name for name in {LAZY_MODULES!r} if name in sys.modules]\n"
+    "assert not loaded, loaded\n"
+    "assert not engines()\n"
+)
+
+
+def import_times() -> dict[str, float]:
+    """Cumulative import time in seconds of each module, from one fresh run."""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("DATABASE_URL_PROD", "DATABASE_URL_REPLICA", "SECRET_KEY")
+    }
+    env["PYTHONPATH"] = str(ROOT / "src")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHECK],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def test_import_time() -> None:
+    runs = [import_times() for _ in range(RUNS)]
+    times = [run["main"] for run in runs]
+    results = {"import main": summarize(times, elapsed=sum(times))}
+    print("\n" + format_report(results))
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    print("\nslowest imports of the last run (cumulative ms):")
+    for name, seconds in slowest[1 : TOP + 1]:
+        print(f"  {seconds * 1000:>9.1f}  {name}")
+
+    baseline = load_baseline(BASELINE)
+    if baseline is None or UPDATE_BASELINE:
+        save_baseline(results, BASELINE)
+        return
+    regressions = find_regressions(results, baseline, THRESHOLD)
+    assert not regressions, "\n".join(regressions)
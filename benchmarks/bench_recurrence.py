@@ -0,0 +1,111 @@
+"""Occurrence expansion of recurring events over large date ranges.
+
+Times the expansion engine on its own and GET /event/?expand=true over
+BENCH_SERIES weekly series without an end:
+
+    pytest benchmarks/bench_recurrence.py -s
+
+Expansion jumps to the requested window instead of walking from the first
+occurrence, so a one-week window costs the same a year or a century after
+the series starts, and a listing page costs about the same whether the
+window spans a month or decades: only the occurrences on the page are
+generated.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from auth.jwt_handler import create_access_token
+from benchmarks.harness import drive, format_report, summarize
+from config import get_settings
+from scheduling.recurrence import occurrences
+
+RUNS = int(os.getenv("BENCH_RUNS", "200"))
+SERIES = int(os.getenv("BENCH_SERIES", "500"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "100"))
+PAGE_SIZE = get_settings().events_max_page_size
+
+START = datetime(2024, 1, 1, 9, 0)
+RULE = "FREQ=DAILY;INTERVAL=2"
+
+SEED = text(
+    """
+    INSERT INTO events (creator, title, date, description, tags, location, rrule)
+    SELECT 'bench@server.com',
+           'standup ' || n,
+           timestamp '2024-01-01 09:00' + (n % 7) * interval '1 day'
+               + (n % 8) * interval '1 hour',
+           'Weekly standup',
+           ARRAY['team' || (n % 10)],
+           'Recurring',
+           'FREQ=WEEKLY;BYDAY=MO,WE,FR'
+    FROM generate_series(1, :count) AS n
+    """
+)
+
+
+def time_expansion(start: datetime, end: datetime) -> tuple[dict, int]:
+    latencies, count = [], 0
+    for _ in range(RUNS):
+        began = time.perf_counter()
+        count = sum(1 for _ in occurrences(RULE, START, start, end))
+        latencies.append(time.perf_counter() - began)
+    return summarize(latencies, sum(latencies)), count
+
+
+def test_expansion_window_distance() -> None:
+    week = timedelta(weeks=1)
+    results, counts = {}, {}
+    for years in (1, 10, 100):
+        window = START.replace(year=START.year + years)
+        name = f"1 week, {years}y after start"
+        results[name], counts[name] = time_expansion(window, window + week)
+    for years in (1, 10, 50):
+        name = f"{years}y window"
+        end = START.replace(year=START.year + years)
+        results[name], counts[name] = time_expansion(START, end)
+
+    print("\n" + format_report(results))
+    for name, stats in results.items():
+        per_second = counts[name] / (stats["p50_ms"] / 1000)
+        print(f"  {name:<26}{counts[name]:>8} occurrences {per_second:>12,.0f}/s")
+    near, far = results["1 week, 1y after start"], results["1 week, 100y after start"]
+    assert far["p50_ms"] < near["p50_ms"] * 5
+
+
+async def test_expanded_listing(
+    client: AsyncClient, test_session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(get_settings(), "rate_limit_enabled", False)
+    await test_session.execute(SEED, {"count": SERIES})
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token('bench@server.com')}"}
+
+    def listing(end: str | None):
+        params = {
+            "location": "Recurring",
+            "expand": "true",
+            "date_from": "2030-01-01T00:00:00",
+            "limit": PAGE_SIZE,
+        }
+        if end:
+            params["date_to"] = end
+        return lambda n: client.get("/event/", params=params, headers=headers)
+
+    results = {
+        "expand 1 month window": await drive(
+            listing("2030-02-01T00:00:00"), REQUESTS, 1
+        ),
+        "expand 50 year window": await drive(
+            listing("2080-01-01T00:00:00"), REQUESTS, 1
+        ),
+        "expand open window": await drive(listing(None), REQUESTS, 1),
+    }
+    print(f"\n{SERIES} series, {PAGE_SIZE} occurrences per page")
+    print(format_report(results))
+    assert all(stats["errors"] == 0 for stats in results.values())
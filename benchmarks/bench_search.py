@@ -0,0 +1,77 @@
+"""Latency of the queries behind GET /event/search.
+
+Seeds BENCH_SEARCH_EVENTS events (1M by default) into the test database and
+times each kind of search through build_search_query:
+
+    pytest benchmarks/bench_search.py -s
+
+Every single-predicate search must stay under BENCH_SEARCH_TARGET_MS at the
+median. Combined text and tag filters depend on how the planner intersects
+the two GIN bitmaps, so they are reported but not held to the target.
+"""
+
+import os
+import time
+from sqlalchemy import text
+from benchmarks.harness import percentile
+from database.search import build_search_query
+
+EVENTS = int(os.getenv("BENCH_SEARCH_EVENTS", "1000000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "50"))
+TARGET_MS = float(os.getenv("BENCH_SEARCH_TARGET_MS", "10"))
+
+SEED = text(
+    """
+    INSERT INTO events (creator, title, date, description, tags, location)
+    SELECT 'user' || (n % 1000) || '@server.com',
+           'word' || (n % 997) || ' meetup ' || (n % 13),
+           timestamp '2024-01-01' + n * interval '1 minute',
+           'Agenda topic' || (n % 1999) || ' with speaker' || (n % 211),
+           ARRAY['tag' || (n % 5000), 'group' || (n % 37)],
+           (ARRAY['Berlin', 'Paris', 'London', 'online'])[n % 4 + 1]
+               || ', room ' || (n % 100)
+    FROM generate_series(1, :events) AS n
+    """
+)
+
+REPORTED_ONLY = {"combined"}
+
+CASES = {
+    "full_text": {"q": "word42"},
+    "full_text_phrase": {"q": "topic77 speaker5"},
+    "tags_all": {"tags_all": ["tag42", "group5"]},
+    "tags_any": {"tags_any": ["tag42", "tag43", "tag44"]},
+    "location_prefix": {"location_prefix": "Paris, room 42"},
+    "combined": {"q": "word42", "tags_any": ["group3", "group5"]},
+}
+
+
+async def test_search_latency(engine, test_session) -> None:
+    await test_session.execute(SEED, {"events": EVENTS})
+    await test_session.commit()
+    # Flush the GIN pending lists and refresh statistics, as autovacuum would.
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE events"))
+
+    print(f"\nsearch latency over {EVENTS} events ({REPEAT} runs)")
+    medians = {}
+    for name, params in CASES.items():
+        statement = build_search_query(**params)
+        await test_session.execute(statement)
+        timings = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            result = await test_session.execute(statement)
+            result.all()
+            timings.append((time.perf_counter() - start) * 1000)
+        medians[name] = percentile(timings, 50)
+        p95 = percentile(timings, 95)
+        print(f"{name:>18}: p50 {medians[name]:7.2f} ms  p95 {p95:7.2f} ms")
+
+    slow = {
+        name: median
+        for name, median in medians.items()
+        if name not in REPORTED_ONLY and median >= TARGET_MS
+    }
+    assert not slow
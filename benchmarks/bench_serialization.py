@@ -0,0 +1,69 @@
+"""Default versus fast response serialization for the event routes.
+
+Seeds BENCH_EVENTS events and requests full pages of GET /event/ and
+GET /event/search with EVENTS_FAST_SERIALIZATION off and on:
+
+    pytest benchmarks/bench_serialization.py -s
+
+The default path hydrates Event objects and validates them through the
+response model. The fast path selects plain columns and encodes them
+directly to bytes (with orjson when it is installed).
+"""
+
+import os
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from auth.jwt_handler import create_access_token
+from benchmarks.harness import drive, format_report
+from models.serialization import orjson
+from config import get_settings
+from main import app
+
+EVENTS = int(os.getenv("BENCH_EVENTS", "10000"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "200"))
+PAGE_SIZE = get_settings().events_max_page_size
+
+SEED = text(
+    """
+    INSERT INTO events (creator, title, date, description, tags, location)
+    SELECT 'bench@server.com',
+           'word' || (n % 97) || ' meetup',
+           timestamp '2024-01-01' + n * interval '1 hour',
+           'Agenda topic' || (n % 1999) || ' with a longer description',
+           ARRAY['tag' || (n % 50), 'group' || (n % 7)],
+           'Berlin'
+    FROM generate_series(1, :count) AS n
+    """
+)
+
+
+async def test_serialization_modes(
+    client: AsyncClient, test_session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    await test_session.execute(SEED, {"count": EVENTS})
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token('bench@server.com')}"}
+
+    def listing(n: int):
+        return client.get("/event/", params={"limit": PAGE_SIZE}, headers=headers)
+
+    def search(n: int):
+        params = {"q": f"word{n % 97}", "limit": PAGE_SIZE}
+        return client.get("/event/search", params=params, headers=headers)
+
+    results = {}
+    for fast in (False, True):
+        monkeypatch.setattr(get_settings(), "events_fast_serialization", fast)
+        mode = "fast" if fast else "default"
+        results[f"{mode} GET /event/"] = await drive(listing, REQUESTS, 1)
+        results[f"{mode} GET /event/search"] = await drive(search, REQUESTS, 1)
+
+    print(f"\n{PAGE_SIZE} events per response, orjson: {orjson is not None}")
+    print(format_report(results))
+    for route in ("GET /event/", "GET /event/search"):
+        assert (
+            results[f"fast {route}"]["p50_ms"] < results[f"default {route}"]["p50_ms"]
+        )
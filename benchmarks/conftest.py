@@ -0,0 +1,17 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from tests.conftest import (  # noqa: F401
+    DATABASE_URL,
+    initialize_database,
+    event_loop,
+    test_session_maker,
+    test_session,
+    client,
+)
+
+
+@pytest.fixture(scope="session")
+async def engine() -> AsyncEngine:
+    # Statement echo would dominate the timings, so benchmarks run without it.
+    yield create_async_engine(DATABASE_URL, poolclass=NullPool)
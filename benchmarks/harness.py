@@ -0,0 +1,93 @@
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+
+
+def percentile(values: list[float], q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def summarize(latencies: list[float], elapsed: float, errors: int = 0) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def drive(
+    send: Callable[[int], Awaitable[httpx.Response]],
+    requests: int,
+    concurrency: int,
+    expected_status: int = 200,
+) -> dict:
+    """Issue `requests` calls of `send(n)` with at most `concurrency` in flight."""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for n in counter:
+            start = time.perf_counter()
+            response = await send(n)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != expected_status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def load_baseline(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_baseline(results: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Endpoints whose p95 grew or whose throughput fell by more than `threshold`."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms"
+            )
+        if current["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: rps {previous['rps']:.1f} -> {current['rps']:.1f}"
+            )
+    return regressions
+
+
+def format_report(results: dict) -> str:
+    lines = [
+        f"{'endpoint':<28}{'reqs':>7}{'errors':>8}{'rps':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    ]
+    for name, stats in results.items():
+        lines.append(
+            f"{name:<28}{stats['requests']:>7}{stats['errors']:>8}"
+            f"{stats['rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
@@ -11,9 +11,12 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
 
-from src.database.connection import engine
-from src.models.events import Event
-from src.models.users import User
+from database.connection import get_engine
+from database.partitions import is_partition
+from models.events import Event
+from models.users import User
+from models.stats import EventLocationDayCount, EventTagDayCount
+from models.outbox import OutboxMessage
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -29,9 +32,15 @@ target_metadata = Event.metadata
 target_metadata = User.metadata
 
 config.set_main_option(
-    "sqlalchemy.url", engine.url.render_as_string(hide_password=False)
+    "sqlalchemy.url", get_engine().url.render_as_string(hide_password=False)
 )
 
+
+def include_name(name, type_, parent_names) -> bool:
+    # Partitions of events are made at runtime and are not in the metadata.
+    return not (type_ == "table" and is_partition(name))
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -54,6 +63,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_name=include_name,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -63,7 +73,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
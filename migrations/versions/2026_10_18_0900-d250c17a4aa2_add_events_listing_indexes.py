@@ -0,0 +1,37 @@
+"""add events listing indexes
+
+Revision ID: d250c17a4aa2
+Revises: 5ad046a75ebb
+Create Date: 2026-10-18 09:00:12.431807
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d250c17a4aa2"
+down_revision = "5ad046a75ebb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_events_date_id", "events", ["date", "id"], unique=False)
+    op.create_index(
+        "ix_events_location_date_id", "events", ["location", "date", "id"], unique=False
+    )
+    op.create_index(
+        "ix_events_creator_date_id", "events", ["creator", "date", "id"], unique=False
+    )
+    op.create_index(
+        "ix_events_tags", "events", ["tags"], unique=False, postgresql_using="gin"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_tags", table_name="events", postgresql_using="gin")
+    op.drop_index("ix_events_creator_date_id", table_name="events")
+    op.drop_index("ix_events_location_date_id", table_name="events")
+    op.drop_index("ix_events_date_id", table_name="events")
@@ -0,0 +1,56 @@
+"""add events search
+
+Revision ID: 19401f14b6fe
+Revises: d250c17a4aa2
+Create Date: 2026-10-18 10:30:41.502114
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "19401f14b6fe"
+down_revision = "d250c17a4aa2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "events",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', title), 'A') || "
+                "setweight(to_tsvector('english', description), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_events_search_vector",
+        "events",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_events_location_pattern",
+        "events",
+        ["location"],
+        unique=False,
+        postgresql_ops={"location": "varchar_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_location_pattern", table_name="events")
+    op.drop_index(
+        "ix_events_search_vector", table_name="events", postgresql_using="gin"
+    )
+    op.drop_column("events", "search_vector")
@@ -0,0 +1,90 @@
+"""add events summary tables
+
+Revision ID: aa6ab8326c49
+Revises: 19401f14b6fe
+Create Date: 2026-10-18 12:00:17.204381
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "aa6ab8326c49"
+down_revision = "19401f14b6fe"
+branch_labels = None
+depends_on = None
+
+
+SUMMARY_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_summary_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (OLD.date::date, OLD.location, -1)
+        ON CONFLICT (day, location) DO UPDATE
+        SET count = event_location_day_counts.count + EXCLUDED.count;
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT OLD.date::date, tag, -count(*) FROM unnest(OLD.tags) AS tag
+        GROUP BY tag
+        ON CONFLICT (day, tag) DO UPDATE
+        SET count = event_tag_day_counts.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (NEW.date::date, NEW.location, 1)
+        ON CONFLICT (day, location) DO UPDATE
+        SET count = event_location_day_counts.count + EXCLUDED.count;
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT NEW.date::date, tag, count(*) FROM unnest(NEW.tags) AS tag
+        GROUP BY tag
+        ON CONFLICT (day, tag) DO UPDATE
+        SET count = event_tag_day_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "event_location_day_counts",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("location", sa.String(length=64), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "location"),
+    )
+    op.create_table(
+        "event_tag_day_counts",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("tag", sa.String(length=16), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "tag"),
+    )
+    # Lock out writers while backfilling so no change slips between the
+    # snapshot and the trigger.
+    op.execute("LOCK TABLE events IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(
+        "INSERT INTO event_location_day_counts (day, location, count) "
+        "SELECT date::date, location, count(*) FROM events GROUP BY 1, 2"
+    )
+    op.execute(
+        "INSERT INTO event_tag_day_counts (day, tag, count) "
+        "SELECT date::date, tag, count(*) FROM events, unnest(tags) AS tag "
+        "GROUP BY 1, 2"
+    )
+    op.execute(SUMMARY_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER events_summary_refresh "
+        "AFTER INSERT OR DELETE OR UPDATE OF date, location, tags ON events "
+        "FOR EACH ROW EXECUTE FUNCTION events_summary_refresh()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER events_summary_refresh ON events")
+    op.execute("DROP FUNCTION events_summary_refresh()")
+    op.drop_table("event_tag_day_counts")
+    op.drop_table("event_location_day_counts")
@@ -0,0 +1,60 @@
+"""add events recurrence
+
+Revision ID: c41b8e7d2af8
+Revises: 3f1c9e7b52d4
+Create Date: 2026-10-18 14:30:12.604381
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "c41b8e7d2af8"
+down_revision = "3f1c9e7b52d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("events", sa.Column("rrule", sa.String(length=256), nullable=True))
+    op.add_column("events", sa.Column("recurrence_end", sa.DateTime(), nullable=True))
+    op.add_column(
+        "events",
+        sa.Column(
+            "exdates",
+            postgresql.ARRAY(sa.DateTime()),
+            server_default="{}",
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "events",
+        sa.Column(
+            "overrides",
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default="{}",
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_events_series_date",
+        "events",
+        ["date"],
+        unique=False,
+        postgresql_where=sa.text("rrule IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_events_series_date",
+        table_name="events",
+        postgresql_where=sa.text("rrule IS NOT NULL"),
+    )
+    op.drop_column("events", "overrides")
+    op.drop_column("events", "exdates")
+    op.drop_column("events", "recurrence_end")
+    op.drop_column("events", "rrule")
@@ -0,0 +1,37 @@
+"""add events version
+
+Revision ID: 0b009221d1ab
+Revises: c41b8e7d2af8
+Create Date: 2026-10-18 15:30:47.118902
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0b009221d1ab"
+down_revision = "c41b8e7d2af8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "events", sa.Column("version", sa.Integer(), server_default="1", nullable=False)
+    )
+    op.add_column(
+        "events",
+        sa.Column(
+            "updated_at",
+            sa.DateTime(),
+            server_default=sa.text("timezone('utc', now())"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("events", "updated_at")
+    op.drop_column("events", "version")
@@ -0,0 +1,89 @@
+"""add events tombstones and change seq
+
+Revision ID: 4ca4ba6d8454
+Revises: 0b009221d1ab
+Create Date: 2026-10-18 16:30:09.527310
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4ca4ba6d8454"
+down_revision = "0b009221d1ab"
+branch_labels = None
+depends_on = None
+
+
+SUMMARY_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_summary_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND {old_counted} THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (OLD.date::date, OLD.location, -1)
+        ON CONFLICT (day, location) DO UPDATE
+        SET count = event_location_day_counts.count + EXCLUDED.count;
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT OLD.date::date, tag, -count(*) FROM unnest(OLD.tags) AS tag
+        GROUP BY tag
+        ON CONFLICT (day, tag) DO UPDATE
+        SET count = event_tag_day_counts.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND {new_counted} THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (NEW.date::date, NEW.location, 1)
+        ON CONFLICT (day, location) DO UPDATE
+        SET count = event_location_day_counts.count + EXCLUDED.count;
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT NEW.date::date, tag, count(*) FROM unnest(NEW.tags) AS tag
+        GROUP BY tag
+        ON CONFLICT (day, tag) DO UPDATE
+        SET count = event_tag_day_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+SUMMARY_TRIGGER = (
+    "CREATE TRIGGER events_summary_refresh "
+    "AFTER INSERT OR DELETE OR UPDATE OF {columns} ON events "
+    "FOR EACH ROW EXECUTE FUNCTION events_summary_refresh()"
+)
+
+
+def upgrade() -> None:
+    op.add_column("events", sa.Column("deleted_at", sa.DateTime(), nullable=True))
+    op.add_column(
+        "events",
+        sa.Column(
+            "change_seq",
+            sa.BigInteger(),
+            server_default=sa.text("(pg_current_xact_id()::text::bigint)"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_events_change_seq_id", "events", ["change_seq", "id"], unique=False
+    )
+    # Tombstones leave the summaries when they are made.
+    op.execute(
+        SUMMARY_FUNCTION.format(
+            old_counted="OLD.deleted_at IS NULL", new_counted="NEW.deleted_at IS NULL"
+        )
+    )
+    op.execute("DROP TRIGGER events_summary_refresh ON events")
+    op.execute(SUMMARY_TRIGGER.format(columns="date, location, tags, deleted_at"))
+
+
+def downgrade() -> None:
+    # Without deleted_at tombstones would come back to life.
+    op.execute("DELETE FROM events WHERE deleted_at IS NOT NULL")
+    op.execute("DROP TRIGGER events_summary_refresh ON events")
+    op.execute(SUMMARY_TRIGGER.format(columns="date, location, tags"))
+    op.execute(SUMMARY_FUNCTION.format(old_counted="TRUE", new_counted="TRUE"))
+    op.drop_index("ix_events_change_seq_id", table_name="events")
+    op.drop_column("events", "change_seq")
+    op.drop_column("events", "deleted_at")
@@ -0,0 +1,54 @@
+"""add events end date and during
+
+Revision ID: 29f8a2cd3d95
+Revises: ab1435bd35d9
+Create Date: 2026-10-18 18:30:12.840377
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "29f8a2cd3d95"
+down_revision = "ab1435bd35d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("events", sa.Column("end_date", sa.DateTime(), nullable=True))
+    op.add_column(
+        "events",
+        sa.Column(
+            "during",
+            postgresql.TSRANGE(),
+            sa.Computed(
+                "tsrange(date, coalesce(end_date, date), "
+                "CASE WHEN end_date IS NULL THEN '[]' ELSE '[)' END)",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_events_during",
+        "events",
+        ["during"],
+        unique=False,
+        postgresql_using="gist",
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_events_during",
+        table_name="events",
+        postgresql_using="gist",
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.drop_column("events", "during")
+    op.drop_column("events", "end_date")
@@ -0,0 +1,135 @@
+"""partition events by month
+
+Revision ID: cdb5d7080f7c
+Revises: 29f8a2cd3d95
+Create Date: 2026-10-18 19:30:41.573920
+
+"""
+
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "cdb5d7080f7c"
+down_revision = "29f8a2cd3d95"
+branch_labels = None
+depends_on = None
+
+
+# Every column but the generated ones, which Postgres fills in itself.
+COLUMNS = (
+    "id, creator, title, date, description, tags, location, end_date, rrule, "
+    "recurrence_end, exdates, overrides, version, updated_at, deleted_at, change_seq"
+)
+# Matches the default of EVENTS_PARTITION_MONTHS_AHEAD.
+MONTHS_AHEAD = 3
+
+SUMMARY_TRIGGER = """
+CREATE TRIGGER events_summary_refresh
+AFTER INSERT OR DELETE OR UPDATE OF date, location, tags, deleted_at ON events
+FOR EACH ROW EXECUTE FUNCTION events_summary_refresh()
+"""
+
+
+def create_indexes() -> None:
+    op.create_index("ix_events_date_id", "events", ["date", "id"], unique=False)
+    op.create_index(
+        "ix_events_location_date_id", "events", ["location", "date", "id"], unique=False
+    )
+    op.create_index(
+        "ix_events_creator_date_id", "events", ["creator", "date", "id"], unique=False
+    )
+    op.create_index(
+        "ix_events_series_date",
+        "events",
+        ["date"],
+        unique=False,
+        postgresql_where=sa.text("rrule IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_events_change_seq_id", "events", ["change_seq", "id"], unique=False
+    )
+    op.create_index(
+        "ix_events_during",
+        "events",
+        ["during"],
+        unique=False,
+        postgresql_using="gist",
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_events_tags", "events", ["tags"], unique=False, postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_events_search_vector",
+        "events",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_events_location_pattern",
+        "events",
+        ["location"],
+        unique=False,
+        postgresql_ops={"location": "varchar_pattern_ops"},
+    )
+
+
+def replace_events(table: str) -> None:
+    """Move the rows of events into table and put table in its place."""
+    op.execute(f"INSERT INTO {table} ({COLUMNS}) SELECT {COLUMNS} FROM events")
+    op.execute(f"ALTER SEQUENCE events_id_seq OWNED BY {table}.id")
+    op.execute("DROP TABLE events")
+    op.execute(f"ALTER TABLE {table} RENAME TO events")
+
+
+def add_months(month: date, months: int) -> date:
+    year, index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, index + 1, 1)
+
+
+def upgrade() -> None:
+    # Writes made while rows are copied would be lost with the old table.
+    op.execute("LOCK TABLE events IN ACCESS EXCLUSIVE MODE")
+    op.execute(
+        "CREATE TABLE events_partitioned "
+        "(LIKE events INCLUDING DEFAULTS INCLUDING GENERATED) "
+        "PARTITION BY RANGE (date)"
+    )
+    op.execute("CREATE TABLE events_default PARTITION OF events_partitioned DEFAULT")
+    # A partition for every month with events, and for the months ahead.
+    current = datetime.now(timezone.utc).date().replace(day=1)
+    months = {add_months(current, n) for n in range(MONTHS_AHEAD + 1)}
+    months.update(
+        month.date()
+        for month in op.get_bind()
+        .execute(sa.text("SELECT DISTINCT date_trunc('month', date) FROM events"))
+        .scalars()
+    )
+    for month in sorted(months):
+        op.execute(
+            f"CREATE TABLE events_p{month:%Y%m} PARTITION OF events_partitioned "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+        )
+    # The rows keep their summaries: the new table has no trigger yet.
+    replace_events("events_partitioned")
+    op.create_primary_key("events_pkey", "events", ["id", "date"])
+    create_indexes()
+    op.execute(SUMMARY_TRIGGER)
+
+
+def downgrade() -> None:
+    op.execute("LOCK TABLE events IN ACCESS EXCLUSIVE MODE")
+    op.execute(
+        "CREATE TABLE events_unpartitioned "
+        "(LIKE events INCLUDING DEFAULTS INCLUDING GENERATED)"
+    )
+    # Dropping events drops its partitions along with it.
+    replace_events("events_unpartitioned")
+    op.create_primary_key("events_pkey", "events", ["id"])
+    create_indexes()
+    op.execute(SUMMARY_TRIGGER)
@@ -0,0 +1,111 @@
+"""make events summaries append only
+
+Revision ID: bf9703e38e90
+Revises: cdb5d7080f7c
+Create Date: 2026-10-18 20:30:12.408317
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "bf9703e38e90"
+down_revision = "cdb5d7080f7c"
+branch_labels = None
+depends_on = None
+
+
+SUMMARIES = (
+    ("event_location_day_counts", "location"),
+    ("event_tag_day_counts", "tag"),
+)
+
+SUMMARY_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_summary_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.date::date = NEW.date::date
+        AND OLD.location = NEW.location
+        AND OLD.tags = NEW.tags
+        AND (OLD.deleted_at IS NULL) = (NEW.deleted_at IS NULL) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (OLD.date::date, OLD.location, -1);
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT OLD.date::date, tag, -count(*) FROM unnest(OLD.tags) AS tag
+        GROUP BY tag;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.deleted_at IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (NEW.date::date, NEW.location, 1);
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT NEW.date::date, tag, count(*) FROM unnest(NEW.tags) AS tag
+        GROUP BY tag;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+UPSERT_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_summary_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (OLD.date::date, OLD.location, -1)
+        ON CONFLICT (day, location) DO UPDATE
+        SET count = event_location_day_counts.count + EXCLUDED.count;
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT OLD.date::date, tag, -count(*) FROM unnest(OLD.tags) AS tag
+        GROUP BY tag
+        ON CONFLICT (day, tag) DO UPDATE
+        SET count = event_tag_day_counts.count + EXCLUDED.count;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.deleted_at IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (NEW.date::date, NEW.location, 1)
+        ON CONFLICT (day, location) DO UPDATE
+        SET count = event_location_day_counts.count + EXCLUDED.count;
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT NEW.date::date, tag, count(*) FROM unnest(NEW.tags) AS tag
+        GROUP BY tag
+        ON CONFLICT (day, tag) DO UPDATE
+        SET count = event_tag_day_counts.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    for table, key in SUMMARIES:
+        op.drop_constraint(f"{table}_pkey", table, type_="primary")
+        op.execute(f"ALTER TABLE {table} ADD COLUMN id BIGSERIAL")
+        op.create_primary_key(f"{table}_pkey", table, ["id"])
+        op.create_index(f"ix_{table}_day_{key}", table, ["day", key], unique=False)
+    op.execute(SUMMARY_FUNCTION)
+
+
+def downgrade() -> None:
+    # Keeps writers from appending rows that the merge below would miss.
+    op.execute("LOCK TABLE events IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(UPSERT_FUNCTION)
+    for table, key in SUMMARIES:
+        op.execute(
+            f"CREATE TEMPORARY TABLE merged AS SELECT day, {key}, sum(count) AS count "
+            f"FROM {table} GROUP BY day, {key} HAVING sum(count) <> 0"
+        )
+        op.execute(f"DELETE FROM {table}")
+        op.drop_index(f"ix_{table}_day_{key}", table_name=table)
+        op.drop_constraint(f"{table}_pkey", table, type_="primary")
+        op.drop_column(table, "id")
+        op.create_primary_key(f"{table}_pkey", table, ["day", key])
+        op.execute(
+            f"INSERT INTO {table} (day, {key}, count) SELECT day, {key}, count FROM merged"
+        )
+        op.execute("DROP TABLE merged")
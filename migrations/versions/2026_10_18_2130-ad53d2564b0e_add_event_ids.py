@@ -0,0 +1,60 @@
+"""add event ids
+
+Revision ID: ad53d2564b0e
+Revises: bf9703e38e90
+Create Date: 2026-10-18 21:30:44.190562
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "ad53d2564b0e"
+down_revision = "bf9703e38e90"
+branch_labels = None
+depends_on = None
+
+
+EVENT_IDS_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_ids_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM event_ids WHERE id = OLD.id;
+    ELSIF TG_OP = 'INSERT' THEN
+        INSERT INTO event_ids (id, date) VALUES (NEW.id, NEW.date);
+    ELSIF NEW.date <> OLD.date THEN
+        UPDATE event_ids SET date = NEW.date WHERE id = NEW.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+EVENT_IDS_TRIGGER = """
+CREATE TRIGGER events_ids_refresh
+AFTER INSERT OR DELETE OR UPDATE OF date ON events
+FOR EACH ROW EXECUTE FUNCTION events_ids_refresh()
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "event_ids",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # Lock out writers while backfilling so no change slips between the
+    # snapshot and the trigger.
+    op.execute("LOCK TABLE events IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("INSERT INTO event_ids (id, date) SELECT id, date FROM events")
+    op.execute(EVENT_IDS_FUNCTION)
+    op.execute(EVENT_IDS_TRIGGER)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER events_ids_refresh ON events")
+    op.execute("DROP FUNCTION events_ids_refresh()")
+    op.drop_table("event_ids")
@@ -0,0 +1,127 @@
+"""leave series out of events summaries
+
+Revision ID: cd158959429c
+Revises: ad53d2564b0e
+Create Date: 2026-10-18 22:30:27.551904
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "cd158959429c"
+down_revision = "ad53d2564b0e"
+branch_labels = None
+depends_on = None
+
+
+SUMMARY_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_summary_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.date::date = NEW.date::date
+        AND OLD.location = NEW.location
+        AND OLD.tags = NEW.tags
+        AND (OLD.rrule IS NULL) = (NEW.rrule IS NULL)
+        AND (OLD.deleted_at IS NULL) = (NEW.deleted_at IS NULL) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE')
+        AND OLD.deleted_at IS NULL AND OLD.rrule IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (OLD.date::date, OLD.location, -1);
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT OLD.date::date, tag, -count(*) FROM unnest(OLD.tags) AS tag
+        GROUP BY tag;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE')
+        AND NEW.deleted_at IS NULL AND NEW.rrule IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (NEW.date::date, NEW.location, 1);
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT NEW.date::date, tag, count(*) FROM unnest(NEW.tags) AS tag
+        GROUP BY tag;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+SUMMARY_TRIGGER = """
+CREATE TRIGGER events_summary_refresh
+AFTER INSERT OR DELETE OR UPDATE OF date, location, tags, rrule, deleted_at
+ON events
+FOR EACH ROW EXECUTE FUNCTION events_summary_refresh()
+"""
+
+PREVIOUS_FUNCTION = """
+CREATE OR REPLACE FUNCTION events_summary_refresh() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND OLD.date::date = NEW.date::date
+        AND OLD.location = NEW.location
+        AND OLD.tags = NEW.tags
+        AND (OLD.deleted_at IS NULL) = (NEW.deleted_at IS NULL) THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (OLD.date::date, OLD.location, -1);
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT OLD.date::date, tag, -count(*) FROM unnest(OLD.tags) AS tag
+        GROUP BY tag;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.deleted_at IS NULL THEN
+        INSERT INTO event_location_day_counts (day, location, count)
+        VALUES (NEW.date::date, NEW.location, 1);
+        INSERT INTO event_tag_day_counts (day, tag, count)
+        SELECT NEW.date::date, tag, count(*) FROM unnest(NEW.tags) AS tag
+        GROUP BY tag;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+PREVIOUS_TRIGGER = """
+CREATE TRIGGER events_summary_refresh
+AFTER INSERT OR DELETE OR UPDATE OF date, location, tags, deleted_at ON events
+FOR EACH ROW EXECUTE FUNCTION events_summary_refresh()
+"""
+
+
+def count_series(sign: int) -> None:
+    # Series were counted once, on their first day; the stats endpoints now
+    # expand them instead. Appends the deltas that take them out (or put them
+    # back), which compaction folds in later.
+    live = "WHERE rrule IS NOT NULL AND deleted_at IS NULL"
+    op.execute(
+        "INSERT INTO event_location_day_counts (day, location, count)"
+        f" SELECT date::date, location, {sign} * count(*) FROM events {live}"
+        " GROUP BY 1, 2"
+    )
+    op.execute(
+        "INSERT INTO event_tag_day_counts (day, tag, count)"
+        f" SELECT date::date, tag, {sign} * count(*)"
+        f" FROM events, unnest(tags) AS tag {live}"
+        " GROUP BY 1, 2"
+    )
+
+
+def upgrade() -> None:
+    # Lock out writers so no change slips between the deltas and the trigger.
+    op.execute("LOCK TABLE events IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER events_summary_refresh ON events")
+    op.execute(SUMMARY_FUNCTION)
+    op.execute(SUMMARY_TRIGGER)
+    count_series(-1)
+
+
+def downgrade() -> None:
+    op.execute("LOCK TABLE events IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER events_summary_refresh ON events")
+    op.execute(PREVIOUS_FUNCTION)
+    op.execute(PREVIOUS_TRIGGER)
+    count_series(1)
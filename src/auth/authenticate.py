@@ -1,15 +1,27 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from auth.jwt_handler import verify_access_token
+from monitoring.timing import phase
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/signin")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/signin", auto_error=False)
 
 
-async def authenticate(token: str = Depends(oauth2_scheme)) -> str:
+async def authenticate(token: str | None = Depends(oauth2_scheme)) -> str:
     if not token:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Sign in for access"
         )
-    decoded_token = verify_access_token(token)
+    with phase("auth"):
+        decoded_token = verify_access_token(token)
     return decoded_token["user"]
+
+
+async def authenticate_with_query_token(
+    token: str | None = Depends(optional_oauth2_scheme),
+    access_token: str | None = None,
+) -> str:
+    # Browser EventSource clients cannot set headers, so they pass the token
+    # as ?access_token=. Keep such URLs out of access logs.
+    return await authenticate(token or access_token)
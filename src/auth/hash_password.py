@@ -1,11 +1,121 @@
-from passlib.context import CryptContext
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from config import get_settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+@lru_cache
+def get_pwd_context() -> "CryptContext":
+    # passlib and bcrypt are imported on first use to keep them out of the
+    # application's import time.
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=get_settings().bcrypt_rounds,
+    )
+
+
+# Module level so that they can be pickled into a process pool.
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def _verify_and_update(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
 
 
 class HashPassword:
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        max_concurrency: int | None = None,
+    ):
+        settings = get_settings()
+        self._executor = executor
+        self.max_concurrency = (
+            max_concurrency or settings.hash_max_concurrency or settings.hash_workers
+        )
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+
     def create_hash(self, password: str):
-        return pwd_context.hash(password)
+        return _hash(password)
 
     def verify_hash(self, plain_password: str, hashed_password: str):
-        return pwd_context.verify(plain_password, hashed_password)
+        return _verify(plain_password, hashed_password)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            settings = get_settings()
+            if settings.hash_executor == "process":
+                self._executor = ProcessPoolExecutor(max_workers=settings.hash_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.hash_workers, thread_name_prefix="bcrypt"
+                )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def _run(self, func, *args):
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            semaphore.release()
+
+    async def create_hash_async(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify_hash_async(
+        self, plain_password: str, hashed_password: str
+    ) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    async def verify_and_update_async(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        return await self._run(_verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -1,28 +1,38 @@
-import os
-from dotenv import load_dotenv
 import time
 from datetime import datetime
+from functools import lru_cache
 import jwt
 from jwt.exceptions import InvalidTokenError
 from fastapi import HTTPException, status
+from auth.token_cache import TokenCache
+from config import get_settings
 
-load_dotenv()
 
-SECRET_KEY: str = os.getenv("SECRET_KEY")
+@lru_cache
+def get_token_cache() -> TokenCache:
+    return TokenCache(get_settings().token_cache_size)
 
-if not SECRET_KEY:
-    raise ValueError("SECRET_KEY environment variable is not set")
+
+def _secret_key() -> str:
+    secret_key = get_settings().secret_key
+    if not secret_key:
+        raise ValueError("SECRET_KEY environment variable is not set")
+    return secret_key
 
 
 def create_access_token(user: str) -> str:
     payload = {"user": user, "expires": time.time() + 3600}
-    token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+    token = jwt.encode(payload, _secret_key(), algorithm="HS256")
     return token
 
 
 def verify_access_token(token: str) -> dict:
+    token_cache = get_token_cache()
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
-        data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        data = jwt.decode(token, _secret_key(), algorithms=["HS256"])
         expire = data.get("expires")
         if expire is None:
             raise HTTPException(
@@ -33,9 +43,36 @@ def verify_access_token(token: str) -> dict:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN, detail="Token expired!"
             )
+        token_cache.set(token, data, expire)
         return data
 
     except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token"
         )
+
+
+def invalidate_access_token(token: str) -> None:
+    get_token_cache().invalidate(token)
+
+
+def create_feed_token(feed: str, user: str, version: int) -> str:
+    # Calendar apps poll a fixed URL, so feed tokens do not expire. They carry
+    # the user's feed token version instead, which the user can bump to revoke
+    # them.
+    payload = {"feed": feed, "user": user, "version": version}
+    return jwt.encode(payload, _secret_key(), algorithm="HS256")
+
+
+def verify_feed_token(token: str, feed: str) -> tuple[str, int]:
+    """The user and feed token version the token was issued with; the caller
+    checks the version is still the user's."""
+    try:
+        data = jwt.decode(token, _secret_key(), algorithms=["HS256"])
+    except InvalidTokenError:
+        data = {}
+    if data.get("feed") != feed or not isinstance(data.get("version"), int):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid feed token"
+        )
+    return data["user"], data["version"]
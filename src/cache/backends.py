@@ -0,0 +1,104 @@
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None: ...
+
+    async def set_if_newer(self, key: str, value: bytes, ttl: int) -> bool:
+        """Store value unless key holds one of the same or a higher order.
+
+        Values passed here start with their order, a number, and a newline.
+        Returns whether value was stored.
+        """
+        ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+
+def order_of(value: bytes) -> int:
+    return int(value.split(b"\n", 1)[0])
+
+
+class MemoryCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if time.monotonic() > expires:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def set_if_newer(self, key: str, value: bytes, ttl: int) -> bool:
+        # Nothing runs between the check and the write on the event loop.
+        current = await self.get(key)
+        if current is not None and order_of(current) >= order_of(value):
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+
+# The order check and the write happen atomically on the server.
+SET_IF_NEWER = """
+local current = redis.call('GET', KEYS[1])
+if current then
+    local order = tonumber(string.match(current, '^(%d+)\\n'))
+    if order and order >= tonumber(ARGV[2]) then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+
+class RedisCache:
+    """Backend for any client exposing the redis.asyncio get/set/delete/eval
+    API."""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCache":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise ValueError("The redis package is required for the redis cache")
+        return cls(redis.from_url(url))
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def set_if_newer(self, key: str, value: bytes, ttl: int) -> bool:
+        stored = await self.client.eval(
+            SET_IF_NEWER, 1, key, value, order_of(value), ttl
+        )
+        return bool(stored)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
@@ -0,0 +1,59 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+def make_etag(payload: bytes) -> str:
+    return '"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+
+
+def version_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def page_etag(rows) -> str:
+    """ETag of a list page from the (id, version) of each row on it."""
+    versions = ",".join(f"{id}.{version}" for id, version in sorted(rows))
+    return make_etag(versions.encode())
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def if_match_versions(header: str) -> list[int] | None:
+    """Versions named by an If-Match header, or None for "*".
+
+    If-Match uses strong comparison, so weak and foreign tags match nothing.
+    """
+    versions = []
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return None
+        if candidate.startswith('"') and candidate[1:-1].isdigit():
+            versions.append(int(candidate[1:-1]))
+    return versions
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC timestamp for Last-Modified."""
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def not_modified_since(header: str | None, last_modified: str) -> bool:
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
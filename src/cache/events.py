@@ -0,0 +1,114 @@
+from functools import lru_cache
+from typing import NamedTuple
+from cache.backends import CacheBackend, MemoryCache, RedisCache
+from config import get_settings
+
+
+class CachedEvent(NamedTuple):
+    version: int
+    etag: str
+    last_modified: str
+    payload: bytes
+
+
+class EventCache:
+    """Serialized event payloads stored together with their validators.
+
+    A write leaves a marker in place of the entry, so a request that read the
+    event before the write but stores it after cannot put the stale copy
+    back. Backends only store a value over one of a lower order: an entry
+    for version v has order 2v and the marker of a write that made version v
+    has order 2v - 1, so a marker beats every older entry, and only an entry
+    of the new version or a later write replaces it.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(id: int) -> str:
+        return f"event:{id}"
+
+    async def get(self, id: int) -> CachedEvent | None:
+        value = await self.backend.get(self._key(id))
+        if value is None:
+            return None
+        order, rest = value.split(b"\n", 1)
+        if int(order) % 2:
+            return None
+        etag, last_modified, payload = rest.split(b"\n", 2)
+        return CachedEvent(
+            int(order) // 2, etag.decode(), last_modified.decode(), payload
+        )
+
+    async def set(self, id: int, event: CachedEvent) -> bool:
+        """Store event unless a write has made a later version."""
+        value = b"\n".join(
+            (
+                str(2 * event.version).encode(),
+                event.etag.encode(),
+                event.last_modified.encode(),
+                event.payload,
+            )
+        )
+        return await self.backend.set_if_newer(self._key(id), value, self.ttl)
+
+    async def invalidate(self, versions: dict[int, int]) -> None:
+        """Drop the entries of events that writes changed to the given
+        versions, by id."""
+        for id, version in versions.items():
+            marker = str(2 * version - 1).encode() + b"\n"
+            await self.backend.set_if_newer(self._key(id), marker, self.ttl)
+
+
+class FeedCache:
+    """Rendered calendar feeds, each stored with the ETag it was rendered at."""
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(feed: str) -> str:
+        return f"feed:{feed}"
+
+    async def get(self, feed: str, etag: str) -> bytes | None:
+        """The feed as rendered at etag, or None if it was not."""
+        value = await self.backend.get(self._key(feed))
+        if value is None:
+            return None
+        cached_etag, payload = value.split(b"\n", 1)
+        return payload if cached_etag.decode() == etag else None
+
+    async def set(self, feed: str, etag: str, payload: bytes) -> None:
+        value = etag.encode() + b"\n" + payload
+        await self.backend.set(self._key(feed), value, self.ttl)
+
+
+def create_backend(kind: str, size: int | None = None) -> CacheBackend:
+    settings = get_settings()
+    if kind == "memory":
+        return MemoryCache(size or settings.event_cache_size)
+    if kind == "redis":
+        if not settings.event_cache_url:
+            raise ValueError("EVENT_CACHE_URL environment variable is not set")
+        return RedisCache.from_url(settings.event_cache_url)
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+@lru_cache
+def get_event_cache() -> EventCache:
+    settings = get_settings()
+    return EventCache(
+        create_backend(settings.event_cache_backend), settings.event_cache_ttl
+    )
+
+
+@lru_cache
+def get_feed_cache() -> FeedCache:
+    settings = get_settings()
+    backend = create_backend(
+        settings.event_cache_backend, settings.event_feed_cache_size
+    )
+    return FeedCache(backend, settings.event_feed_cache_ttl)
@@ -0,0 +1,114 @@
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+ENV_FILE = Path(__file__).resolve().parent.parent / ".env"
+
+
+class Settings(BaseSettings):
+    """Application configuration, read from the environment and .env.
+
+    Each field is set by the upper-cased environment variable of the same
+    name, e.g. DB_POOL_SIZE for db_pool_size.
+    """
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="ignore")
+
+    # Database
+    database_url_prod: str | None = None
+    database_url_replica: str | None = None
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_warm: int | None = None  # defaults to db_pool_size
+    db_statement_cache_size: int = 100
+    db_statement_timeout_ms: int = 0
+
+    # Authentication
+    secret_key: str | None = None
+    token_cache_size: int = 10000
+    bcrypt_rounds: int = 12
+    hash_executor: Literal["thread", "process"] = "thread"
+    hash_workers: int = Field(default_factory=lambda: os.cpu_count() or 1)
+    hash_max_concurrency: int | None = None  # defaults to hash_workers
+
+    # Events
+    events_page_size: int = 50
+    events_max_page_size: int = 200
+    events_export_batch_size: int = 1000
+    events_max_batch_size: int = 1000
+    events_stats_from_summary: bool = False
+    # Seconds between compactions of the summaries; see database.summaries.
+    events_summary_compact_interval: float = 300
+    events_fast_serialization: bool = False
+    # Occurrences of a series starting this far ahead are checked for conflicts.
+    events_conflict_horizon_days: int = 366
+
+    # Event partitions; see database.partitions
+    events_partition_months_ahead: int = 3
+    events_partition_interval: float = 3600
+    events_partition_lock_timeout_ms: int = 2000
+    events_partition_keep_months: int = 12
+    events_archive_dir: str = "archive"
+
+    # Event change stream
+    event_stream_backend: Literal["postgres", "local"] = "postgres"
+    event_stream_queue_size: int = 100
+    event_stream_heartbeat: float = 15
+
+    # Event cache
+    event_cache_backend: Literal["memory", "redis"] = "memory"
+    event_cache_url: str | None = None
+    event_cache_size: int = 10000
+    event_cache_ttl: int = 300
+
+    # Calendar feeds; rendered feeds are cached in the event cache backend.
+    event_feed_cache_size: int = 1000
+    event_feed_cache_ttl: int = 3600
+    event_feed_past_days: int = 90
+
+    # Rate limiting; limits are "<requests>/<seconds>", empty disables a rule.
+    rate_limit_enabled: bool = True
+    rate_limit_backend: Literal["memory", "redis"] = "memory"
+    rate_limit_url: str | None = None
+    rate_limit_size: int = 100000
+    rate_limit_trust_forwarded: bool = False
+    rate_limit_ip: str = "600/60"
+    rate_limit_auth_ip: str = "20/60"
+    rate_limit_auth_email: str = "5/60"
+    rate_limit_auth_route: str = "50/1"
+
+    # Health checks
+    health_check_timeout: float = 2
+
+    # Outbox worker
+    outbox_concurrency: int = 4
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 10
+    outbox_poll_interval: float = 1.0
+    outbox_metrics_port: int = 0
+
+    # Server; more than one worker needs the redis cache and rate limit
+    # backends and the postgres stream backend, see server.py.
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 1
+    server_graceful_timeout: int = 30
+    server_keep_alive: int = 5
+    server_backlog: int = 2048
+    server_limit_concurrency: int | None = None
+    server_proxy_headers: bool = False
+    server_forwarded_allow_ips: str = "127.0.0.1"
+    server_access_log: bool = False
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
@@ -1,33 +1,162 @@
-import os
-from dotenv import load_dotenv
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, AsyncGenerator, cast
 
-from typing import AsyncGenerator
+from config import get_settings
 from database.base import Base
+from monitoring.timing import instrument_engine
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
     AsyncEngine,
     AsyncSession,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-DATABASE_URL: str = os.getenv("DATABASE_URL_PROD")
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL_PROD environment variable is not set")
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
 
-engine: AsyncEngine = create_async_engine(DATABASE_URL, echo=True)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.wait_max = 0.0
 
-session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_count += 1
+            self.wait_seconds += waited
+            self.wait_max = max(self.wait_max, waited)
+
+
+def create_engine(url: str) -> AsyncEngine:
+    settings = get_settings()
+    connect_args: dict[str, Any] = {
+        "statement_cache_size": settings.db_statement_cache_size
+    }
+    if settings.db_statement_timeout_ms:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(settings.db_statement_timeout_ms)
+        }
+    return create_async_engine(
+        url,
+        echo=settings.db_echo,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+# Engines are built on first use, so importing the app needs no database
+# configuration and starts no connection machinery.
+_engines: dict[str, AsyncEngine] = {}
+
+
+def get_engine() -> AsyncEngine:
+    if "primary" not in _engines:
+        url = get_settings().database_url_prod
+        if not url:
+            raise ValueError("DATABASE_URL_PROD environment variable is not set")
+        _engines["primary"] = create_engine(url)
+        instrument_engine(_engines["primary"], "primary")
+    return _engines["primary"]
+
+
+def get_replica_engine() -> AsyncEngine:
+    url = get_settings().database_url_replica
+    if not url:
+        return get_engine()
+    if "replica" not in _engines:
+        _engines["replica"] = create_engine(url)
+        instrument_engine(_engines["replica"], "replica")
+    return _engines["replica"]
+
+
+def engines() -> dict[str, AsyncEngine]:
+    """The engines created so far, by role."""
+    return dict(_engines)
+
+
+@lru_cache
+def get_session_maker() -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(get_engine(), class_=AsyncSession, expire_on_commit=False)
+
+
+@lru_cache
+def get_read_session_maker() -> async_sessionmaker[AsyncSession]:
+    if get_replica_engine() is get_engine():
+        return get_session_maker()
+    return async_sessionmaker(
+        get_replica_engine(), class_=AsyncSession, expire_on_commit=False
+    )
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with session_maker() as session:
+    async with get_session_maker()() as session:
+        yield session
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    async with get_read_session_maker()() as session:
         yield session
 
 
+def pool_stats(engine: AsyncEngine) -> dict:
+    pool = cast(InstrumentedPool, engine.pool)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "wait_count": pool.wait_count,
+        "wait_seconds": pool.wait_seconds,
+        "wait_max_seconds": pool.wait_max,
+    }
+
+
+async def warm_pool(engine: AsyncEngine, size: int | None = None) -> int:
+    """Open `size` pooled connections so the first requests after a start
+    do not pay for connection setup. Returns how many were opened."""
+    if size is None:
+        settings = get_settings()
+        size = settings.db_pool_warm
+        if size is None:
+            size = settings.db_pool_size
+    connections = []
+
+    async def connect():
+        connection = await engine.connect()
+        connections.append(connection)
+        await connection.execute(text("SELECT 1"))
+
+    # All connections are held until every one is open, otherwise later
+    # checkouts would just reuse the first.
+    results = await asyncio.gather(
+        *(connect() for _ in range(size)), return_exceptions=True
+    )
+    for connection in connections:
+        await connection.close()
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        logger.warning("Connection pool warm-up failed: %r", failures[0])
+    return size - len(failures)
+
+
 async def init_db():
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         # await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
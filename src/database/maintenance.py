@@ -0,0 +1,78 @@
+"""Periodic database upkeep that the app runs in the background.
+
+Every worker of every instance runs the jobs, each in a transaction that
+first takes the job's advisory lock with pg_try_advisory_xact_lock: a run
+that finds it taken skips its turn, so at most one run of a job is under way
+across the deployment. A failed run, or an unreachable database, is logged
+and retried after the job's interval; it never stops the app.
+"""
+
+import asyncio
+import logging
+from functools import partial
+from typing import Awaitable, Callable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import get_settings
+from database.partitions import ensure_partitions
+from database.summaries import compact_summaries
+
+logger = logging.getLogger("maintenance")
+
+# Two-key advisory locks live apart from the single-key ones that
+# scheduling.conflicts takes per location.
+LOCK_SPACE = 1
+
+Job = Callable[[AsyncConnection], Awaitable[object]]
+
+
+async def run_job(engine: AsyncEngine, name: str, job: Job) -> bool:
+    """Run job once and commit, unless another run of it holds the lock."""
+    async with engine.begin() as connection:
+        lock = func.pg_try_advisory_xact_lock(LOCK_SPACE, func.hashtext(name))
+        if not await connection.scalar(select(lock)):
+            return False
+        await job(connection)
+    return True
+
+
+async def run_periodically(
+    engine: AsyncEngine, name: str, interval: float, job: Job
+) -> None:
+    while True:
+        try:
+            await run_job(engine, name, job)
+        except Exception:
+            logger.exception("maintenance job %s failed", name)
+        await asyncio.sleep(interval)
+
+
+def jobs() -> list[tuple[str, float, Job]]:
+    """(name, interval in seconds, job) of each job; intervals of 0 disable."""
+    settings = get_settings()
+    return [
+        (
+            "ensure_partitions",
+            settings.events_partition_interval,
+            partial(
+                ensure_partitions,
+                months_ahead=settings.events_partition_months_ahead,
+                lock_timeout_ms=settings.events_partition_lock_timeout_ms,
+            ),
+        ),
+        (
+            "compact_summaries",
+            settings.events_summary_compact_interval,
+            compact_summaries,
+        ),
+    ]
+
+
+def start_maintenance(engine: AsyncEngine) -> list[asyncio.Task]:
+    return [
+        asyncio.create_task(run_periodically(engine, name, interval, job))
+        for name, interval, job in jobs()
+        if interval > 0
+    ]
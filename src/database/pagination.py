@@ -0,0 +1,78 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, NamedTuple
+from fastapi import HTTPException, status
+
+
+class Cursor(NamedTuple):
+    date: datetime
+    id: int
+    backward: bool = False
+
+
+class SyncToken(NamedTuple):
+    # Changes by transactions from this id on are sent; None sends every
+    # live event, for a client without a copy yet.
+    since: int | None
+    # (change_seq, id) of the last change sent, while paging through a sync.
+    after: tuple[int, int] | None = None
+    # Where the next sync starts once this one is paged through.
+    resume: int | None = None
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode(value: str) -> dict:
+    raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+    return json.loads(raw)
+
+
+def encode_cursor(date: datetime, id: int, backward: bool = False) -> str:
+    payload = {"d": date.isoformat(), "i": id}
+    if backward:
+        payload["b"] = 1
+    return _encode(payload)
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        payload = _decode(cursor)
+        return Cursor(
+            datetime.fromisoformat(payload["d"]),
+            int(payload["i"]),
+            bool(payload.get("b")),
+        )
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def encode_sync_token(token: SyncToken) -> str:
+    payload: dict[str, Any] = {"s": token.since}
+    if token.after:
+        payload["a"] = list(token.after)
+        payload["r"] = token.resume
+    return _encode(payload)
+
+
+def decode_sync_token(token: str) -> SyncToken:
+    try:
+        payload = _decode(token)
+        since, after = payload["s"], payload.get("a")
+        if after:
+            return SyncToken(
+                None if since is None else int(since),
+                (int(after[0]), int(after[1])),
+                int(payload["r"]),
+            )
+        return SyncToken(int(since))
+    except (binascii.Error, ValueError, KeyError, TypeError, IndexError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token"
+        )
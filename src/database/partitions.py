@@ -0,0 +1,296 @@
+"""Monthly partitions of the events table, and archival of past ones.
+
+events is partitioned by RANGE (date): one partition per calendar month,
+named events_pYYYYMM, plus events_default for rows of any month that has
+none. Queries that bound date, such as listings with date_from/date_to and
+the stats endpoints, only scan the partitions in range. Statements about
+one event go through models.events.by_id, which looks its date up in
+event_ids so that they too touch one partition; bulk statements over lists
+of ids probe the id index of every partition.
+
+    PYTHONPATH=src python -m database.partitions ensure
+    PYTHONPATH=src python -m database.partitions archive --dir /var/backups/events
+
+`ensure` creates the partitions up to --months-ahead months past the
+current one, and one for every later month with rows in the default
+partition, moving those rows over. The app also runs it in the background
+every EVENTS_PARTITION_INTERVAL seconds (see database.maintenance). Creating
+a partition locks events against all traffic, so that run gives up after
+EVENTS_PARTITION_LOCK_TIMEOUT_MS rather than queue behind long queries, and
+tries again next time; with partitions made months ahead that is rarely
+needed at all.
+`archive` detaches the partitions of months before the last --keep-months,
+writes each to <dir>/events_pYYYYMM.csv.gz and drops it. Series that still
+recur and events that still run are not archived: they move to the default
+partition, where rows of past months stay. The files hold the partition as
+CSV with a header, which COPY events FROM ... WITH (FORMAT csv, HEADER)
+loads back. Archived events leave no tombstones, so syncing clients keep
+the copies they have.
+"""
+
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import get_settings
+from models.events import Event, EventId
+from models.stats import EventLocationDayCount, EventTagDayCount
+
+logger = logging.getLogger("partitions")
+
+DEFAULT_PARTITION = "events_default"
+PARTITION_NAME = re.compile(r"events_p(\d{4})(\d{2})")
+# Generated columns are left out of copies; Postgres computes them again.
+COLUMNS = [column.name for column in Event.__table__.columns if column.computed is None]
+ATTACHED = text(
+    "SELECT child.relname FROM pg_inherits"
+    " JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid"
+    " WHERE pg_inherits.inhparent = 'events'::regclass"
+)
+DETACHED = text(
+    "SELECT relname FROM pg_class"
+    " WHERE relnamespace = current_schema()::regnamespace"
+    " AND relkind = 'r' AND NOT relispartition"
+    " AND relname ~ '^events_p[0-9]{6}$' ORDER BY relname"
+)
+DEFAULT_MONTHS = text(
+    f"SELECT DISTINCT date_trunc('month', date) FROM {DEFAULT_PARTITION}"
+    " WHERE date >= CAST(:first AS date)"
+)
+# Rows of a past month that are still live at before.
+LIVE = (
+    "(rrule IS NOT NULL AND (recurrence_end IS NULL"
+    " OR recurrence_end >= CAST(:before AS date)))"
+    " OR end_date >= CAST(:before AS date)"
+)
+
+
+def is_partition(name: str) -> bool:
+    return name == DEFAULT_PARTITION or PARTITION_NAME.fullmatch(name) is not None
+
+
+def partition_name(month: date) -> str:
+    return f"events_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> date:
+    match = PARTITION_NAME.fullmatch(name)
+    if match is None:
+        raise ValueError(f"Not a monthly partition: {name}")
+    year, month = match.groups()
+    return date(int(year), int(month), 1)
+
+
+def add_months(month: date, months: int) -> date:
+    year, index = divmod(month.year * 12 + month.month - 1 + months, 12)
+    return date(year, index + 1, 1)
+
+
+def current_month() -> date:
+    # Event dates are naive UTC.
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+async def _missing(connection: AsyncConnection, first: date, last: date) -> list[date]:
+    months, month = set(), first
+    while month <= last:
+        months.add(month)
+        month = add_months(month, 1)
+    # Past months stay in the default partition: archive moves live rows of
+    # detached months there, and must not get them back in a partition.
+    rows = await connection.execute(DEFAULT_MONTHS, {"first": first})
+    months.update(row[0].date() for row in rows)
+    existing = set((await connection.execute(ATTACHED)).scalars())
+    return sorted(month for month in months if partition_name(month) not in existing)
+
+
+async def _create_partition(connection: AsyncConnection, month: date) -> None:
+    end = add_months(month, 1)
+    in_month = f"date >= '{month}' AND date < '{end}'"
+    columns = ", ".join(COLUMNS)
+    # A new partition may not overlap rows left in the default one, so they
+    # move out first and back in through events; the summary trigger's
+    # decrements and increments for them cancel out.
+    await connection.execute(
+        text(
+            f"CREATE TEMPORARY TABLE events_moving AS"
+            f" SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {in_month}"
+        )
+    )
+    await connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+    await connection.execute(
+        text(
+            f"CREATE TABLE {partition_name(month)} PARTITION OF events"
+            f" FOR VALUES FROM ('{month}') TO ('{end}')"
+        )
+    )
+    await connection.execute(
+        text(f"INSERT INTO events ({columns}) SELECT {columns} FROM events_moving")
+    )
+    await connection.execute(text("DROP TABLE events_moving"))
+
+
+async def ensure_partitions(
+    connection: AsyncConnection,
+    months_ahead: int,
+    today: date | None = None,
+    lock_timeout_ms: int | None = None,
+) -> list[str]:
+    """Create the partitions that are missing; the caller commits.
+
+    Returns the names of the partitions created.
+    """
+    first = (today or current_month()).replace(day=1)
+    last = add_months(first, months_ahead)
+    if not await _missing(connection, first, last):
+        return []
+    if lock_timeout_ms:
+        await connection.execute(
+            text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}")
+        )
+    # Keeps writers out of the default partition while rows leave it, and
+    # serializes concurrent runs.
+    await connection.execute(text("LOCK TABLE events IN ACCESS EXCLUSIVE MODE"))
+    months = await _missing(connection, first, last)
+    for month in months:
+        await _create_partition(connection, month)
+    return [partition_name(month) for month in months]
+
+
+async def detach_partitions(connection: AsyncConnection, before: date) -> list[str]:
+    """Detach the partitions of months ending by before; the caller commits.
+
+    Rows still live at before stay in events.
+    """
+    names = sorted(
+        name
+        for name in (await connection.execute(ATTACHED)).scalars()
+        if PARTITION_NAME.fullmatch(name)
+        and add_months(partition_month(name), 1) <= before
+    )
+    for name in names:
+        month = partition_month(name)
+        await connection.execute(text(f"ALTER TABLE events DETACH PARTITION {name}"))
+        # Detaching fires no triggers. The ids of the rows go; partitions
+        # hold whole days, so the summaries of those days go with them.
+        await connection.execute(
+            delete(EventId).where(EventId.id.in_(text(f"SELECT id FROM {name}")))
+        )
+        for table in (EventLocationDayCount, EventTagDayCount):
+            await connection.execute(
+                delete(table).where(
+                    table.day >= month, table.day < add_months(month, 1)
+                )
+            )
+        # A series started in the month may still recur, and an event may run
+        # past before. No partition covers the month any more, so they go
+        # back through events into the default one, counted again.
+        columns = ", ".join(COLUMNS)
+        parameters = {"before": before}
+        await connection.execute(
+            text(
+                f"INSERT INTO events ({columns})"
+                f" SELECT {columns} FROM {name} WHERE {LIVE}"
+            ),
+            parameters,
+        )
+        await connection.execute(text(f"DELETE FROM {name} WHERE {LIVE}"), parameters)
+    return names
+
+
+async def write_archive(
+    connection: AsyncConnection, name: str, directory: Path
+) -> Path:
+    path = directory / f"{name}.csv.gz"
+    partial = directory / f"{name}.csv.gz.partial"
+    driver = (await connection.get_raw_connection()).driver_connection
+    assert driver is not None
+    with open(partial, "wb") as file:
+        with gzip.GzipFile(fileobj=file, mode="wb") as archive:
+            await driver.copy_from_table(
+                name, columns=COLUMNS, output=archive, format="csv", header=True
+            )
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(partial, path)
+    return path
+
+
+async def archive_partitions(
+    engine: AsyncEngine, before: date, directory: Path
+) -> list[Path]:
+    """Detach, archive and drop the partitions of months ending by before."""
+    directory.mkdir(parents=True, exist_ok=True)
+    async with engine.begin() as connection:
+        await detach_partitions(connection, before)
+    paths = []
+    # Also finishes partitions that a failed run detached but did not drop.
+    async with engine.connect() as connection:
+        for name in (await connection.execute(DETACHED)).scalars().all():
+            paths.append(await write_archive(connection, name, directory))
+            await connection.execute(text(f"DROP TABLE {name}"))
+            await connection.commit()
+            logger.info("archived %s to %s", name, paths[-1])
+    return paths
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        description="Maintain the monthly partitions of events."
+    )
+    parser.add_argument(
+        "--database-url",
+        default=settings.database_url_prod,
+        help="defaults to DATABASE_URL_PROD",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="create upcoming partitions")
+    ensure.add_argument(
+        "--months-ahead", type=int, default=settings.events_partition_months_ahead
+    )
+    archive = commands.add_parser("archive", help="archive and drop old partitions")
+    archive.add_argument(
+        "--keep-months",
+        type=int,
+        default=settings.events_partition_keep_months,
+        help="full months before the current one to keep",
+    )
+    archive.add_argument("--dir", type=Path, default=Path(settings.events_archive_dir))
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL_PROD is required")
+    return args
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_async_engine(args.database_url, poolclass=NullPool)
+    try:
+        if args.command == "ensure":
+            async with engine.begin() as connection:
+                created = await ensure_partitions(connection, args.months_ahead)
+            logger.info("created %s partitions", len(created))
+        else:
+            before = add_months(current_month(), -args.keep_months)
+            paths = await archive_partitions(engine, before, args.dir)
+            logger.info("archived %s partitions", len(paths))
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from sqlalchemy import ColumnElement, Select, func, select, literal
+from models.events import Event
+
+SEARCH_CONFIG = "english"
+
+
+def build_search_query(
+    q: str | None = None,
+    tags_all: list[str] | None = None,
+    tags_any: list[str] | None = None,
+    location_prefix: str | None = None,
+    limit: int = 50,
+    columns: tuple | None = None,
+) -> Select:
+    if q:
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        rank: ColumnElement = func.ts_rank_cd(Event.search_vector, query)
+    else:
+        rank = literal(None)
+    statement = select(*(columns or (Event,)), rank.label("rank")).where(
+        Event.deleted_at.is_(None)
+    )
+    if q:
+        statement = statement.where(Event.search_vector.op("@@")(query))
+    if tags_all:
+        statement = statement.where(Event.tags.contains(tags_all))
+    if tags_any:
+        statement = statement.where(Event.tags.overlap(tags_any))
+    if location_prefix:
+        statement = statement.where(
+            Event.location.startswith(location_prefix, autoescape=True)
+        )
+    if q:
+        statement = statement.order_by(rank.desc(), Event.date, Event.id)
+    else:
+        statement = statement.order_by(Event.date, Event.id)
+    return statement.limit(limit)
@@ -0,0 +1,81 @@
+"""Compaction of the per-day event summaries.
+
+Writes to events append their changes to event_location_day_counts and
+event_tag_day_counts as rows of their own (see models.stats), so both tables
+grow with every write. Compaction replaces the rows of each day and key with
+one holding their sum and drops the keys that sum to zero. The app runs it
+in the background (see database.maintenance); it can also be run by hand:
+
+    PYTHONPATH=src python -m database.summaries
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import get_settings
+from models.stats import EventLocationDayCount, EventTagDayCount
+
+logger = logging.getLogger("summaries")
+
+SUMMARIES = (
+    (EventLocationDayCount.__tablename__, "location"),
+    (EventTagDayCount.__tablename__, "tag"),
+)
+
+
+def _compact(table: str, key: str):
+    # DELETE only takes the rows its snapshot sees, so deltas that writers
+    # append meanwhile are left for the next run rather than lost.
+    return text(
+        f"WITH merged AS ("
+        f" DELETE FROM {table} WHERE (day, {key}) IN ("
+        f"  SELECT day, {key} FROM {table}"
+        f"  GROUP BY day, {key} HAVING count(*) > 1 OR sum(count) = 0"
+        f" ) RETURNING day, {key}, count"
+        f") INSERT INTO {table} (day, {key}, count)"
+        f" SELECT day, {key}, sum(count) FROM merged"
+        f" GROUP BY day, {key} HAVING sum(count) <> 0"
+    )
+
+
+async def compact_summaries(connection: AsyncConnection) -> None:
+    """Merge the rows of each summary key; the caller commits."""
+    for table, key in SUMMARIES:
+        await connection.execute(_compact(table, key))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compact the event summaries.")
+    parser.add_argument(
+        "--database-url",
+        default=get_settings().database_url_prod,
+        help="defaults to DATABASE_URL_PROD",
+    )
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL_PROD is required")
+    return args
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_async_engine(args.database_url, poolclass=NullPool)
+    try:
+        async with engine.begin() as connection:
+            await compact_summaries(connection)
+        logger.info("compacted the event summaries")
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
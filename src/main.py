@@ -1,22 +1,55 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
-from database.connection import init_db
+from config import get_settings
+from database.connection import engines, get_engine, get_replica_engine, warm_pool
+from database.maintenance import start_maintenance
+from middleware.rate_limit import RateLimitMiddleware
+from middleware.timing import TimingMiddleware
 from routes.events import event_router
-from routes.users import user_router
-
-import uvicorn
-
-app = FastAPI()
+from routes.users import hash_password, user_router
+from routes.health import health_router
+from routes.metrics import metrics_router
+from streaming.changes import close_change_stream, shutdown_change_stream
+
+
+def begin_shutdown() -> None:
+    """Runs as soon as the server is told to stop. The lifespan shutdown only
+    runs once in-flight requests have finished, and open change streams
+    would not finish by themselves."""
+    shutdown_change_stream()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_pool(get_engine())
+    if get_settings().database_url_replica:
+        await warm_pool(get_replica_engine())
+    # Creates the event partitions among other jobs; a database that is
+    # down only delays them.
+    maintenance = start_maintenance(get_engine())
+    yield
+    # Runs after the server has drained in-flight requests.
+    for task in maintenance:
+        task.cancel()
+    await asyncio.gather(*maintenance, return_exceptions=True)
+    await close_change_stream()
+    for engine in engines().values():
+        await engine.dispose()
+    hash_password.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(TimingMiddleware)
 
 
 # Register routes
 app.include_router(event_router, prefix="/event")
 app.include_router(user_router, prefix="/user")
-
-
-# @app.on_event("startup")
-# async def on_startup():
-#     await init_db()
+app.include_router(metrics_router)
+app.include_router(health_router, prefix="/health")
 
 
 @app.get("/")
@@ -25,4 +58,6 @@ async def home():
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,266 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Protocol
+from urllib.parse import parse_qs
+
+from config import get_settings
+from monitoring.prometheus import Counter
+
+AUTH_PATHS = frozenset({"/user/signin", "/user/signup"})
+# Probes and scrapes come from infrastructure and must never be throttled.
+EXEMPT_PATHS = frozenset({"/health/live", "/health/ready", "/metrics"})
+MAX_BUFFERED_BODY = 64 * 1024
+
+rate_limit_rejections_total = Counter(
+    "rate_limit_rejections_total", "Requests rejected by rate limits.", ("rule",)
+)
+
+
+class Limit(NamedTuple):
+    rate: float  # tokens added per second
+    burst: int  # bucket capacity
+
+    @classmethod
+    def parse(cls, value: str) -> "Limit | None":
+        if not value:
+            return None
+        count, _, seconds = value.partition("/")
+        burst, period = int(count), float(seconds or 1)
+        # A zero rate would never refill and divide by zero in the backends.
+        if burst <= 0 or not 0 < period < math.inf:
+            raise ValueError(f"Invalid rate limit: {value!r}")
+        return cls(rate=burst / period, burst=burst)
+
+
+class Rule(NamedTuple):
+    name: str
+    key: str  # "ip", "email" or "route"
+    limit: Limit
+    paths: frozenset[str] | None = None  # None applies the rule to every path
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, limit: Limit) -> float:
+        """Take a token; returns 0 on success, else seconds until one is free."""
+        ...
+
+
+class MemoryBuckets:
+    """Token buckets for a single process.
+
+    Each bucket is refilled lazily from its last update time, so a check is
+    O(1). Least recently used buckets beyond maxsize are dropped, which only
+    ever resets a bucket to full.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Runs atomically on the server, so every worker shares one bucket per key.
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    """Token buckets shared by all workers, for any client exposing the
+    redis.asyncio eval API."""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBuckets":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise ValueError("The redis package is required for the redis backend")
+        return cls(redis.from_url(url))
+
+    async def take(self, key: str, limit: Limit) -> float:
+        wait = await self.client.eval(TAKE_SCRIPT, 1, key, limit.rate, limit.burst)
+        return float(wait)
+
+
+def create_backend(kind: str) -> RateLimitBackend:
+    settings = get_settings()
+    if kind == "memory":
+        return MemoryBuckets(settings.rate_limit_size)
+    if kind == "redis":
+        if not settings.rate_limit_url:
+            raise ValueError("RATE_LIMIT_URL must be set for the redis backend")
+        return RedisBuckets.from_url(settings.rate_limit_url)
+    raise ValueError(f"Unknown rate limit backend: {kind}")
+
+
+def default_rules() -> list[Rule]:
+    settings = get_settings()
+    rules = [
+        ("ip", "ip", settings.rate_limit_ip, None),
+        ("auth_ip", "ip", settings.rate_limit_auth_ip, AUTH_PATHS),
+        ("auth_email", "email", settings.rate_limit_auth_email, AUTH_PATHS),
+        ("auth_route", "route", settings.rate_limit_auth_route, AUTH_PATHS),
+    ]
+    return [
+        Rule(name, key, limit, paths)
+        for name, key, value, paths in rules
+        if (limit := Limit.parse(value))
+    ]
+
+
+def _header(scope, name: bytes) -> str | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _client_ip(scope) -> str | None:
+    if get_settings().rate_limit_trust_forwarded:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            # The last entry is the one our own proxy appended.
+            return forwarded.rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _email(scope, body: bytes) -> str | None:
+    content_type = (_header(scope, b"content-type") or "").split(";")[0].strip()
+    try:
+        if content_type == "application/json":
+            data = json.loads(body)
+            email = data.get("email") if isinstance(data, dict) else None
+        elif content_type == "application/x-www-form-urlencoded":
+            email = parse_qs(body.decode("latin-1")).get("username", [None])[0]
+        else:
+            return None
+    except ValueError:
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+async def _buffer_body(receive):
+    """Read the request body so it can be inspected, then replay it to the
+    app. Bodies larger than MAX_BUFFERED_BODY are replayed but not parsed."""
+    messages, size, more_body = [], 0, True
+    while more_body and size <= MAX_BUFFERED_BODY:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        size += len(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    body = None
+    if not more_body:
+        body = b"".join(message.get("body", b"") for message in messages)
+
+    async def replay():
+        if messages:
+            return messages.pop(0)
+        return await receive()
+
+    return body, replay
+
+
+class RateLimitMiddleware:
+    """Token-bucket limits per client IP, per login email and per route.
+
+    Requests over a limit get 429 with Retry-After before the app runs, so a
+    rejected sign-in costs neither a database lookup nor a password hash.
+    """
+
+    def __init__(
+        self,
+        app,
+        rules: list[Rule] | None = None,
+        backend: RateLimitBackend | None = None,
+    ):
+        self.app = app
+        self.rules = default_rules() if rules is None else rules
+        self.backend = (
+            create_backend(get_settings().rate_limit_backend)
+            if backend is None
+            else backend
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not get_settings().rate_limit_enabled
+            or scope["path"] in EXEMPT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        rules = [
+            rule for rule in self.rules if rule.paths is None or path in rule.paths
+        ]
+        keys = {"ip": _client_ip(scope), "route": path, "email": None}
+        if any(rule.key == "email" for rule in rules):
+            body, receive = await _buffer_body(receive)
+            if body is not None:
+                keys["email"] = _email(scope, body)
+
+        for rule in rules:
+            value = keys[rule.key]
+            if value is None:
+                continue
+            wait = await self.backend.take(f"ratelimit:{rule.name}:{value}", rule.limit)
+            if wait:
+                rate_limit_rejections_total.inc(rule=rule.name)
+                await self._reject(send, wait)
+                return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    async def _reject(send, wait: float) -> None:
+        body = b'{"detail":"Too many requests"}'
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(wait)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,78 @@
+import time
+
+from monitoring.prometheus import Counter, Histogram
+from monitoring.timing import start_request
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests handled.", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent.",
+    ("method", "route"),
+)
+http_request_phase_duration = Histogram(
+    "http_request_phase_seconds",
+    "Time spent per request phase (auth, db, serialize).",
+    ("route", "phase"),
+)
+http_request_queries = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request.",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+
+
+class TimingMiddleware:
+    """Records per-route latency and adds a Server-Timing header with the
+    auth, db and serialize phases of the request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total = time.perf_counter() - timings.start
+                entries = [
+                    f"{name};dur={seconds * 1000:.2f}"
+                    for name, seconds in timings.phases.items()
+                ]
+                if timings.queries:
+                    entries.append(f'queries;desc="{timings.queries}"')
+                entries.append(f"total;dur={total * 1000:.2f}")
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(entries).encode()))
+                message = {**message, "headers": headers}
+                self._observe(scope, timings, total)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = self._route(scope)
+            http_requests_total.inc(
+                method=scope["method"], route=route, status=str(status_code)
+            )
+
+    @staticmethod
+    def _route(scope) -> str:
+        route = scope.get("route")
+        return getattr(route, "path", "unmatched")
+
+    def _observe(self, scope, timings, total: float) -> None:
+        route = self._route(scope)
+        http_request_duration.observe(total, method=scope["method"], route=route)
+        http_request_queries.observe(timings.queries, route=route)
+        for name, seconds in timings.phases.items():
+            http_request_phase_duration.observe(seconds, route=route, phase=name)
@@ -1,8 +1,44 @@
-from pydantic import BaseModel
+from pydantic import (
+    BaseModel,
+    Field,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
 from database.base import Base
-from sqlalchemy import ARRAY, String, DateTime
+from scheduling.recurrence import parse_rrule
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Computed,
+    String,
+    DateTime,
+    Index,
+    Integer,
+    Text,
+    cast,
+    func,
+    event,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSRANGE, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Any
+
+
+class EventOverride(BaseModel):
+    """Changes to a single occurrence of a recurring event."""
+
+    title: str | None = None
+    date: datetime | None = None
+    description: str | None = None
+    tags: list[str] | None = None
+    location: str | None = None
+
+    class Config:
+        extra = "forbid"
 
 
 class EventRequest(BaseModel):
@@ -11,6 +47,27 @@ class EventRequest(BaseModel):
     description: str
     tags: list[str]
     location: str
+    # Events without an end take up the instant they start.
+    end_date: datetime | None = None
+    rrule: str | None = None
+    exdates: list[datetime] = []
+    # Keyed by the original start of the occurrence they change.
+    overrides: dict[datetime, EventOverride] = {}
+
+    @field_validator("rrule")
+    @classmethod
+    def check_rrule(cls, value: str | None) -> str | None:
+        if value is not None:
+            parse_rrule(value)
+        return value
+
+    @field_serializer("overrides")
+    def serialize_overrides(self, overrides: dict) -> dict:
+        # Stored as JSONB, so keep the dump JSON-ready in every mode.
+        return {
+            start.isoformat(): override.model_dump(mode="json", exclude_none=True)
+            for start, override in overrides.items()
+        }
 
     class Config:
         schema_extra = {
@@ -20,12 +77,23 @@ class EventRequest(BaseModel):
                 "description": "Event description",
                 "tags": ["tag1", "tag2"],
                 "location": "online",
+                "end_date": "2024-08-28T15:38:04",
+                "rrule": "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10",
+                "exdates": ["2024-09-02T14:38:04"],
+                "overrides": {"2024-09-04T14:38:04": {"location": "room 2"}},
             }
         }
 
 
 class EventCreate(EventRequest):
-    pass
+    # Sets end_date relative to date instead.
+    duration: timedelta | None = Field(None, gt=timedelta(0))
+
+    @model_validator(mode="after")
+    def check_end(self) -> "EventCreate":
+        if self.duration is not None and self.end_date is not None:
+            raise ValueError("Supply end_date or duration, not both")
+        return self
 
 
 class EventUpdate(EventCreate):
@@ -36,13 +104,201 @@ class EventUpdate(EventCreate):
     location: str | None = None
 
 
+class EventBulkUpdate(EventUpdate):
+    id: int
+
+
+class BulkResult(BaseModel):
+    id: int | None = None
+    status: int
+    detail: str
+
+
+class EventSearchResult(EventRequest):
+    id: int
+    rank: float | None = None
+
+
+class EventOccurrence(EventRequest):
+    id: int
+    # Start of the occurrence before any override moved it.
+    occurrence: datetime
+
+
+class EventChange(EventRequest):
+    id: int
+    version: int
+
+
+class EventSync(BaseModel):
+    events: list[EventChange]
+    deleted: list[int]
+    token: str
+    has_more: bool
+
+
+class EventFeed(BaseModel):
+    token: str
+    url: str
+
+
+class EventPage(BaseModel):
+    items: list[EventRequest]
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+
+
+def utc_now():
+    return func.timezone("utc", func.now())
+
+
+def current_xid():
+    return cast(cast(func.pg_current_xact_id(), Text), BigInteger)
+
+
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_date_id", "date", "id"),
+        Index("ix_events_location_date_id", "location", "date", "id"),
+        Index("ix_events_creator_date_id", "creator", "date", "id"),
+        # Recurring series are looked up apart from single events.
+        Index(
+            "ix_events_series_date", "date", postgresql_where=text("rrule IS NOT NULL")
+        ),
+        Index("ix_events_change_seq_id", "change_seq", "id"),
+        Index(
+            "ix_events_during",
+            "during",
+            postgresql_using="gist",
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index("ix_events_tags", "tags", postgresql_using="gin"),
+        Index("ix_events_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_events_location_pattern",
+            "location",
+            postgresql_ops={"location": "varchar_pattern_ops"},
+        ),
+        # Monthly partitions, see database.partitions. Postgres requires the
+        # partition key in the primary key; rows are still identified by id,
+        # which event_ids keeps unique.
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     creator: Mapped[str] = mapped_column(String(32))
     title: Mapped[str] = mapped_column(String(64))
-    date: Mapped[datetime] = mapped_column(DateTime)
+    date: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
     description: Mapped[str] = mapped_column(String(256))
     tags: Mapped[list[str]] = mapped_column(ARRAY(String(16)))
     location: Mapped[str] = mapped_column(String(64))
+    end_date: Mapped[datetime | None] = mapped_column(DateTime)
+    rrule: Mapped[str | None] = mapped_column(String(256))
+    # Latest start of any occurrence, None for series without an end.
+    recurrence_end: Mapped[datetime | None] = mapped_column(DateTime)
+    exdates: Mapped[list[datetime]] = mapped_column(
+        ARRAY(DateTime), default=list, server_default="{}"
+    )
+    overrides: Mapped[dict] = mapped_column(JSONB, default=dict, server_default="{}")
+    # Bumped by every change; the event's ETag and If-Match check it.
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=utc_now())
+    # Deleted events stay behind as tombstones so syncing clients learn of them.
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # Id of the transaction that last wrote the row. Unlike a sequence value
+    # it tells a sync which rows may still be joined by rows from
+    # transactions that commit later; see routes.events.sync_events.
+    change_seq: Mapped[int] = mapped_column(
+        BigInteger, server_default=text("(pg_current_xact_id()::text::bigint)")
+    )
+    search_vector: Mapped[Any] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', description), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+    # The time the event takes up, for overlap checks; see scheduling.conflicts.
+    # Deferred columns stay last: one between loaded columns shifted the
+    # attributes of ORM UPDATE ... RETURNING rows under concurrent requests.
+    during: Mapped[Any] = mapped_column(
+        TSRANGE,
+        Computed(
+            "tsrange(date, coalesce(end_date, date), "
+            "CASE WHEN end_date IS NULL THEN '[]' ELSE '[)' END)",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# Holds rows whose month has no partition yet.
+event.listen(
+    Event.__table__,
+    "after_create",
+    DDL("CREATE TABLE events_default PARTITION OF events DEFAULT"),
+)
+
+
+class EventId(Base):
+    """The date, and so the partition, of every event by id.
+
+    The primary key of events includes date, so nothing there keeps ids
+    unique, and a lookup by id alone probes the index of every partition.
+    This table does both jobs: its primary key rejects a second row with an
+    id, and `by_id` turns the id into the date Postgres prunes partitions
+    with. A trigger keeps it in step with events; detaching a partition
+    fires none, see database.partitions.
+    """
+
+    __tablename__ = "event_ids"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    date: Mapped[datetime] = mapped_column(DateTime)
+
+
+def by_id(id) -> list:
+    """Criteria for the event with id that scan a single partition."""
+    date = select(EventId.date).where(EventId.id == id).scalar_subquery()
+    return [Event.id == id, Event.date == date]
+
+
+# Rows that move between partitions are deleted from one and inserted into
+# the other, which fires the DELETE and INSERT branches.
+EVENT_IDS_FUNCTION = DDL(
+    """
+    CREATE OR REPLACE FUNCTION events_ids_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM event_ids WHERE id = OLD.id;
+        ELSIF TG_OP = 'INSERT' THEN
+            INSERT INTO event_ids (id, date) VALUES (NEW.id, NEW.date);
+        ELSIF NEW.date <> OLD.date THEN
+            UPDATE event_ids SET date = NEW.date WHERE id = NEW.id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """
+)
+
+EVENT_IDS_TRIGGER = DDL(
+    """
+    CREATE TRIGGER events_ids_refresh
+    AFTER INSERT OR DELETE OR UPDATE OF date ON events
+    FOR EACH ROW EXECUTE FUNCTION events_ids_refresh()
+    """
+)
+
+event.listen(Event.__table__, "after_create", EVENT_IDS_FUNCTION)
+event.listen(Event.__table__, "after_create", EVENT_IDS_TRIGGER)
+event.listen(
+    Event.__table__,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS events_ids_refresh()"),
+)
@@ -0,0 +1,101 @@
+"""iCalendar (RFC 5545) rendering of events for calendar feeds.
+
+Each event becomes a VEVENT. A recurring series carries its RRULE and
+EXDATEs, and every overridden occurrence follows as a VEVENT of its own
+with the same UID and a RECURRENCE-ID. Dates are stored as naive UTC, so
+they are written in UTC form.
+"""
+
+from datetime import datetime
+
+PRODID = "-//planner//events//EN"
+CALENDAR_END = b"END:VCALENDAR\r\n"
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _line(name: str, value: str) -> bytes:
+    """A content line, folded into lines of at most 75 octets."""
+    line = f"{name}:{value}".encode()
+    folded, start, width = [], 0, 75
+    while len(line) - start > width:
+        end = start + width
+        # Never split a UTF-8 sequence.
+        while line[end] & 0xC0 == 0x80:
+            end -= 1
+        folded.append(line[start:end])
+        # Continuation lines start with a space, which takes an octet.
+        start, width = end, 74
+    folded.append(line[start:])
+    return b"\r\n ".join(folded) + b"\r\n"
+
+
+def calendar_start(name: str) -> bytes:
+    return b"".join(
+        (
+            _line("BEGIN", "VCALENDAR"),
+            _line("VERSION", "2.0"),
+            _line("PRODID", PRODID),
+            _line("CALSCALE", "GREGORIAN"),
+            _line("METHOD", "PUBLISH"),
+            _line("X-WR-CALNAME", _escape(name)),
+        )
+    )
+
+
+def _vevent(event, fields: dict, start: datetime, extra: list[bytes]) -> bytes:
+    lines = [
+        _line("BEGIN", "VEVENT"),
+        _line("UID", f"event-{event.id}@planner"),
+        _line("DTSTAMP", _timestamp(event.updated_at)),
+        _line("LAST-MODIFIED", _timestamp(event.updated_at)),
+        _line("SEQUENCE", str(event.version - 1)),
+        _line("DTSTART", _timestamp(start)),
+    ]
+    if event.end_date is not None:
+        end = start + (event.end_date - event.date)
+        lines.append(_line("DTEND", _timestamp(end)))
+    lines += [
+        _line("SUMMARY", _escape(fields["title"])),
+        _line("DESCRIPTION", _escape(fields["description"])),
+        _line("LOCATION", _escape(fields["location"])),
+    ]
+    if fields["tags"]:
+        lines.append(_line("CATEGORIES", ",".join(map(_escape, fields["tags"]))))
+    lines += extra
+    lines.append(_line("END", "VEVENT"))
+    return b"".join(lines)
+
+
+def render_event(event) -> bytes:
+    """The VEVENTs of an event row, including its overridden occurrences."""
+    fields = {
+        "title": event.title,
+        "description": event.description,
+        "location": event.location,
+        "tags": event.tags,
+    }
+    extra = []
+    if event.rrule is not None:
+        extra.append(_line("RRULE", event.rrule.strip().removeprefix("RRULE:")))
+        if event.exdates:
+            extra.append(_line("EXDATE", ",".join(map(_timestamp, event.exdates))))
+    rendered = [_vevent(event, fields, event.date, extra)]
+    for original, changes in (event.overrides or {}).items():
+        original = datetime.fromisoformat(original)
+        start = datetime.fromisoformat(changes.get("date", original.isoformat()))
+        recurrence_id = [_line("RECURRENCE-ID", _timestamp(original))]
+        rendered.append(_vevent(event, {**fields, **changes}, start, recurrence_id))
+    return b"".join(rendered)
@@ -0,0 +1,30 @@
+import json
+from datetime import datetime
+from models.events import Event, EventRequest
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+# Column order matches the EventRequest schema so rows can be zipped into it.
+EVENT_FIELDS: tuple[str, ...] = tuple(EventRequest.model_fields)
+EVENT_COLUMNS = tuple(getattr(Event, field) for field in EVENT_FIELDS)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(
+        value, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def event_row_to_dict(row) -> dict:
+    return dict(zip(EVENT_FIELDS, row))
@@ -0,0 +1,100 @@
+from pydantic import BaseModel
+from database.base import Base
+from sqlalchemy import DDL, BigInteger, Date, Index, Integer, String, event
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date, datetime
+from models.events import Event
+
+
+class EventBucketStats(BaseModel):
+    bucket: datetime
+    count: int
+    ids: list[int] | None = None
+
+
+class EventGroupStats(BaseModel):
+    key: str
+    count: int
+    ids: list[int] | None = None
+
+
+class EventLocationDayCount(Base):
+    __tablename__ = "event_location_day_counts"
+    __table_args__ = (
+        Index("ix_event_location_day_counts_day_location", "day", "location"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[date] = mapped_column(Date)
+    location: Mapped[str] = mapped_column(String(64))
+    count: Mapped[int] = mapped_column(Integer)
+
+
+class EventTagDayCount(Base):
+    __tablename__ = "event_tag_day_counts"
+    __table_args__ = (Index("ix_event_tag_day_counts_day_tag", "day", "tag"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[date] = mapped_column(Date)
+    tag: Mapped[str] = mapped_column(String(16))
+    count: Mapped[int] = mapped_column(Integer)
+
+
+# Keeps the per-day summaries in step with every write to events, including
+# bulk statements, in the writing transaction. Tombstones are not counted and
+# neither are series, which the stats endpoints expand over their window.
+# Each write only appends its changes to the counts as rows of their own, so
+# writers never wait on one another's counters; readers sum the rows and
+# database.summaries compacts them in the background.
+# Migrations keep their own copies; tests/test_migrations.py checks that the
+# latest ones match these.
+SUMMARY_FUNCTION = DDL(
+    """
+    CREATE OR REPLACE FUNCTION events_summary_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE'
+            AND OLD.date::date = NEW.date::date
+            AND OLD.location = NEW.location
+            AND OLD.tags = NEW.tags
+            AND (OLD.rrule IS NULL) = (NEW.rrule IS NULL)
+            AND (OLD.deleted_at IS NULL) = (NEW.deleted_at IS NULL) THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE')
+            AND OLD.deleted_at IS NULL AND OLD.rrule IS NULL THEN
+            INSERT INTO event_location_day_counts (day, location, count)
+            VALUES (OLD.date::date, OLD.location, -1);
+            INSERT INTO event_tag_day_counts (day, tag, count)
+            SELECT OLD.date::date, tag, -count(*) FROM unnest(OLD.tags) AS tag
+            GROUP BY tag;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE')
+            AND NEW.deleted_at IS NULL AND NEW.rrule IS NULL THEN
+            INSERT INTO event_location_day_counts (day, location, count)
+            VALUES (NEW.date::date, NEW.location, 1);
+            INSERT INTO event_tag_day_counts (day, tag, count)
+            SELECT NEW.date::date, tag, count(*) FROM unnest(NEW.tags) AS tag
+            GROUP BY tag;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """
+)
+
+SUMMARY_TRIGGER = DDL(
+    """
+    CREATE TRIGGER events_summary_refresh
+    AFTER INSERT OR DELETE OR UPDATE OF date, location, tags, rrule, deleted_at
+    ON events
+    FOR EACH ROW EXECUTE FUNCTION events_summary_refresh()
+    """
+)
+
+event.listen(Event.__table__, "after_create", SUMMARY_FUNCTION)
+event.listen(Event.__table__, "after_create", SUMMARY_TRIGGER)
+event.listen(
+    Event.__table__,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS events_summary_refresh()"),
+)
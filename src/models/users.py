@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from database.base import Base
-from sqlalchemy import String
+from sqlalchemy import Index, Integer, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 
@@ -30,5 +30,13 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    email: Mapped[str] = mapped_column(String(32), unique=True)
+    email: Mapped[str] = mapped_column(String(32))
     password: Mapped[str] = mapped_column(String(72))
+    # Feed tokens carry it; bumping it revokes every feed URL the user got.
+    feed_token_version: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0"
+    )
+
+
+# Emails are unique and looked up regardless of case.
+Index("ix_users_email_lower", func.lower(User.email), unique=True)
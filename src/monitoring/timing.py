@@ -0,0 +1,114 @@
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterator
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from monitoring.prometheus import Counter, Histogram
+
+db_queries_total = Counter("db_queries_total", "SQL statements executed.", ("engine",))
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time.", ("engine",)
+)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.queries = 0
+        self.endpoint_done: float | None = None
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class TimedRoute(APIRoute):
+    """Marks when the endpoint returns, so that the remaining time spent in
+    the route (response model validation and encoding) counts as serialize."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        call = self.dependant.call
+        if not inspect.iscoroutinefunction(call):
+            return
+
+        @wraps(call)
+        async def timed_call(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                timings = _current.get()
+                if timings is not None:
+                    timings.endpoint_done = time.perf_counter()
+
+        self.dependant.call = timed_call
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current.get()
+            if timings is not None and timings.endpoint_done is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_done)
+            return response
+
+        return timed_handler
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_queries_total.inc(engine=name)
+        db_query_duration.observe(elapsed, engine=name)
+        timings = _current.get()
+        if timings is not None:
+            timings.queries += 1
+            timings.add("db", elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
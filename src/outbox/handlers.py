@@ -0,0 +1,31 @@
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable
+
+from outbox.publisher import EVENT_CREATED, EVENT_DELETED, EVENT_UPDATED
+
+Handler = Callable[[str, dict], Awaitable[None]]
+
+logger = logging.getLogger("outbox")
+
+HANDLERS: dict[str, list[Handler]] = defaultdict(list)
+
+
+def register(*topics: str) -> Callable[[Handler], Handler]:
+    """Subscribe a coroutine to outbox topics.
+
+    Delivery is at least once: a message is retried when any of its handlers
+    raises, so every handler must be idempotent.
+    """
+
+    def decorator(handler: Handler) -> Handler:
+        for topic in topics:
+            HANDLERS[topic].append(handler)
+        return handler
+
+    return decorator
+
+
+@register(EVENT_CREATED, EVENT_UPDATED, EVENT_DELETED)
+async def log_event_change(topic: str, payload: dict) -> None:
+    logger.info("%s %s", topic, payload)
@@ -0,0 +1,18 @@
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.outbox import OutboxMessage
+
+EVENT_CREATED = "event.created"
+EVENT_UPDATED = "event.updated"
+EVENT_DELETED = "event.deleted"
+
+
+async def enqueue(session: AsyncSession, topic: str, payloads: list[dict]) -> None:
+    """Add messages to the outbox in the caller's transaction.
+
+    They become visible to the worker only when that transaction commits, and
+    are discarded with it on rollback.
+    """
+    if payloads:
+        rows = [{"topic": topic, "payload": payload} for payload in payloads]
+        await session.execute(insert(OutboxMessage), rows)
@@ -0,0 +1,283 @@
+"""Drain the outbox and run the handlers registered for each topic.
+
+Run it against the database the app writes to, for example the test database
+used by tests/conftest.py:
+
+    PYTHONPATH=src python -m outbox.worker --database-url "$DATABASE_URL_TEST"
+
+Each of --concurrency loops claims up to --batch-size messages with
+FOR UPDATE SKIP LOCKED, so loops and worker processes never deliver the same
+message at once. Delivered messages are deleted. A failed message is retried
+with exponential backoff; after --max-attempts it is kept with failed_at set.
+With --metrics-port the worker serves Prometheus metrics, including the
+backlog and the age of its oldest message.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config import get_settings
+from models.outbox import OutboxMessage
+from monitoring.prometheus import Counter, Histogram, format_metric, render_registry
+from outbox.handlers import HANDLERS, Handler
+
+logger = logging.getLogger("outbox")
+
+outbox_messages_total = Counter(
+    "outbox_messages_total",
+    "Outbox messages handled, by result (delivered, retried, failed).",
+    ("topic", "result"),
+)
+outbox_lag = Histogram(
+    "outbox_lag_seconds",
+    "Time from enqueueing a message to its delivery attempt.",
+    ("topic",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+
+
+class OutboxWorker:
+    def __init__(
+        self,
+        make_session: async_sessionmaker[AsyncSession],
+        handlers: dict[str, list[Handler]] = HANDLERS,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        max_attempts: int = 10,
+        poll_interval: float = 1.0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 300.0,
+    ):
+        self.make_session = make_session
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+
+    async def _deliver(self, topic: str, payload: dict) -> None:
+        for handler in self.handlers.get(topic, ()):
+            await handler(topic, payload)
+
+    async def process_batch(self) -> int:
+        """Claim and handle one batch; returns the number of messages claimed."""
+        async with self.make_session() as session, session.begin():
+            statement = (
+                select(
+                    OutboxMessage.id,
+                    OutboxMessage.topic,
+                    OutboxMessage.payload,
+                    OutboxMessage.attempts,
+                    func.extract("epoch", func.now() - OutboxMessage.created_at),
+                )
+                .where(
+                    OutboxMessage.failed_at.is_(None),
+                    OutboxMessage.available_at <= func.now(),
+                )
+                .order_by(OutboxMessage.available_at, OutboxMessage.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = (await session.execute(statement)).all()
+
+            delivered = []
+            for id, topic, payload, attempts, lag in messages:
+                outbox_lag.observe(float(lag), topic=topic)
+                try:
+                    await self._deliver(topic, payload)
+                except Exception as exc:
+                    attempts += 1
+                    failed = attempts >= self.max_attempts
+                    logger.warning(
+                        "outbox message %s (%s) attempt %s failed: %r",
+                        id,
+                        topic,
+                        attempts,
+                        exc,
+                    )
+                    values = {"attempts": attempts, "last_error": repr(exc)}
+                    if failed:
+                        values["failed_at"] = func.now()
+                    else:
+                        delay = timedelta(seconds=self.backoff(attempts))
+                        values["available_at"] = func.now() + delay
+                    await session.execute(
+                        update(OutboxMessage)
+                        .where(OutboxMessage.id == id)
+                        .values(**values)
+                    )
+                    result = "failed" if failed else "retried"
+                    outbox_messages_total.inc(topic=topic, result=result)
+                else:
+                    delivered.append(id)
+                    outbox_messages_total.inc(topic=topic, result="delivered")
+            if delivered:
+                await session.execute(
+                    delete(OutboxMessage).where(OutboxMessage.id.in_(delivered))
+                )
+        return len(messages)
+
+    async def drain(self) -> int:
+        """Process batches until nothing is deliverable; returns the total."""
+        total = 0
+        while count := await self.process_batch():
+            total += count
+        return total
+
+    async def _loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                count = await self.process_batch()
+            except Exception:
+                logger.exception("outbox batch failed")
+                count = 0
+            if count < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def run(self, stop: asyncio.Event) -> None:
+        await asyncio.gather(*(self._loop(stop) for _ in range(self.concurrency)))
+
+    async def backlog(self) -> dict:
+        statement = select(
+            func.count(),
+            func.coalesce(
+                func.extract("epoch", func.now() - func.min(OutboxMessage.created_at)),
+                0,
+            ),
+        ).where(OutboxMessage.failed_at.is_(None))
+        failed = select(func.count()).where(OutboxMessage.failed_at.is_not(None))
+        async with self.make_session() as session:
+            pending, oldest = (await session.execute(statement)).one()
+            return {
+                "pending": pending,
+                "oldest_age_seconds": float(oldest),
+                "failed": await session.scalar(failed),
+            }
+
+    async def render_metrics(self) -> str:
+        backlog = await self.backlog()
+        return (
+            format_metric(
+                "outbox_pending_messages",
+                "gauge",
+                "Messages waiting for delivery, including ones backing off.",
+                [({}, backlog["pending"])],
+            )
+            + format_metric(
+                "outbox_oldest_message_age_seconds",
+                "gauge",
+                "Age of the oldest message waiting for delivery.",
+                [({}, backlog["oldest_age_seconds"])],
+            )
+            + format_metric(
+                "outbox_failed_messages",
+                "gauge",
+                "Messages that exhausted their attempts.",
+                [({}, backlog["failed"])],
+            )
+            + render_registry()
+        )
+
+
+async def serve_metrics(worker: OutboxWorker, port: int) -> asyncio.Server:
+    async def respond(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = (await worker.render_metrics()).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: %d\r\n"
+                b"Connection: close\r\n\r\n" % len(body) + body
+            )
+            await writer.drain()
+        except Exception:
+            logger.exception("metrics request failed")
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(respond, port=port)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Deliver outbox messages.")
+    parser.add_argument(
+        "--database-url",
+        default=settings.database_url_prod,
+        help="defaults to DATABASE_URL_PROD",
+    )
+    parser.add_argument("--concurrency", type=int, default=settings.outbox_concurrency)
+    parser.add_argument("--batch-size", type=int, default=settings.outbox_batch_size)
+    parser.add_argument(
+        "--max-attempts", type=int, default=settings.outbox_max_attempts
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=settings.outbox_poll_interval
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=settings.outbox_metrics_port,
+        help="serve Prometheus metrics on this port; 0 disables",
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="exit once the outbox is drained"
+    )
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL_PROD is required")
+    return args
+
+
+async def run(args: argparse.Namespace) -> None:
+    engine = create_async_engine(args.database_url, pool_size=args.concurrency + 1)
+    worker = OutboxWorker(
+        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_attempts=args.max_attempts,
+        poll_interval=args.poll_interval,
+    )
+    try:
+        if args.once:
+            logger.info("delivered %s messages", await worker.drain())
+            return
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        server = None
+        if args.metrics_port:
+            server = await serve_metrics(worker, args.metrics_port)
+        try:
+            await worker.run(stop)
+        finally:
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+    finally:
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,95 +1,1311 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import heapq
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from itertools import groupby, islice
+from typing import Any, AsyncGenerator, Iterator, NoReturn
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy import select
-from database.connection import get_session
-from models.events import EventRequest, EventCreate, EventUpdate, Event
-from auth.authenticate import authenticate
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    DateTime,
+    Integer,
+    Text,
+    any_,
+    bindparam,
+    cast,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from config import get_settings
+from database.connection import get_session, get_read_session, get_read_session_maker
+from database.pagination import (
+    Cursor,
+    SyncToken,
+    decode_cursor,
+    decode_sync_token,
+    encode_cursor,
+    encode_sync_token,
+)
+from database.search import build_search_query
+from models.serialization import (
+    EVENT_COLUMNS,
+    EVENT_FIELDS,
+    dumps,
+    event_row_to_dict,
+)
+from models.events import (
+    BulkResult,
+    EventRequest,
+    EventCreate,
+    EventUpdate,
+    EventBulkUpdate,
+    EventOccurrence,
+    EventPage,
+    EventFeed,
+    EventSearchResult,
+    EventSync,
+    Event,
+    by_id,
+    current_xid,
+    utc_now,
+)
+from models.users import User
+from models.ics import CALENDAR_END, calendar_start, render_event
+from models.stats import (
+    EventBucketStats,
+    EventGroupStats,
+    EventLocationDayCount,
+    EventTagDayCount,
+)
+from auth.authenticate import authenticate, authenticate_with_query_token
+from auth.jwt_handler import create_feed_token, verify_feed_token
+from cache.etag import (
+    etag_matches,
+    http_date,
+    if_match_versions,
+    make_etag,
+    not_modified_since,
+    page_etag,
+    version_etag,
+)
+from cache.events import (
+    CachedEvent,
+    EventCache,
+    FeedCache,
+    get_event_cache,
+    get_feed_cache,
+)
+from monitoring.timing import TimedRoute, phase
+from outbox.publisher import EVENT_CREATED, EVENT_DELETED, EVENT_UPDATED, enqueue
+from scheduling.conflicts import find_conflicts, find_series_conflicts, lock_location
+from scheduling.recurrence import expand as expand_series, series_end
+from streaming.changes import (
+    RESET,
+    ChangeStream,
+    get_change_stream,
+    notify_changes,
+)
 
-event_router = APIRouter(tags=["Events"])
+settings = get_settings()
 
+event_router = APIRouter(tags=["Events"], route_class=TimedRoute)
 
-@event_router.get("/", response_model=list[EventRequest])
+
+@event_router.get("/", response_model=EventPage)
 async def retrieve_all_events(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(settings.events_page_size, ge=1),
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    location: str | None = None,
+    creator: str | None = None,
+    tag: str | None = None,
+    expand: bool = False,
+    if_none_match: str | None = Header(None),
+    if_modified_since: str | None = Header(None),
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_read_session),
+) -> dict | Response:
+    limit = min(limit, settings.events_max_page_size)
+    filters: list[ColumnElement[bool]] = [Event.deleted_at.is_(None)]
+    if location is not None:
+        filters.append(Event.location == location)
+    if creator is not None:
+        filters.append(Event.creator == creator)
+    if tag is not None:
+        filters.append(Event.tags.contains([tag]))
+    position = decode_cursor(cursor) if cursor else None
+    if expand:
+        return await _expanded_page(
+            session, filters, position, limit, date_from, date_to
+        )
+
+    if date_from is not None:
+        filters.append(Event.date >= date_from)
+    if date_to is not None:
+        filters.append(Event.date < date_to)
+    key = tuple_(Event.date, Event.id)
+    if position and position.backward:
+        filters.append(key < (position.date, position.id))
+        order = (Event.date.desc(), Event.id.desc())
+    else:
+        if position:
+            filters.append(key > (position.date, position.id))
+        order = (Event.date.asc(), Event.id.asc())
+
+    if if_none_match or if_modified_since:
+        # The page's validators only need the ids, versions and update times
+        # on it, so a match skips loading and serializing the events.
+        versions = (
+            select(Event.id, Event.version, Event.updated_at)
+            .where(*filters)
+            .order_by(*order)
+            .limit(limit + 1)
+        )
+        rows = (await session.execute(versions)).all()
+        headers = _page_validators(rows)
+        # If-Modified-Since only counts when there is no If-None-Match. Only
+        # the ETag notices events that left the page.
+        if etag_matches(if_none_match, headers["ETag"]) or (
+            if_none_match is None
+            and "Last-Modified" in headers
+            and not_modified_since(if_modified_since, headers["Last-Modified"])
+        ):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    fast = settings.events_fast_serialization
+    statement = (
+        select(*EVENT_COLUMNS, Event.id, Event.version, Event.updated_at)
+        if fast
+        else select(Event)
+    )
+    statement = statement.where(*filters).order_by(*order).limit(limit + 1)
+    result = await session.execute(statement)
+    events = list(result.all() if fast else result.scalars().all())
+    headers = _page_validators(events)
+    has_more = len(events) > limit
+    events = events[:limit]
+
+    if position and position.backward:
+        events.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, position is not None
+
+    page: dict[str, Any] = {"items": events, "next_cursor": None, "prev_cursor": None}
+    if events and has_next:
+        page["next_cursor"] = encode_cursor(events[-1].date, events[-1].id)
+    if events and has_prev:
+        page["prev_cursor"] = encode_cursor(events[0].date, events[0].id, backward=True)
+    if fast:
+        with phase("serialize"):
+            page["items"] = [event_row_to_dict(row) for row in events]
+            return Response(dumps(page), media_type="application/json", headers=headers)
+    response.headers.update(headers)
+    return page
+
+
+def _page_validators(rows) -> dict[str, str]:
+    """ETag and, unless the page is empty, Last-Modified of a list page."""
+    headers = {"ETag": page_etag((row.id, row.version) for row in rows)}
+    if rows:
+        headers["Last-Modified"] = http_date(max(row.updated_at for row in rows))
+    return headers
+
+
+def _occurrences(
+    event: Event, start: datetime | None, end: datetime | None
+) -> Iterator[tuple]:
+    if event.rrule is None:
+        yield event.date, event.id, event.date, event
+        return
+    for date, original in expand_series(
+        event.rrule, event.date, event.exdates, event.overrides, start, end
+    ):
+        yield date, event.id, original, event
+
+
+def _occurrence_to_dict(event: Event, date: datetime, original: datetime) -> dict:
+    item = {field: getattr(event, field) for field in EVENT_FIELDS}
+    item.update(event.overrides.get(original.isoformat(), {}))
+    if event.end_date is not None:
+        item["end_date"] = date + (event.end_date - event.date)
+    item.update(id=event.id, date=date, occurrence=original)
+    return item
+
+
+async def _expanded_page(
+    session: AsyncSession,
+    filters: list,
+    position: Cursor | None,
+    limit: int,
+    date_from: datetime | None,
+    date_to: datetime | None,
+) -> Response:
+    # Single events come pre-sorted and limited from the date index; each
+    # recurring series overlapping the window is expanded lazily and merged
+    # in, so only the occurrences on this page are ever generated.
+    if position and position.backward:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expanded listings can only be paged forward",
+        )
+    start = date_from
+    if position and (start is None or position.date > start):
+        start = position.date
+    singles = select(Event).where(Event.rrule.is_(None), *filters)
+    series = select(Event).where(Event.rrule.is_not(None), *filters)
+    if start is not None:
+        singles = singles.where(Event.date >= start)
+        series = series.where(
+            or_(Event.recurrence_end.is_(None), Event.recurrence_end >= start)
+        )
+    if date_to is not None:
+        singles = singles.where(Event.date < date_to)
+        series = series.where(Event.date < date_to)
+    if position:
+        key = tuple_(Event.date, Event.id)
+        singles = singles.where(key > (position.date, position.id))
+    singles = singles.order_by(Event.date, Event.id).limit(limit + 1)
+
+    streams = [
+        _occurrences(event, start, date_to) for event in await session.scalars(singles)
+    ]
+    streams += [
+        _occurrences(event, start, date_to) for event in await session.scalars(series)
+    ]
+    merged = heapq.merge(*streams, key=lambda item: item[:2])
+    if position:
+        merged = (item for item in merged if item[:2] > (position.date, position.id))
+    occurrences = list(islice(merged, limit + 1))
+
+    page: dict[str, Any] = {"items": [], "next_cursor": None, "prev_cursor": None}
+    if len(occurrences) > limit:
+        occurrences = occurrences[:limit]
+        date, id = occurrences[-1][:2]
+        page["next_cursor"] = encode_cursor(date, id)
+    with phase("serialize"):
+        page["items"] = [
+            _occurrence_to_dict(event, date, original)
+            for date, _, original, event in occurrences
+        ]
+        return Response(dumps(page), media_type="application/json")
+
+
+# Any signed-in user can export every event; creator is an email address and
+# stays out of it, as it does out of the event responses.
+EXPORT_COLUMNS = (
+    Event.id,
+    Event.title,
+    Event.date,
+    Event.description,
+    Event.tags,
+    Event.location,
+    Event.end_date,
+    Event.rrule,
+    Event.exdates,
+    Event.overrides,
+)
+
+
+async def _export_events(
+    make_session: async_sessionmaker[AsyncSession], format: str
+) -> AsyncGenerator[bytes, None]:
+    statement = (
+        select(*EXPORT_COLUMNS)
+        .where(Event.deleted_at.is_(None))
+        .order_by(Event.id)
+        .execution_options(yield_per=settings.events_export_batch_size)
+    )
+    separator = b"\n" if format == "ndjson" else b","
+    first = True
+    if format == "json":
+        yield b"["
+    async with make_session() as session:
+        result = await session.stream(statement)
+        async for rows in result.partitions():
+            chunk = separator.join(dumps(row._asdict()) for row in rows)
+            if format == "ndjson":
+                chunk += b"\n"
+            elif not first:
+                chunk = b"," + chunk
+            first = False
+            yield chunk
+    if format == "json":
+        yield b"]"
+
+
+@event_router.get("/export")
+async def export_events(
+    format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+    user: str = Depends(authenticate),
+    make_session: async_sessionmaker[AsyncSession] = Depends(get_read_session_maker),
+) -> StreamingResponse:
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(
+        _export_events(make_session, format), media_type=media_type
+    )
+
+
+@event_router.get("/search", response_model=list[EventSearchResult])
+async def search_events(
+    q: str | None = None,
+    tags_all: list[str] | None = Query(None),
+    tags_any: list[str] | None = Query(None),
+    location_prefix: str | None = None,
+    limit: int = Query(settings.events_page_size, ge=1),
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[EventSearchResult] | Response:
+    if not (q or tags_all or tags_any or location_prefix):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Supply a search query, tags or a location prefix",
+        )
+    limit = min(limit, settings.events_max_page_size)
+    if settings.events_fast_serialization:
+        columns = (*EVENT_COLUMNS, Event.id)
+        statement = build_search_query(
+            q, tags_all, tags_any, location_prefix, limit, columns
+        )
+        result = await session.execute(statement)
+        with phase("serialize"):
+            items = [
+                {**event_row_to_dict(row), "id": row.id, "rank": row.rank}
+                for row in result.all()
+            ]
+            return Response(dumps(items), media_type="application/json")
+
+    statement = build_search_query(q, tags_all, tags_any, location_prefix, limit)
+    result = await session.execute(statement)
+    hits = []
+    for event, rank in result.all():
+        hit = EventSearchResult.model_validate(event, from_attributes=True)
+        hit.rank = rank
+        hits.append(hit)
+    return hits
+
+
+@event_router.get("/sync", response_model=EventSync)
+async def sync_events(
+    token: str | None = None,
+    limit: int = Query(settings.events_page_size, ge=1),
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_read_session),
+) -> dict:
+    # Transactions commit out of order, so a sync cannot just resume after
+    # the newest change it sent. Any change it did not see belongs to a
+    # transaction that was still running or not yet started, whose id is at
+    # least the oldest one running when the sync began. The next sync
+    # resumes from there; a few changes may be sent twice, none is missed.
+    limit = min(limit, settings.events_max_page_size)
+    position = decode_sync_token(token) if token else SyncToken(None)
+    resume = position.resume
+    if resume is None:
+        oldest_running = func.pg_snapshot_xmin(func.pg_current_snapshot())
+        resume = await session.scalar(
+            select(cast(cast(oldest_running, Text), BigInteger))
+        )
+
+    criteria: list[ColumnElement[bool]]
+    if position.since is None:
+        criteria = [Event.deleted_at.is_(None)]
+    else:
+        criteria = [Event.change_seq >= position.since]
+    key = tuple_(Event.change_seq, Event.id)
+    if position.after:
+        criteria.append(key > position.after)
+    statement = (
+        select(Event)
+        .where(*criteria)
+        .order_by(Event.change_seq, Event.id)
+        .limit(limit + 1)
+    )
+    changes = list(await session.scalars(statement))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    next_token = SyncToken(resume)
+    if has_more:
+        last = changes[-1]
+        next_token = SyncToken(position.since, (last.change_seq, last.id), resume)
+    return {
+        "events": [event for event in changes if event.deleted_at is None],
+        "deleted": [event.id for event in changes if event.deleted_at is not None],
+        "token": encode_sync_token(next_token),
+        "has_more": has_more,
+    }
+
+
+@event_router.get("/conflicts", response_model=list[EventOccurrence])
+async def event_conflicts(
+    location: str,
+    start: datetime,
+    end: datetime | None = None,
+    exclude: int | None = None,
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[dict]:
+    if end is not None and end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must be after start",
+        )
+    conflicts = await find_conflicts(session, location, start, end, exclude)
+    return [
+        _occurrence_to_dict(conflict.event, conflict.date, conflict.original)
+        for conflict in conflicts
+    ]
+
+
+async def _stream_events(
+    stream: ChangeStream, heartbeat: float
+) -> AsyncGenerator[bytes, None]:
+    # Subscribing here, not in the route, ties the subscription's cleanup to
+    # the response body that consumes it.
+    subscription = stream.subscribe()
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(), heartbeat)
+            except TimeoutError:
+                # Keeps proxies from closing an idle stream.
+                yield b": keepalive\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+        if subscription.missed_messages:
+            # The client resynchronizes through /event/sync and reconnects.
+            yield RESET
+    finally:
+        subscription.close()
+
+
+@event_router.get("/stream")
+async def stream_events(
+    user: str = Depends(authenticate_with_query_token),
+    stream: ChangeStream = Depends(get_change_stream),
+) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_events(stream, settings.event_stream_heartbeat),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+FEED_KINDS = "^(creator|tag)$"
+FEED_COLUMNS = (
+    Event.id,
+    Event.title,
+    Event.date,
+    Event.end_date,
+    Event.description,
+    Event.tags,
+    Event.location,
+    Event.rrule,
+    Event.exdates,
+    Event.overrides,
+    Event.version,
+    Event.updated_at,
+)
+
+
+def _feed_filters(kind: str, value: str) -> list:
+    # Calendar apps keep the events they have seen, so feeds leave out
+    # events and series that ended long ago.
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    since = today - timedelta(days=settings.event_feed_past_days)
+    if kind == "creator":
+        match = Event.creator == value
+    else:
+        match = Event.tags.contains([value])
+    return [
+        match,
+        Event.deleted_at.is_(None),
+        or_(
+            Event.date >= since,
+            Event.rrule.is_not(None)
+            & or_(Event.recurrence_end.is_(None), Event.recurrence_end >= since),
+        ),
+    ]
+
+
+async def _feed_etag(session: AsyncSession, feed: str, filters: list) -> str:
+    # The latest change_seq alone would miss writes that commit out of
+    # transaction order and events that leave the feed, so a digest of the
+    # (id, version) of every event in it goes along, as in page_etag.
+    digest = func.hashtextextended(func.concat(Event.id, ".", Event.version), 0)
+    statement = select(
+        func.max(Event.change_seq), func.count(), func.bit_xor(digest)
+    ).where(*filters)
+    watermark = ":".join(map(str, (await session.execute(statement)).one()))
+    return make_etag(f"{feed}:{watermark}".encode())
+
+
+async def _render_feed(
+    make_session: async_sessionmaker[AsyncSession],
+    filters: list,
+    name: str,
+    cache: FeedCache,
+    feed: str,
+    etag: str,
+) -> AsyncGenerator[bytes, None]:
+    statement = (
+        select(*FEED_COLUMNS)
+        .where(*filters)
+        .order_by(Event.date, Event.id)
+        .execution_options(yield_per=settings.events_export_batch_size)
+    )
+    chunks = [calendar_start(name)]
+    yield chunks[0]
+    async with make_session() as session:
+        result = await session.stream(statement)
+        async for rows in result.partitions():
+            chunks.append(b"".join(render_event(row) for row in rows))
+            yield chunks[-1]
+    chunks.append(CALENDAR_END)
+    yield CALENDAR_END
+    # Only reached once the whole feed went out.
+    await cache.set(feed, etag, b"".join(chunks))
+
+
+async def _feed_token_version(session: AsyncSession, user: str) -> int:
+    statement = select(User.feed_token_version).where(
+        func.lower(User.email) == user.lower()
+    )
+    version = await session.scalar(statement)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid feed token"
+        )
+    return version
+
+
+@event_router.get("/feed/{kind}/{value}/token", response_model=EventFeed)
+async def create_feed_url(
+    request: Request,
+    value: str,
+    kind: str = Path(pattern=FEED_KINDS),
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    # The primary: a lagging replica could hand out a version just revoked.
+    version = await _feed_token_version(session, user)
+    token = create_feed_token(f"{kind}:{value}", user, version)
+    url = request.url_for("calendar_feed", kind=kind, value=value)
+    return {"token": token, "url": str(url.include_query_params(token=token))}
+
+
+@event_router.post("/feed/revoke")
+async def revoke_feed_urls(
     user: str = Depends(authenticate),
     session: AsyncSession = Depends(get_session),
-) -> list[Event]:
-    statement = select(Event)
+) -> dict:
+    """Revokes every feed URL the user was given; new ones work again."""
+    statement = (
+        update(User)
+        .where(func.lower(User.email) == user.lower())
+        .values(feed_token_version=User.feed_token_version + 1)
+    )
+    await session.execute(statement)
+    await session.commit()
+    return {"message": "Feed URLs revoked successfully"}
+
+
+@event_router.get("/feed/{kind}/{value}.ics")
+async def calendar_feed(
+    value: str,
+    token: str,
+    kind: str = Path(pattern=FEED_KINDS),
+    if_none_match: str | None = Header(None),
+    session: AsyncSession = Depends(get_read_session),
+    make_session: async_sessionmaker[AsyncSession] = Depends(get_read_session_maker),
+    cache: FeedCache = Depends(get_feed_cache),
+) -> Response:
+    feed = f"{kind}:{value}"
+    issuer, version = verify_feed_token(token, feed)
+    if await _feed_token_version(session, issuer) != version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Feed token revoked"
+        )
+    filters = _feed_filters(kind, value)
+    etag = await _feed_etag(session, feed, filters)
+    headers = {"ETag": etag}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = "text/calendar; charset=utf-8"
+    payload = await cache.get(feed, etag)
+    if payload is not None:
+        return Response(payload, media_type=media_type, headers=headers)
+    name = f"Events by {value}" if kind == "creator" else f"Events tagged {value}"
+    return StreamingResponse(
+        _render_feed(make_session, filters, name, cache, feed, etag),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+def _use_summary(include_ids: bool) -> bool:
+    return settings.events_stats_from_summary and not include_ids
+
+
+# Stats count every occurrence in the window. Single events are counted in
+# SQL, or read from the summaries, which hold single events only; series are
+# expanded over the window as in listings and their occurrences added on top.
+async def _series_occurrences(
+    session: AsyncSession, start: date, end: date
+) -> list[tuple[int, datetime, str, list[str]]]:
+    """(id, date, location, tags) of each occurrence of a series within
+    [start, end), with its override applied."""
+    window_start = datetime.combine(start, datetime.min.time())
+    window_end = datetime.combine(end, datetime.min.time())
+    statement = select(Event).where(
+        Event.rrule.is_not(None),
+        Event.deleted_at.is_(None),
+        Event.date < window_end,
+        or_(Event.recurrence_end.is_(None), Event.recurrence_end >= window_start),
+    )
+    occurrences = []
+    for series in await session.scalars(statement):
+        for date, _, original, event in _occurrences(series, window_start, window_end):
+            override = event.overrides.get(original.isoformat(), {})
+            location = override.get("location", event.location)
+            occurrences.append(
+                (event.id, date, location, override.get("tags", event.tags))
+            )
+    return occurrences
+
+
+def _add_occurrences(
+    rows: list[dict], field: str, occurrences: list[tuple], include_ids: bool
+) -> list[dict]:
+    """Adds (key, id) occurrences to the stats rows, which are keyed by field."""
+    stats = {row[field]: row for row in rows}
+    for key, id in occurrences:
+        row = stats.setdefault(key, {field: key, "count": 0, "ids": []})
+        row["count"] += 1
+        if include_ids:
+            row["ids"].append(id)
+    for row in stats.values():
+        # A series is listed once however often it occurs in a group.
+        row["ids"] = sorted(set(row["ids"])) if include_ids else None
+    return [stats[key] for key in sorted(stats)]
+
+
+def _truncate(value: datetime, unit: str) -> datetime:
+    # Matches date_trunc: weeks start on Monday.
+    bucket = datetime.combine(value.date(), datetime.min.time())
+    if unit == "week":
+        return bucket - timedelta(days=bucket.weekday())
+    if unit == "month":
+        return bucket.replace(day=1)
+    return bucket
+
+
+@event_router.get("/stats/buckets", response_model=list[EventBucketStats])
+async def event_bucket_stats(
+    start: date,
+    end: date,
+    unit: str = Query("day", pattern="^(day|week|month)$"),
+    include_ids: bool = True,
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[dict]:
+    if _use_summary(include_ids):
+        bucket = func.date_trunc(
+            literal(unit, literal_execute=True),
+            cast(EventLocationDayCount.day, DateTime),
+        ).label("bucket")
+        statement = (
+            select(bucket, func.sum(EventLocationDayCount.count).label("count"))
+            .where(EventLocationDayCount.day >= start, EventLocationDayCount.day < end)
+            .group_by(bucket)
+            .having(func.sum(EventLocationDayCount.count) > 0)
+            .order_by(bucket)
+        )
+    else:
+        bucket = func.date_trunc(literal(unit, literal_execute=True), Event.date).label(
+            "bucket"
+        )
+        columns = [bucket, func.count().label("count")]
+        # ids come in ascending order: array_agg alone follows the scan, which
+        # changes with the plan and between partitions.
+        if include_ids:
+            columns.append(
+                func.array_agg(aggregate_order_by(Event.id, Event.id)).label("ids")
+            )
+        statement = (
+            select(*columns)
+            .where(
+                Event.date >= start,
+                Event.date < end,
+                Event.rrule.is_(None),
+                Event.deleted_at.is_(None),
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
     result = await session.execute(statement)
-    events = result.scalars().all()
-    return list(events)
+    occurrences = [
+        (_truncate(date, unit), id)
+        for id, date, _, _ in await _series_occurrences(session, start, end)
+    ]
+    rows = [row._asdict() for row in result.all()]
+    return _add_occurrences(rows, "bucket", occurrences, include_ids)
+
+
+async def _group_stats(
+    session: AsyncSession,
+    key,
+    summary_key,
+    source,
+    start: date,
+    end: date,
+    include_ids: bool,
+    occurrences: list[tuple[str, int]],
+) -> list[dict]:
+    if _use_summary(include_ids):
+        summary = summary_key.class_
+        statement = (
+            select(summary_key.label("key"), func.sum(summary.count).label("count"))
+            .where(summary.day >= start, summary.day < end)
+            .group_by(summary_key)
+            .having(func.sum(summary.count) > 0)
+            .order_by(summary_key)
+        )
+    else:
+        columns = [key.label("key"), func.count().label("count")]
+        if include_ids:
+            columns.append(
+                func.array_agg(aggregate_order_by(source.c.id, source.c.id)).label(
+                    "ids"
+                )
+            )
+        statement = select(*columns).select_from(source).group_by(key).order_by(key)
+    result = await session.execute(statement)
+    rows = [row._asdict() for row in result.all()]
+    return _add_occurrences(rows, "key", occurrences, include_ids)
+
+
+@event_router.get("/stats/locations", response_model=list[EventGroupStats])
+async def event_location_stats(
+    start: date,
+    end: date,
+    include_ids: bool = True,
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[dict]:
+    source = (
+        select(Event.id, Event.location)
+        .where(
+            Event.date >= start,
+            Event.date < end,
+            Event.rrule.is_(None),
+            Event.deleted_at.is_(None),
+        )
+        .subquery()
+    )
+    occurrences = [
+        (location, id)
+        for id, _, location, _ in await _series_occurrences(session, start, end)
+    ]
+    return await _group_stats(
+        session,
+        source.c.location,
+        EventLocationDayCount.location,
+        source,
+        start,
+        end,
+        include_ids,
+        occurrences,
+    )
+
+
+@event_router.get("/stats/tags", response_model=list[EventGroupStats])
+async def event_tag_stats(
+    start: date,
+    end: date,
+    include_ids: bool = True,
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_read_session),
+) -> list[dict]:
+    source = (
+        select(Event.id, func.unnest(Event.tags).label("tag"))
+        .where(
+            Event.date >= start,
+            Event.date < end,
+            Event.rrule.is_(None),
+            Event.deleted_at.is_(None),
+        )
+        .subquery()
+    )
+    occurrences = [
+        (tag, id)
+        for id, _, _, tags in await _series_occurrences(session, start, end)
+        for tag in tags
+    ]
+    return await _group_stats(
+        session,
+        source.c.tag,
+        EventTagDayCount.tag,
+        source,
+        start,
+        end,
+        include_ids,
+        occurrences,
+    )
 
 
 @event_router.get("/{id}", response_model=EventRequest)
 async def retrieve_event(
     id: int,
+    if_none_match: str | None = Header(None),
+    if_modified_since: str | None = Header(None),
     user: str = Depends(authenticate),
     session: AsyncSession = Depends(get_session),
-) -> Event | dict:
-    event = await session.get(Event, id)
-    if event:
-        return event
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail="Event with supplied ID does not exist",
+    cache: EventCache = Depends(get_event_cache),
+) -> Response:
+    cached = await cache.get(id)
+    # Misses read the primary: a lagging replica could put back the copy an
+    # update just invalidated, and If-Match against its ETag would then fail.
+    # The session only connects on a miss.
+    if not cached:
+        cached = await _load_event(session, id)
+        await cache.set(id, cached)
+    headers = {"ETag": cached.etag, "Last-Modified": cached.last_modified}
+    # If-Modified-Since only counts when there is no If-None-Match.
+    if etag_matches(if_none_match, cached.etag) or (
+        if_none_match is None
+        and not_modified_since(if_modified_since, cached.last_modified)
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cached.payload, media_type="application/json", headers=headers)
+
+
+async def _load_event(session: AsyncSession, id: int) -> CachedEvent:
+    if settings.events_fast_serialization:
+        version_query = select(*EVENT_COLUMNS, Event.version, Event.updated_at).where(
+            *by_id(id), Event.deleted_at.is_(None)
+        )
+        event = (await session.execute(version_query)).first()
+    else:
+        event_query = select(Event).where(*by_id(id), Event.deleted_at.is_(None))
+        event = await session.scalar(event_query)
+    if not event:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event with supplied ID does not exist",
+        )
+    with phase("serialize"):
+        if settings.events_fast_serialization:
+            payload = dumps(event_row_to_dict(event))
+        else:
+            payload = (
+                EventRequest.model_validate(event, from_attributes=True)
+                .model_dump_json()
+                .encode()
+            )
+    return CachedEvent(
+        event.version, version_etag(event.version), http_date(event.updated_at), payload
     )
 
 
 @event_router.post("/new")
 async def create_event(
     data: EventCreate,
+    reject_conflicts: bool = False,
     user: str = Depends(authenticate),
     session: AsyncSession = Depends(get_session),
 ) -> dict:
-    event = Event(**data.model_dump())
-    event.creator = user
-    session.add(event)
+    values = data.model_dump()
+    _end_date(values)
+    if reject_conflicts:
+        await _reject_conflicts(session, values)
+    statement = (
+        insert(Event)
+        .values(**values, **(await _recurrence(values)), creator=user)
+        .returning(Event.id)
+    )
+    id = await session.scalar(statement)
+    await _publish(session, EVENT_CREATED, [{"id": id, "creator": user}])
     await session.commit()
-    await session.refresh(event)
     return {"message": "Event created successfully"}
 
 
+async def _recurrence(values: dict) -> dict:
+    """The recurrence_end column for the date, rrule and overrides in values."""
+    if not values.get("rrule"):
+        return {"recurrence_end": None}
+    try:
+        # A long COUNT is generated occurrence by occurrence; keep it off the
+        # event loop.
+        end = await asyncio.to_thread(
+            series_end, values["rrule"], values["date"], values["overrides"]
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        )
+    return {"recurrence_end": end}
+
+
+def _end_date(changes: dict, current: dict | None = None) -> None:
+    """Turn a duration in changes into end_date; moving an event keeps its
+    length. current holds the stored values of an event being changed."""
+    current = current or {}
+    duration = changes.pop("duration", None)
+    date = changes.get("date", current.get("date"))
+    if duration is not None:
+        changes["end_date"] = date + duration
+    elif "date" in changes and "end_date" not in changes and current.get("end_date"):
+        changes["end_date"] = current["end_date"] + (date - current["date"])
+    end_date = changes.get("end_date", current.get("end_date"))
+    if end_date is not None and end_date <= date:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="end_date must be after date",
+        )
+
+
+async def _reject_conflicts(
+    session: AsyncSession, values: dict, exclude: int | None = None
+) -> None:
+    # The locks are held until the write commits, so two requests cannot both
+    # find a slot free. A series is checked at each occurrence from now, or
+    # its start if later, to EVENTS_CONFLICT_HORIZON_DAYS days after that.
+    if values.get("rrule"):
+        start = max(values["date"], datetime.now(timezone.utc).replace(tzinfo=None))
+        horizon = timedelta(days=get_settings().events_conflict_horizon_days)
+        conflicts = await find_series_conflicts(
+            session, values, start, start + horizon, exclude
+        )
+    else:
+        await lock_location(session, values["location"])
+        conflicts = await find_conflicts(
+            session, values["location"], values["date"], values["end_date"], exclude
+        )
+    if conflicts:
+        ids = dict.fromkeys(str(conflict.event.id) for conflict in conflicts)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Event overlaps events {', '.join(ids)} at its location",
+        )
+
+
+RECURRENCE_FIELDS = frozenset({"date", "rrule", "overrides"})
+SCHEDULE_FIELDS = frozenset({"date", "end_date", "duration"})
+# Stored values a change may be resolved or checked against.
+CURRENT_COLUMNS = (
+    Event.date,
+    Event.end_date,
+    Event.location,
+    Event.rrule,
+    Event.exdates,
+    Event.overrides,
+)
+
+
+def _changed() -> dict:
+    """Column values every write to an event sets."""
+    return {
+        "version": Event.version + 1,
+        "updated_at": utc_now(),
+        "change_seq": current_xid(),
+    }
+
+
+def _writable(id: int, user: str, if_match: str | None) -> list:
+    """Criteria for the event a request may change, honouring If-Match."""
+    criteria = [*by_id(id), Event.creator == user, Event.deleted_at.is_(None)]
+    versions = if_match_versions(if_match) if if_match else None
+    if versions is not None:
+        criteria.append(Event.version.in_(versions))
+    return criteria
+
+
+async def _raise_write_rejected(session: AsyncSession, id: int, user: str) -> NoReturn:
+    # Only reached when a write matched no row: tell 404, 403 and 412 apart.
+    statement = select(Event.creator).where(*by_id(id), Event.deleted_at.is_(None))
+    creator = await session.scalar(statement)
+    if creator is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event with supplied ID does not exist",
+        )
+    if creator != user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Operation not allowed"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Event has changed since it was retrieved",
+    )
+
+
 @event_router.patch("/edit/{id}", response_model=EventRequest)
 async def update_event(
     id: int,
     data: EventUpdate,
+    response: Response,
+    reject_conflicts: bool = False,
+    if_match: str | None = Header(None),
     user: str = Depends(authenticate),
     session: AsyncSession = Depends(get_session),
+    cache: EventCache = Depends(get_event_cache),
 ) -> Event | dict:
-    event = await session.get(Event, id)
+    # An empty patch still goes through UPDATE so it is checked and returned
+    # in the same single statement.
+    changes = data.model_dump(exclude_unset=True)
+    criteria = _writable(id, user, if_match)
+    current: dict[str, Any] = {}
+    if reject_conflicts or (RECURRENCE_FIELDS | SCHEDULE_FIELDS) & changes.keys():
+        query = select(*CURRENT_COLUMNS).where(*criteria).with_for_update()
+        row = (await session.execute(query)).first()
+        if not row:
+            await _raise_write_rejected(session, id, user)
+        current = row._asdict()
+        _end_date(changes, current)
+    fields = sorted(changes)
+    if RECURRENCE_FIELDS & changes.keys():
+        changes.update(await _recurrence({**current, **changes}))
+    if reject_conflicts:
+        await _reject_conflicts(session, {**current, **changes}, exclude=id)
+    values: dict[str, Any] = {"id": Event.id}
+    if changes:
+        values = {**changes, **_changed()}
+    statement = update(Event).where(*criteria).values(**values).returning(Event)
+    event = await session.scalar(statement)
     if not event:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event with supplied ID does not exist",
-        )
-    if event.creator != user:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Operation not allowed"
-        )
-    event_data = data.model_dump(exclude_unset=True)
-    for key, value in event_data.items():
-        setattr(event, key, value)
-    session.add(event)
+        await _raise_write_rejected(session, id, user)
+    if changes:
+        payload = {"id": id, "creator": user, "fields": fields}
+        await _publish(session, EVENT_UPDATED, [payload])
     await session.commit()
-    await session.refresh(event)
+    await cache.invalidate({id: event.version})
+    response.headers["ETag"] = version_etag(event.version)
     return event
 
 
 @event_router.delete("/delete/{id}")
 async def delete_event(
     id: int,
+    if_match: str | None = Header(None),
     user: str = Depends(authenticate),
     session: AsyncSession = Depends(get_session),
+    cache: EventCache = Depends(get_event_cache),
 ) -> dict:
-    event = await session.get(Event, id)
-    if not event:
+    statement = (
+        update(Event)
+        .where(*_writable(id, user, if_match))
+        .values(deleted_at=utc_now(), **_changed())
+        .returning(Event.version)
+    )
+    version = await session.scalar(statement)
+    if version is None:
+        await _raise_write_rejected(session, id, user)
+    await _publish(session, EVENT_DELETED, [{"id": id, "creator": user}])
+    await session.commit()
+    await cache.invalidate({id: version})
+    return {"message": "Event deleted successfully"}
+
+
+STREAM_KEYS = ("id", "fields")
+
+
+async def _publish(session: AsyncSession, topic: str, payloads: list[dict]) -> None:
+    # Both the outbox messages and the stream notifications take effect when
+    # the write commits.
+    await enqueue(session, topic, payloads)
+    # Every signed-in user can follow the stream, so like read responses it
+    # does not say who made the change.
+    public = [
+        {key: payload[key] for key in STREAM_KEYS if key in payload}
+        for payload in payloads
+    ]
+    await notify_changes(session, topic, public)
+
+
+def _ids_in(ids: list[int]):
+    # A single array parameter keeps the statement text independent of the
+    # batch size, so asyncpg can reuse the prepared statement.
+    return Event.id == any_(cast(ids, ARRAY(Integer)))
+
+
+def _bulk_result(id: int, code: int, detail: str) -> dict:
+    return {"id": id, "status": code, "detail": detail}
+
+
+def _check_batch_size(items: list) -> None:
+    if len(items) > settings.events_max_batch_size:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Event with supplied ID does not exist",
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds {settings.events_max_batch_size} items",
         )
-    if event.creator != user:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN, detail="Operation not allowed"
+
+
+@event_router.post("/bulk/new", response_model=list[BulkResult])
+async def create_events(
+    data: list[EventCreate],
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_session),
+) -> list[dict]:
+    _check_batch_size(data)
+    if not data:
+        return []
+    rows = []
+    for item in data:
+        values = item.model_dump()
+        _end_date(values)
+        rows.append({**values, **(await _recurrence(values)), "creator": user})
+    statement = insert(Event).returning(Event.id, sort_by_parameter_order=True)
+    result = await session.execute(statement, rows)
+    ids = result.scalars().all()
+    payloads = [{"id": id, "creator": user} for id in ids]
+    await _publish(session, EVENT_CREATED, payloads)
+    await session.commit()
+    return [
+        _bulk_result(id, status.HTTP_200_OK, "Event created successfully") for id in ids
+    ]
+
+
+@event_router.patch("/bulk/edit", response_model=list[BulkResult])
+async def update_events(
+    data: list[EventBulkUpdate],
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_session),
+    cache: EventCache = Depends(get_event_cache),
+) -> list[dict]:
+    _check_batch_size(data)
+    query = (
+        select(Event.id, Event.creator, Event.version, *CURRENT_COLUMNS)
+        .where(_ids_in([item.id for item in data]), Event.deleted_at.is_(None))
+        .with_for_update()
+    )
+    current = {row.id: row for row in (await session.execute(query)).all()}
+    # Each item is applied to the version read above, so an id given twice
+    # would be written twice and invalidated in the cache only once.
+    repeated = {
+        id for id, count in Counter(item.id for item in data).items() if count > 1
+    }
+
+    results, rows = [], []
+    for item in data:
+        row = current.get(item.id)
+        if item.id in repeated:
+            results.append(
+                _bulk_result(
+                    item.id,
+                    status.HTTP_409_CONFLICT,
+                    "Event appears more than once in the batch",
+                )
+            )
+        elif row is None:
+            results.append(
+                _bulk_result(
+                    item.id,
+                    status.HTTP_404_NOT_FOUND,
+                    "Event with supplied ID does not exist",
+                )
+            )
+        elif row.creator != user:
+            results.append(
+                _bulk_result(
+                    item.id, status.HTTP_403_FORBIDDEN, "Operation not allowed"
+                )
+            )
+        else:
+            values = item.model_dump(exclude_unset=True)
+            try:
+                _end_date(values, row._asdict())
+                if RECURRENCE_FIELDS & values.keys():
+                    values.update(await _recurrence({**row._asdict(), **values}))
+            except HTTPException as exc:
+                results.append(_bulk_result(item.id, exc.status_code, exc.detail))
+                continue
+            if len(values) > 1:
+                rows.append(values)
+            results.append(
+                _bulk_result(item.id, status.HTTP_200_OK, "Event updated successfully")
+            )
+
+    if rows:
+        # An ORM bulk update would match rows on the whole primary key, which
+        # includes date since partitioning and so could not move events.
+        table = Event.metadata.tables[Event.__tablename__]
+        statement = (
+            update(table).where(*by_id(bindparam("event_id"))).values(**_changed())
         )
-    await session.delete(event)
+        rows.sort(key=sorted)
+        for _, group in groupby(rows, key=sorted):
+            parameters = [
+                {
+                    "event_id" if key == "id" else key: value
+                    for key, value in row.items()
+                }
+                for row in group
+            ]
+            await session.execute(statement, parameters)
+        payloads = [
+            {
+                "id": row["id"],
+                "creator": user,
+                "fields": sorted(set(row) - {"id", "recurrence_end"}),
+            }
+            for row in rows
+        ]
+        await _publish(session, EVENT_UPDATED, payloads)
     await session.commit()
-    return {"message": "Event deleted successfully"}
+    # The rows are locked, so each write made the version after the one read.
+    await cache.invalidate({row["id"]: current[row["id"]].version + 1 for row in rows})
+    return results
+
+
+@event_router.post("/bulk/delete", response_model=list[BulkResult])
+async def delete_events(
+    ids: list[int] = Body(...),
+    user: str = Depends(authenticate),
+    session: AsyncSession = Depends(get_session),
+    cache: EventCache = Depends(get_event_cache),
+) -> list[dict]:
+    _check_batch_size(ids)
+    statement = (
+        update(Event)
+        .where(_ids_in(ids), Event.creator == user, Event.deleted_at.is_(None))
+        .values(deleted_at=utc_now(), **_changed())
+        .returning(Event.id, Event.version)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = dict((await session.execute(statement)).tuples().all())
+    missing = [id for id in ids if id not in deleted]
+    existing = set()
+    if missing:
+        query = select(Event.id).where(_ids_in(missing), Event.deleted_at.is_(None))
+        existing = set((await session.execute(query)).scalars().all())
+    payloads = [{"id": id, "creator": user} for id in deleted]
+    await _publish(session, EVENT_DELETED, payloads)
+    await session.commit()
+    await cache.invalidate(deleted)
+
+    results = []
+    for id in ids:
+        if id in deleted:
+            results.append(
+                _bulk_result(id, status.HTTP_200_OK, "Event deleted successfully")
+            )
+        elif id in existing:
+            results.append(
+                _bulk_result(id, status.HTTP_403_FORBIDDEN, "Operation not allowed")
+            )
+        else:
+            results.append(
+                _bulk_result(
+                    id,
+                    status.HTTP_404_NOT_FOUND,
+                    "Event with supplied ID does not exist",
+                )
+            )
+    return results
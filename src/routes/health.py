@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio.session import AsyncSession
+from config import get_settings
+from database.connection import get_read_session, get_session
+
+health_router = APIRouter(tags=["Health"])
+logger = logging.getLogger("health")
+
+
+async def _check(session: AsyncSession, name: str) -> str:
+    try:
+        await asyncio.wait_for(
+            session.execute(text("SELECT 1")),
+            timeout=get_settings().health_check_timeout,
+        )
+    except Exception:
+        # The probe is unauthenticated; the details go to the log only.
+        logger.exception("readiness check of %s failed", name)
+        return "unavailable"
+    return "ok"
+
+
+@health_router.get("/live")
+async def live() -> dict:
+    return {"status": "ok"}
+
+
+@health_router.get("/ready")
+async def ready(
+    session: AsyncSession = Depends(get_session),
+    read_session: AsyncSession = Depends(get_read_session),
+) -> JSONResponse:
+    checks = {"database": await _check(session, "database")}
+    if get_settings().database_url_replica:
+        checks["replica"] = await _check(read_session, "replica")
+    healthy = all(result == "ok" for result in checks.values())
+    return JSONResponse(
+        {"status": "ok" if healthy else "unavailable", "checks": checks},
+        status_code=(
+            status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
@@ -0,0 +1,105 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from database.connection import engines, pool_stats
+from auth.jwt_handler import get_token_cache
+from monitoring.prometheus import format_metric, render_registry
+from routes.users import hash_password
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+def _pool_metrics() -> list[str]:
+    stats = {role: pool_stats(engine) for role, engine in engines().items()}
+
+    def samples(key: str) -> list[tuple[dict[str, str], float]]:
+        return [({"role": role}, values[key]) for role, values in stats.items()]
+
+    return [
+        format_metric(
+            "db_pool_size", "gauge", "Configured pool size.", samples("size")
+        ),
+        format_metric(
+            "db_pool_checked_out",
+            "gauge",
+            "Connections currently checked out.",
+            samples("checked_out"),
+        ),
+        format_metric(
+            "db_pool_checked_in",
+            "gauge",
+            "Idle connections in the pool.",
+            samples("checked_in"),
+        ),
+        format_metric(
+            "db_pool_overflow",
+            "gauge",
+            "Connections opened beyond the pool size.",
+            samples("overflow"),
+        ),
+        format_metric(
+            "db_pool_checkouts_total",
+            "counter",
+            "Connection checkouts.",
+            samples("wait_count"),
+        ),
+        format_metric(
+            "db_pool_wait_seconds_total",
+            "counter",
+            "Time spent waiting for a pooled connection.",
+            samples("wait_seconds"),
+        ),
+        format_metric(
+            "db_pool_wait_max_seconds",
+            "gauge",
+            "Longest wait for a pooled connection.",
+            samples("wait_max_seconds"),
+        ),
+    ]
+
+
+def _auth_metrics() -> list[str]:
+    hashing = hash_password.stats()
+    tokens = get_token_cache().stats()
+    return [
+        format_metric(
+            "password_hash_waiting",
+            "gauge",
+            "Password hash jobs waiting for a worker.",
+            [({}, hashing["waiting"])],
+        ),
+        format_metric(
+            "password_hash_running",
+            "gauge",
+            "Password hash jobs running on a worker.",
+            [({}, hashing["running"])],
+        ),
+        format_metric(
+            "password_hash_completed_total",
+            "counter",
+            "Password hash jobs completed.",
+            [({}, hashing["completed"])],
+        ),
+        format_metric(
+            "token_cache_size",
+            "gauge",
+            "Verified tokens held in the cache.",
+            [({}, tokens["size"])],
+        ),
+        format_metric(
+            "token_cache_hits_total",
+            "counter",
+            "Token cache hits.",
+            [({}, tokens["hits"])],
+        ),
+        format_metric(
+            "token_cache_misses_total",
+            "counter",
+            "Token cache misses.",
+            [({}, tokens["misses"])],
+        ),
+    ]
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> str:
+    return "".join(_pool_metrics() + _auth_metrics()) + render_registry()
@@ -1,41 +1,50 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio.session import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 from database.connection import get_session
 from models.users import TokenResponse, SignUpUser, User
 from auth.hash_password import HashPassword
 from fastapi.security import OAuth2PasswordRequestForm
 from auth.jwt_handler import create_access_token
+from monitoring.timing import TimedRoute, phase
 
 hash_password = HashPassword()
 
 
 user_router = APIRouter(
     tags=["User"],
+    route_class=TimedRoute,
 )
 
 
+def _email_is(email: str):
+    return func.lower(User.email) == email.lower()
+
+
 @user_router.post("/signup")
 async def sign_user_up(
     data: SignUpUser, session: AsyncSession = Depends(get_session)
 ) -> dict:
-    statement = select(User).where(User.email == data.email)
-    result = await session.execute(statement)
-    user = result.scalar()
-    if user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="User with supplied email exists",
+    # The lookup spares taken emails a hash; the insert settles races with
+    # concurrent signups.
+    query = select(User.id).where(_email_is(data.email))
+    if await session.scalar(query) is None:
+        with phase("hash"):
+            hashed_password = await hash_password.create_hash_async(data.password)
+        statement = (
+            insert(User)
+            .values(email=data.email, password=hashed_password)
+            .on_conflict_do_nothing(index_elements=[func.lower(User.email)])
+            .returning(User.id)
         )
-
-    user = User(**data.model_dump())
-    hashed_password = hash_password.create_hash(data.password)
-    user.password = hashed_password
-    session.add(user)
-    await session.commit()
-    await session.refresh(user)
-
-    return {"message": "User successfully registered!"}
+        if await session.scalar(statement) is not None:
+            await session.commit()
+            return {"message": "User successfully registered!"}
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="User with supplied email exists",
+    )
 
 
 @user_router.post("/signin", response_model=TokenResponse)
@@ -43,7 +52,7 @@ async def sign_user_in(
     data: OAuth2PasswordRequestForm = Depends(),
     session: AsyncSession = Depends(get_session),
 ) -> TokenResponse | dict:
-    statement = select(User).where(User.email == data.username)
+    statement = select(User).where(_email_is(data.username))
     result = await session.execute(statement)
     user = result.scalar()
     if not user:
@@ -51,10 +60,17 @@ async def sign_user_in(
             status_code=status.HTTP_404_NOT_FOUND, detail="User does not exist"
         )
 
-    if not hash_password.verify_hash(data.password, user.password):
+    with phase("hash"):
+        verified, new_hash = await hash_password.verify_and_update_async(
+            data.password, user.password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Wrong credential passed"
         )
+    if new_hash:
+        user.password = new_hash
+        await session.commit()
 
-    access_token = create_access_token(data.username)
+    access_token = create_access_token(user.email)
     return TokenResponse(access_token=access_token, token_type="Bearer")
@@ -0,0 +1,183 @@
+"""Overlap checks between events booked at the same location.
+
+An event takes up [date, end_date), or only the instant it starts when it
+has no end_date; Event.during holds that range and the ix_events_during GiST
+index finds single events overlapping a slot without scanning the location.
+Recurring series store the range of their first occurrence only, so series
+at the location, or with an override moving an occurrence there, that may
+reach the slot are expanded around it instead.
+
+A new or changed series is checked occurrence by occurrence over a window,
+which callers cap: an unbounded series has no last occurrence to stop at.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import ColumnElement, column, exists, func, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.events import Event
+from scheduling.recurrence import expand
+
+NO_DURATION = timedelta(0)
+
+
+class Conflict(NamedTuple):
+    event: Event
+    date: datetime
+    # Start of the occurrence before any override moved it.
+    original: datetime
+
+
+def overlaps(
+    start: datetime,
+    end: datetime | None,
+    other_start: datetime,
+    other_end: datetime | None,
+) -> bool:
+    """Whether two slots overlap the way tsrange's && operator decides it."""
+    if end is None:
+        if other_end is None:
+            return start == other_start
+        return other_start <= start < other_end
+    if other_end is None:
+        return start <= other_start < end
+    return start < other_end and other_start < end
+
+
+def slot(start: datetime, end: datetime | None):
+    """The tsrange Event.during holds for an event from start to end."""
+    if end is None:
+        return func.tsrange(start, start, "[]")
+    return func.tsrange(start, end, "[)")
+
+
+async def lock_location(session: AsyncSession, location: str) -> None:
+    """Serialize conflict checks and writes at a location until commit."""
+    await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(location))))
+
+
+def _moved_to(location: str):
+    """Whether an override of a series places an occurrence at location."""
+    override = func.jsonb_each(Event.overrides).table_valued(column("value", JSONB))
+    return exists(
+        select(1)
+        .select_from(override)
+        .where(override.c.value["location"].astext == location)
+    )
+
+
+async def find_conflicts(
+    session: AsyncSession,
+    location: str,
+    start: datetime,
+    end: datetime | None = None,
+    exclude: int | None = None,
+) -> list[Conflict]:
+    """Events and occurrences at location overlapping [start, end), by date."""
+    criteria: list[ColumnElement[bool]] = [Event.deleted_at.is_(None)]
+    if exclude is not None:
+        criteria.append(Event.id != exclude)
+    singles = select(Event).where(
+        Event.rrule.is_(None),
+        Event.location == location,
+        Event.during.overlaps(slot(start, end)),
+        *criteria,
+    )
+    conflicts = [
+        Conflict(event, event.date, event.date)
+        for event in await session.scalars(singles)
+    ]
+
+    duration = func.coalesce(Event.end_date - Event.date, NO_DURATION)
+    series = select(Event).where(
+        Event.rrule.is_not(None),
+        Event.date <= (end or start),
+        or_(Event.recurrence_end.is_(None), Event.recurrence_end + duration >= start),
+        or_(Event.location == location, _moved_to(location)),
+        *criteria,
+    )
+    for event in await session.scalars(series):
+        assert event.rrule is not None
+        length = event.end_date - event.date if event.end_date else None
+        window_start = start - (length or NO_DURATION)
+        window_end = (end or start) + timedelta(microseconds=1)
+        for date, original in expand(
+            event.rrule,
+            event.date,
+            event.exdates,
+            event.overrides,
+            window_start,
+            window_end,
+        ):
+            override = event.overrides.get(original.isoformat(), {})
+            if override.get("location", event.location) != location:
+                continue
+            if overlaps(start, end, date, date + length if length else None):
+                conflicts.append(Conflict(event, date, original))
+    conflicts.sort(key=lambda conflict: (conflict.date, conflict.event.id))
+    return conflicts
+
+
+async def find_series_conflicts(
+    session: AsyncSession,
+    values: dict,
+    start: datetime,
+    end: datetime,
+    exclude: int | None = None,
+) -> list[Conflict]:
+    """Events and occurrences overlapping any occurrence of the series in
+    values (date, end_date, location, rrule, exdates and overrides) that
+    starts within [start, end), by date.
+
+    Locks every location an occurrence is at, as lock_location does.
+    """
+    overrides = values.get("overrides") or {}
+    length = values["end_date"] - values["date"] if values["end_date"] else None
+    starts = defaultdict(list)
+    for date, original in expand(
+        values["rrule"],
+        values["date"],
+        values.get("exdates") or [],
+        overrides,
+        start,
+        end,
+    ):
+        override = overrides.get(original.isoformat(), {})
+        starts[override.get("location") or values["location"]].append(date)
+
+    conflicts = []
+    # In a fixed order, so that concurrent checks cannot deadlock.
+    for location in sorted(starts):
+        await lock_location(session, location)
+        dates = starts[location]
+        last = dates[-1] + (length or timedelta(microseconds=1))
+        for conflict in await find_conflicts(
+            session, location, dates[0], last, exclude
+        ):
+            other = conflict.event
+            other_end = (
+                conflict.date + (other.end_date - other.date)
+                if other.end_date
+                else None
+            )
+            # All occurrences have the same length, so the latest one starting
+            # before the other slot ends (or, for an instant, by it) reaches
+            # furthest; if it does not overlap the slot, none does.
+            if other_end is None:
+                index = bisect_right(dates, conflict.date)
+            else:
+                index = bisect_left(dates, other_end)
+            if index and overlaps(
+                dates[index - 1],
+                dates[index - 1] + length if length else None,
+                conflict.date,
+                other_end,
+            ):
+                conflicts.append(conflict)
+    conflicts.sort(key=lambda conflict: (conflict.date, conflict.event.id))
+    return conflicts
@@ -0,0 +1,326 @@
+"""Windowed expansion of RFC 5545 recurrence rules.
+
+Supports the RRULE parts FREQ (DAILY, WEEKLY, MONTHLY, YEARLY), INTERVAL,
+COUNT, UNTIL, BYDAY (with ordinals such as 2MO or -1FR for MONTHLY and
+YEARLY), BYMONTHDAY and BYMONTH. Weeks start on Monday. For YEARLY rules
+BYDAY and BYMONTHDAY apply within the months of BYMONTH, or within the
+month of the first occurrence. For DAILY and WEEKLY rules BYMONTH and
+BYMONTHDAY only drop days from the ones the rule yields otherwise.
+
+Occurrences are generated lazily and only for the requested window: the
+expansion jumps straight to the period containing the window start, so its
+cost depends on the size of the window, not on how far it lies from the
+first occurrence.
+"""
+
+import calendar
+import heapq
+import re
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Iterator, NamedTuple
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 100_000
+# A rule can match no day in many consecutive periods (BYMONTHDAY=30 in a
+# February-only rule); give up after this many rather than loop forever.
+MAX_EMPTY_PERIODS = 1000
+
+_BYDAY = re.compile(r"^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$")
+
+
+class RecurrenceRule(NamedTuple):
+    freq: str
+    interval: int = 1
+    occurrence_count: int | None = None  # COUNT
+    until: datetime | None = None
+    byday: tuple[tuple[int, int], ...] = ()  # (ordinal or 0, weekday)
+    bymonthday: tuple[int, ...] = ()
+    bymonth: tuple[int, ...] = ()
+
+
+def _parse_until(value: str) -> datetime:
+    for format in ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            until = datetime.strptime(value, format)
+        except ValueError:
+            continue
+        # A date-only UNTIL includes occurrences on that day.
+        return until if "T" in value else until.replace(hour=23, minute=59, second=59)
+    raise ValueError(f"Invalid UNTIL: {value}")
+
+
+def _parse_ints(value: str, low: int, high: int, name: str) -> tuple[int, ...]:
+    numbers = tuple(int(part) for part in value.split(","))
+    if not all(low <= abs(number) <= high for number in numbers):
+        raise ValueError(f"Invalid {name}: {value}")
+    return numbers
+
+
+@lru_cache(maxsize=1024)
+def parse_rrule(value: str) -> RecurrenceRule:
+    """Parse an RRULE value, with or without the "RRULE:" prefix."""
+    value = value.strip().removeprefix("RRULE:")
+    parts = {}
+    for part in value.split(";"):
+        key, separator, item = part.partition("=")
+        if not separator or not item:
+            raise ValueError(f"Invalid RRULE part: {part}")
+        parts[key.upper()] = item.upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    rule: dict[str, Any] = {"freq": freq}
+    if "INTERVAL" in parts:
+        rule["interval"] = int(parts.pop("INTERVAL"))
+        if rule["interval"] < 1:
+            raise ValueError("INTERVAL must be positive")
+    if "COUNT" in parts and "UNTIL" in parts:
+        raise ValueError("COUNT and UNTIL cannot both be set")
+    if "COUNT" in parts:
+        rule["occurrence_count"] = int(parts.pop("COUNT"))
+        if not 1 <= rule["occurrence_count"] <= MAX_COUNT:
+            raise ValueError(f"COUNT must be between 1 and {MAX_COUNT}")
+    if "UNTIL" in parts:
+        rule["until"] = _parse_until(parts.pop("UNTIL"))
+    if "BYDAY" in parts:
+        byday = []
+        for item in parts.pop("BYDAY").split(","):
+            match = _BYDAY.match(item)
+            if not match:
+                raise ValueError(f"Invalid BYDAY: {item}")
+            ordinal = int(match.group(1) or 0)
+            if ordinal and (freq not in ("MONTHLY", "YEARLY") or abs(ordinal) > 5):
+                raise ValueError(f"Invalid BYDAY ordinal: {item}")
+            byday.append((ordinal, WEEKDAYS.index(match.group(2))))
+        rule["byday"] = tuple(byday)
+    if "BYMONTHDAY" in parts:
+        rule["bymonthday"] = _parse_ints(parts.pop("BYMONTHDAY"), 1, 31, "BYMONTHDAY")
+    if "BYMONTH" in parts:
+        rule["bymonth"] = _parse_ints(parts.pop("BYMONTH"), 1, 12, "BYMONTH")
+        if any(month < 0 for month in rule["bymonth"]):
+            raise ValueError("BYMONTH must be positive")
+    if parts:
+        raise ValueError(f"Unsupported RRULE parts: {', '.join(sorted(parts))}")
+    return RecurrenceRule(**rule)
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _month_days(rule: RecurrenceRule, year: int, month: int, first: date) -> list:
+    last = calendar.monthrange(year, month)[1]
+    monthdays = {day if day > 0 else last + day + 1 for day in rule.bymonthday}
+    weekdays: set[int] = set()
+    for ordinal, weekday in rule.byday:
+        start = (weekday - date(year, month, 1).weekday()) % 7 + 1
+        matches = range(start, last + 1, 7)
+        if not ordinal:
+            weekdays.update(matches)
+        elif ordinal <= len(matches) and -ordinal <= len(matches):
+            weekdays.add(matches[ordinal - 1 if ordinal > 0 else ordinal])
+    if rule.bymonthday and rule.byday:
+        days = monthdays & weekdays
+    else:
+        days = monthdays | weekdays or {first.day}
+    return [date(year, month, day) for day in sorted(days) if 1 <= day <= last]
+
+
+def _limit(rule: RecurrenceRule, first: date, days: list) -> list:
+    """days without those outside BYMONTH or BYMONTHDAY."""
+    if rule.bymonth:
+        days = [day for day in days if day.month in rule.bymonth]
+    if rule.bymonthday:
+        days = [
+            day for day in days if day in _month_days(rule, day.year, day.month, first)
+        ]
+    return days
+
+
+def _period(rule: RecurrenceRule, first: date, index: int) -> tuple[date, list]:
+    """The first day of the index-th period and the days it yields."""
+    step = index * rule.interval
+    if rule.freq == "DAILY":
+        day = first + timedelta(days=step)
+        days = [day]
+        if rule.byday:
+            weekdays = {weekday for _, weekday in rule.byday}
+            days = [day for day in days if day.weekday() in weekdays]
+        return day, _limit(rule, first, days)
+    if rule.freq == "WEEKLY":
+        start = _week_start(first) + timedelta(weeks=step)
+        offsets = sorted({weekday for _, weekday in rule.byday}) or [first.weekday()]
+        days = [start + timedelta(days=offset) for offset in offsets]
+        return start, _limit(rule, first, days)
+    if rule.freq == "MONTHLY":
+        year, month = divmod(first.year * 12 + first.month - 1 + step, 12)
+        month += 1
+        start = date(year, month, 1)
+        if rule.bymonth and month not in rule.bymonth:
+            return start, []
+        return start, _month_days(rule, year, month, first)
+    year = first.year + step
+    days = []
+    for month in sorted(rule.bymonth or (first.month,)):
+        days.extend(_month_days(rule, year, month, first))
+    return date(year, 1, 1), days
+
+
+def _period_index(rule: RecurrenceRule, first: date, at: date) -> int:
+    if at <= first:
+        return 0
+    if rule.freq == "DAILY":
+        units = (at - first).days
+    elif rule.freq == "WEEKLY":
+        units = (_week_start(at) - _week_start(first)).days // 7
+    elif rule.freq == "MONTHLY":
+        units = (at.year - first.year) * 12 + at.month - first.month
+    else:
+        units = at.year - first.year
+    return units // rule.interval
+
+
+def _dates(
+    rule: RecurrenceRule,
+    dtstart: datetime,
+    start: datetime | None,
+    end: datetime | None,
+    until: datetime | None,
+) -> Iterator[datetime]:
+    first = dtstart.date()
+    index = _period_index(rule, first, start.date()) if start else 0
+    empty = 0
+    while True:
+        period_start, days = _period(rule, first, index)
+        if end is not None and period_start >= end.date() + timedelta(days=1):
+            return
+        if until is not None and period_start > until.date():
+            return
+        empty = 0 if days else empty + 1
+        if empty > MAX_EMPTY_PERIODS:
+            return
+        for day in days:
+            occurrence = datetime.combine(day, dtstart.time())
+            if occurrence < dtstart or (start is not None and occurrence < start):
+                continue
+            if until is not None and occurrence > until:
+                return
+            if end is not None and occurrence >= end:
+                return
+            yield occurrence
+        index += 1
+
+
+def _last_of_count(rule: RecurrenceRule, dtstart: datetime) -> datetime | None:
+    """The last occurrence of a COUNT rule whose every period yields exactly
+    the day of the first one, computed directly; None for other rules."""
+    if rule.occurrence_count is None or rule.byday or rule.bymonthday or rule.bymonth:
+        return None
+    steps = (rule.occurrence_count - 1) * rule.interval
+    try:
+        if rule.freq == "DAILY":
+            return dtstart + timedelta(days=steps)
+        if rule.freq == "WEEKLY":
+            return dtstart + timedelta(weeks=steps)
+    except OverflowError:
+        raise ValueError("Series must end before year 10000") from None
+    # Months without the day of the first occurrence are skipped.
+    if dtstart.day > 28:
+        return None
+    if rule.freq == "YEARLY":
+        steps *= 12
+    year, month = divmod(dtstart.year * 12 + dtstart.month - 1 + steps, 12)
+    if year > 9999:
+        raise ValueError("Series must end before year 10000")
+    return dtstart.replace(year=year, month=month + 1)
+
+
+@lru_cache(maxsize=4096)
+def last_occurrence(rrule: str, dtstart: datetime) -> datetime | None:
+    """Start of the last occurrence of a bounded series, None if unbounded.
+
+    For UNTIL this is the UNTIL bound itself, which is enough to filter
+    series by date range. A COUNT may need up to MAX_COUNT occurrences
+    generated, so async callers run this in a thread.
+    """
+    rule = parse_rrule(rrule)
+    if rule.until is not None:
+        return rule.until
+    if rule.occurrence_count is None:
+        return None
+    last = _last_of_count(rule, dtstart)
+    if last is not None:
+        return last
+    for last in islice(_dates(rule, dtstart, None, None, None), rule.occurrence_count):
+        pass
+    return last or dtstart
+
+
+def occurrences(
+    rrule: str,
+    dtstart: datetime,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Iterator[datetime]:
+    """Occurrence starts of a series within [start, end), in order."""
+    until = last_occurrence(rrule, dtstart)
+    return _dates(parse_rrule(rrule), dtstart, start, end, until)
+
+
+def series_end(
+    rrule: str, dtstart: datetime, overrides: dict[str, dict]
+) -> datetime | None:
+    """Latest start of any occurrence of a series, None if it has no end.
+
+    Raises ValueError when an override changes a date that is not an
+    occurrence of the series, or moves one before the series starts.
+    """
+    end = last_occurrence(rrule, dtstart)
+    for key, override in overrides.items():
+        original = datetime.fromisoformat(key)
+        window = occurrences(rrule, dtstart, original, original + timedelta(seconds=1))
+        if next(window, None) != original:
+            raise ValueError(f"{original.isoformat()} is not an occurrence")
+        if "date" not in override:
+            continue
+        moved = datetime.fromisoformat(override["date"])
+        if moved < dtstart:
+            raise ValueError("Occurrences cannot move before the first one")
+        if end is not None:
+            end = max(end, moved)
+    return end
+
+
+def expand(
+    rrule: str,
+    dtstart: datetime,
+    exdates: list[datetime],
+    overrides: dict[str, dict],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Iterator[tuple[datetime, datetime]]:
+    """(date, original date) of each occurrence within [start, end), in date
+    order, leaving out exdates and placing occurrences moved by an override
+    at their new date."""
+    skipped = set(exdates)
+    moved = []
+    for key, override in overrides.items():
+        if "date" not in override:
+            continue
+        original = datetime.fromisoformat(key)
+        skipped.add(original)
+        new = datetime.fromisoformat(override["date"])
+        if original in exdates:
+            continue
+        if (start is None or new >= start) and (end is None or new < end):
+            moved.append((new, original))
+    regular = (
+        (occurrence, occurrence)
+        for occurrence in occurrences(rrule, dtstart, start, end)
+        if occurrence not in skipped
+    )
+    return iter(heapq.merge(regular, sorted(moved)))
@@ -0,0 +1,99 @@
+"""Production entry point.
+
+    python src/server.py
+
+Runs SERVER_WORKERS uvicorn worker processes behind one listening socket.
+uvicorn picks uvloop and httptools when they are installed (the
+uvicorn[standard] extra) and falls back to asyncio and h11 otherwise. On
+SIGTERM or SIGINT each worker stops accepting connections, waits up to
+SERVER_GRACEFUL_TIMEOUT seconds for in-flight requests to finish and then
+runs the application's lifespan shutdown, which closes the database pools.
+Open change streams are ended first, through main.begin_shutdown, so that
+they do not hold up that wait.
+
+SERVER_WORKERS defaults to 1. The in-memory event cache and rate limiter and
+the local change stream keep their state in each process: with more workers
+a worker would serve events another one has changed until the cache TTL
+runs out, and each would allow the full rate limit. So more than one worker
+requires the redis and postgres backends.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from types import FrameType
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from config import Settings, get_settings
+
+
+def per_process_backends(settings: Settings) -> list[str]:
+    """The settings whose backend keeps its state in each worker."""
+    backends = []
+    if settings.event_cache_backend == "memory":
+        backends.append("EVENT_CACHE_BACKEND=memory")
+    if settings.rate_limit_enabled and settings.rate_limit_backend == "memory":
+        backends.append("RATE_LIMIT_BACKEND=memory")
+    if settings.event_stream_backend == "local":
+        backends.append("EVENT_STREAM_BACKEND=local")
+    return backends
+
+
+class Server(uvicorn.Server):
+    """uvicorn's server, telling the application when it starts to stop."""
+
+    def handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        super().handle_exit(sig, frame)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # The worker has loaded the application by now, so this import only
+        # looks it up, and the supervisor process never imports it.
+        from main import begin_shutdown
+
+        # Signal handlers interrupt whatever the loop is running; this waits
+        # for the loop instead.
+        loop.call_soon_threadsafe(begin_shutdown)
+
+
+def main() -> None:
+    settings = get_settings()
+    backends = per_process_backends(settings)
+    if settings.server_workers > 1 and backends:
+        raise SystemExit(
+            f"SERVER_WORKERS={settings.server_workers} needs shared backends,"
+            f" but {', '.join(backends)}"
+        )
+    logging.basicConfig(level=logging.INFO)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    config = uvicorn.Config(
+        "main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=settings.server_workers,
+        loop="auto",
+        http="auto",
+        lifespan="on",
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keep_alive,
+        timeout_graceful_shutdown=settings.server_graceful_timeout,
+        limit_concurrency=settings.server_limit_concurrency,
+        proxy_headers=settings.server_proxy_headers,
+        forwarded_allow_ips=settings.server_forwarded_allow_ips,
+        access_log=settings.server_access_log,
+    )
+    server = Server(config)
+    # As uvicorn.run does, but with Server in every worker.
+    if config.workers > 1:
+        sockets = [config.bind_socket()]
+        Multiprocess(config, target=server.run, sockets=sockets).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
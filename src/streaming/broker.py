@@ -0,0 +1,92 @@
+"""In-process fan-out of messages to many subscribers.
+
+Publishing never waits on subscribers. Each one buffers at most `queue_size`
+messages; a subscriber that falls that far behind is dropped rather than
+slowing the others down or growing its buffer without bound. A dropped
+subscription still hands out what it buffered, then ends with
+`missed_messages` set so its consumer knows to resynchronize. Once the
+broker is closed, new subscriptions end as soon as they start.
+"""
+
+import asyncio
+
+from monitoring.prometheus import Counter
+
+stream_subscribers_dropped = Counter(
+    "event_stream_subscribers_dropped_total",
+    "Change stream subscribers dropped because they may have missed messages.",
+)
+
+_CLOSED = object()
+
+
+class Subscription:
+    def __init__(self, broker: "Broker"):
+        self._broker = broker
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.missed_messages = False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _put(self, message) -> None:
+        self._queue.put_nowait(message)
+
+    async def get(self):
+        """The next message, or None once the subscription is closed."""
+        message = await self._queue.get()
+        if message is _CLOSED:
+            # Later calls must see the end of the subscription too.
+            self._queue.put_nowait(_CLOSED)
+            return None
+        return message
+
+    def close(self, missed_messages: bool = False) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.missed_messages = missed_messages
+        self._broker._subscribers.discard(self)
+        self._queue.put_nowait(_CLOSED)
+
+
+class Broker:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: set[Subscription] = set()
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self)
+        self._subscribers.add(subscription)
+        if self.closed:
+            subscription.close(missed_messages=True)
+        return subscription
+
+    def publish(self, message) -> int:
+        """Queue message for every subscriber; returns how many got it."""
+        delivered = 0
+        for subscription in list(self._subscribers):
+            if subscription.pending() >= self.queue_size:
+                subscription.close(missed_messages=True)
+                stream_subscribers_dropped.inc()
+            else:
+                subscription._put(message)
+                delivered += 1
+        return delivered
+
+    def drop_all(self) -> None:
+        """End every subscription as one that may have missed messages."""
+        for subscription in list(self._subscribers):
+            subscription.close(missed_messages=True)
+            stream_subscribers_dropped.inc()
+
+    def close(self, missed_messages: bool = False) -> None:
+        """End every subscription, and any made later."""
+        self.closed = True
+        for subscription in list(self._subscribers):
+            subscription.close(missed_messages)
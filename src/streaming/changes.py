@@ -0,0 +1,185 @@
+"""Live notifications of event changes.
+
+Write handlers call `notify_changes` inside their transaction. With the
+"postgres" backend that issues NOTIFY on CHANNEL, which Postgres delivers
+once the transaction commits and drops on rollback, to every worker process:
+each keeps one dedicated connection listening on the channel and fans the
+notifications out to its stream subscribers through a `Broker`. The "local"
+backend hands committed changes straight to this process's broker instead,
+which only reaches clients of the same worker.
+
+Subscribers get each change as a ready Server-Sent Events frame, encoded
+once however many clients receive it.
+"""
+
+import asyncio
+import json
+import logging
+from functools import lru_cache
+from typing import Iterator
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+
+from config import get_settings
+from streaming.broker import Broker, Subscription
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "event_changes"
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+MAX_PAYLOAD = 7900
+NOTIFY = text(
+    "SELECT pg_notify(:channel, chunk) FROM unnest(CAST(:chunks AS text[])) AS chunk"
+)
+RESET = b"event: reset\ndata: {}\n\n"
+
+
+def sse_frame(message: dict) -> bytes:
+    data = json.dumps(message["payload"], separators=(",", ":"))
+    return f"event: {message['topic']}\ndata: {data}\n\n".encode()
+
+
+def _chunks(messages: list[dict]) -> Iterator[str]:
+    """JSON arrays of messages, each small enough for one NOTIFY."""
+    batch: list[str] = []
+    size = 2
+    for message in messages:
+        encoded = json.dumps(message, separators=(",", ":"))
+        if batch and size + len(encoded) + 1 > MAX_PAYLOAD:
+            yield f"[{','.join(batch)}]"
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield f"[{','.join(batch)}]"
+
+
+def _publish_committed(session: Session) -> None:
+    pending = session.info["stream_changes"]
+    broker = get_change_stream().broker
+    for message in pending:
+        broker.publish(sse_frame(message))
+    pending.clear()
+
+
+def _discard_uncommitted(session: Session, transaction: SessionTransaction) -> None:
+    # Runs after _publish_committed on commit, and on rollback or close.
+    if transaction.parent is None:
+        session.info["stream_changes"].clear()
+
+
+async def notify_changes(
+    session: AsyncSession, topic: str, payloads: list[dict]
+) -> None:
+    """Announce changes to stream subscribers when the caller commits."""
+    if not payloads:
+        return
+    messages = [{"topic": topic, "payload": payload} for payload in payloads]
+    if get_settings().event_stream_backend == "postgres":
+        parameters = {"channel": CHANNEL, "chunks": list(_chunks(messages))}
+        await session.execute(NOTIFY, parameters)
+        return
+    if "stream_changes" not in session.info:
+        session.info["stream_changes"] = []
+        event.listen(session.sync_session, "after_commit", _publish_committed)
+        event.listen(
+            session.sync_session, "after_transaction_end", _discard_uncommitted
+        )
+    session.info["stream_changes"].extend(messages)
+
+
+class ChangeStream:
+    """The change subscribers of one worker process.
+
+    With a database URL the stream listens on CHANNEL over its own
+    connection, opened with the first subscription. When that connection
+    drops it reconnects, and ends every subscription as one that may have
+    missed changes.
+    """
+
+    def __init__(self, broker: Broker, url: str | None = None, retry: float = 1.0):
+        self.broker = broker
+        self.dsn = None
+        if url:
+            # asyncpg takes the URL without SQLAlchemy's driver suffix.
+            dsn = make_url(url).set(drivername="postgresql")
+            self.dsn = dsn.render_as_string(hide_password=False)
+        self.retry = retry
+        self.listening = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self) -> Subscription:
+        if (
+            self.dsn
+            and not self.broker.closed
+            and (self._task is None or self._task.done())
+        ):
+            self.listening = asyncio.Event()
+            self._task = asyncio.create_task(self._listen())
+        return self.broker.subscribe()
+
+    def _received(self, connection, pid: int, channel: str, payload: str) -> None:
+        for message in json.loads(payload):
+            self.broker.publish(sse_frame(message))
+
+    async def _listen(self) -> None:
+        # asyncpg is imported here to keep it out of the app's import time.
+        import asyncpg
+
+        connected_before = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as exc:
+                logger.warning("Change stream cannot connect: %r", exc)
+                await asyncio.sleep(self.retry)
+                continue
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda connection: lost.set())
+            try:
+                await connection.add_listener(CHANNEL, self._received)
+                if connected_before:
+                    self.broker.drop_all()
+                connected_before = True
+                self.listening.set()
+                await lost.wait()
+                logger.warning("Change stream connection lost, reconnecting")
+            except asyncpg.PostgresError as exc:
+                logger.warning("Change stream cannot listen: %r", exc)
+            finally:
+                self.listening.clear()
+                await connection.close()
+            await asyncio.sleep(self.retry)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.broker.close()
+
+
+@lru_cache
+def get_change_stream() -> ChangeStream:
+    settings = get_settings()
+    broker = Broker(settings.event_stream_queue_size)
+    if settings.event_stream_backend == "local":
+        return ChangeStream(broker)
+    if not settings.database_url_prod:
+        raise ValueError("DATABASE_URL_PROD environment variable is not set")
+    return ChangeStream(broker, settings.database_url_prod)
+
+
+def shutdown_change_stream() -> None:
+    """End the open streams with a reset, so that their clients resynchronize
+    and reconnect to a worker that is not shutting down."""
+    if get_change_stream.cache_info().currsize:
+        get_change_stream().broker.close(missed_messages=True)
+
+
+async def close_change_stream() -> None:
+    if get_change_stream.cache_info().currsize:
+        await get_change_stream().close()
@@ -8,7 +8,12 @@ from sqlalchemy.pool import NullPool
 
 from main import app
 from database.base import Base
-from database.connection import get_session
+from database.connection import (
+    get_session,
+    get_session_maker,
+    get_read_session,
+    get_read_session_maker,
+)
 
 load_dotenv()
 
@@ -42,9 +47,13 @@ def event_loop():
 
 
 @pytest.fixture(scope="function")
-async def test_session(engine):
-    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    async with session_maker() as session:
+def test_session_maker(engine):
+    return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest.fixture(scope="function")
+async def test_session(test_session_maker):
+    async with test_session_maker() as session:
         try:
             yield session
         finally:
@@ -52,8 +61,11 @@ async def test_session(engine):
 
 
 @pytest.fixture(scope="function")
-async def client(test_session):
+async def client(test_session, test_session_maker):
     app.dependency_overrides[get_session] = lambda: test_session
+    app.dependency_overrides[get_session_maker] = lambda: test_session_maker
+    app.dependency_overrides[get_read_session] = lambda: test_session
+    app.dependency_overrides[get_read_session_maker] = lambda: test_session_maker
     async with AsyncClient(
         transport=ASGITransport(app), base_url="http://localhost"
     ) as client:
@@ -0,0 +1,82 @@
+from cache.backends import SET_IF_NEWER, MemoryCache, RedisCache, order_of
+from cache.etag import (
+    etag_matches,
+    if_match_versions,
+    not_modified_since,
+    page_etag,
+)
+from cache.events import CachedEvent, EventCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def eval(self, script, numkeys, key, value, order, ex):
+        # Stands in for the Lua script, which a real server runs.
+        assert script == SET_IF_NEWER
+        current = self.data.get(key)
+        if current is not None and order_of(current) >= order:
+            return 0
+        self.data[key] = value
+        return 1
+
+
+async def test_event_cache_round_trip() -> None:
+    for backend in (MemoryCache(maxsize=10), RedisCache(FakeRedis())):
+        cache = EventCache(backend, ttl=60)
+        event = CachedEvent(
+            3, '"3"', "Wed, 28 Aug 2024 14:38:04 GMT", b'{"title":"Event\ntitle"}'
+        )
+        assert await cache.set(1, event)
+        assert await cache.get(1) == event
+        await cache.invalidate({1: 4})
+        assert await cache.get(1) is None
+
+        # A read from before the write cannot put its copy back; one of the
+        # new version can, and a marker of an older write cannot remove it.
+        assert not await cache.set(1, event)
+        assert await cache.get(1) is None
+        newer = event._replace(version=4, etag='"4"')
+        assert await cache.set(1, newer)
+        await cache.invalidate({1: 4})
+        assert await cache.get(1) == newer
+
+
+async def test_memory_cache_evicts_least_recently_used() -> None:
+    cache = MemoryCache(maxsize=2)
+    await cache.set("a", b"1", ttl=60)
+    await cache.set("b", b"2", ttl=60)
+    await cache.get("a")
+    await cache.set("c", b"3", ttl=60)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"1"
+
+
+def test_etag_matches() -> None:
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"xyz", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"xyz"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_conditional_request_helpers() -> None:
+    assert if_match_versions('"3", W/"4", "x"') == [3]
+    assert if_match_versions("*") is None
+    assert page_etag([(2, 1), (1, 5)]) == page_etag([(1, 5), (2, 1)])
+    assert page_etag([(1, 5)]) != page_etag([(1, 6)])
+    last_modified = "Wed, 28 Aug 2024 14:38:04 GMT"
+    assert not_modified_since(last_modified, last_modified)
+    assert not not_modified_since("Wed, 28 Aug 2024 14:38:03 GMT", last_modified)
+    assert not not_modified_since("yesterday", last_modified)
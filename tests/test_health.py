@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from database.connection import get_session, warm_pool
+from main import app
+import server
+from config import Settings
+from server import per_process_backends
+from tests.conftest import DATABASE_URL
+
+
+class BrokenSession:
+    async def execute(self, statement):
+        raise ConnectionRefusedError("database is down")
+
+
+async def test_live(client: httpx.AsyncClient) -> None:
+    response = await client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+async def test_ready(client: httpx.AsyncClient) -> None:
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "checks": {"database": "ok"}}
+
+    app.dependency_overrides[get_session] = lambda: BrokenSession()
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json() == {
+        "status": "unavailable",
+        "checks": {"database": "unavailable"},
+    }
+
+
+async def test_warm_pool_opens_connections() -> None:
+    engine = create_async_engine(DATABASE_URL, pool_size=3)
+    assert await warm_pool(engine, 3) == 3
+    assert engine.pool.checkedin() == 3
+    await engine.dispose()
+
+
+def test_workers_need_shared_backends(monkeypatch) -> None:
+    settings = Settings(server_workers=2, event_cache_backend="redis")
+    assert per_process_backends(settings) == ["RATE_LIMIT_BACKEND=memory"]
+    monkeypatch.setattr(server, "get_settings", lambda: settings)
+    with pytest.raises(SystemExit, match="RATE_LIMIT_BACKEND=memory"):
+        server.main()
+
+    settings = Settings(
+        server_workers=2, event_cache_backend="redis", rate_limit_enabled=False
+    )
+    assert per_process_backends(settings) == []
+    assert Settings().server_workers == 1
@@ -1,4 +1,15 @@
+import asyncio
+from collections import Counter
 import httpx
+import pytest
+from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from auth.hash_password import get_pwd_context
+from config import get_settings
+from tests.conftest import DATABASE_URL
+from database.connection import get_session
+from main import app
+from models.users import User
 
 
 async def test_sign_new_user(client: httpx.AsyncClient) -> None:
@@ -30,3 +41,61 @@ async def test_sign_user_in(client: httpx.AsyncClient) -> None:
     response = await client.post("/user/signin", data=payload, headers=headers)
     assert response.status_code == 200
     assert response.json()["token_type"] == "Bearer"
+
+
+async def test_sign_user_in_rehashes_outdated_password(
+    client: httpx.AsyncClient, test_session: AsyncSession
+) -> None:
+    weak_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    user = User(email="rehash@server.com", password=weak_context.hash("secret"))
+    test_session.add(user)
+    await test_session.commit()
+
+    payload = {"username": "rehash@server.com", "password": "secret"}
+    response = await client.post("/user/signin", data=payload)
+    assert response.status_code == 200
+
+    await test_session.refresh(user)
+    assert not get_pwd_context().needs_update(user.password)
+    assert get_pwd_context().verify("secret", user.password)
+
+
+async def test_concurrent_signups_and_case_insensitive_emails(
+    client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(get_settings(), "rate_limit_enabled", False)
+    monkeypatch.setattr(get_settings(), "bcrypt_rounds", 4)
+    get_pwd_context.cache_clear()
+    # Concurrent requests need their own sessions; a bounded pool keeps
+    # them within the server's connection limit.
+    engine = create_async_engine(DATABASE_URL, pool_size=20, max_overflow=0)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_own_session():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_own_session
+    emails = [
+        f"race{n % 10}@server.com" if n % 2 else f"Race{n % 10}@Server.com"
+        for n in range(300)
+    ]
+    try:
+        responses = await asyncio.gather(
+            *(
+                client.post("/user/signup", json={"email": email, "password": "pw"})
+                for email in emails
+            )
+        )
+        response = await client.post(
+            "/user/signin", data={"username": "RACE3@server.com", "password": "pw"}
+        )
+    finally:
+        get_pwd_context.cache_clear()
+        await engine.dispose()
+
+    assert Counter(response.status_code for response in responses) == {
+        200: 10,
+        409: 290,
+    }
+    assert response.status_code == 200
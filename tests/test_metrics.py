@@ -0,0 +1,39 @@
+import httpx
+import pytest
+from auth.jwt_handler import create_access_token
+from database import connection
+from tests.conftest import DATABASE_URL
+
+
+async def test_metrics(
+    client: httpx.AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Pools are reported once their engine has been created; this one points
+    # at the test database, not DATABASE_URL_PROD.
+    engine = connection.create_engine(DATABASE_URL)
+    monkeypatch.setattr(connection, "_engines", {"primary": engine})
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'db_pool_checked_out{role="primary"}' in response.text
+    assert "token_cache_hits_total" in response.text
+    assert "password_hash_waiting" in response.text
+    await engine.dispose()
+
+
+async def test_server_timing_header(client: httpx.AsyncClient) -> None:
+    headers = {"Authorization": f"Bearer {create_access_token('timing@server.com')}"}
+    response = await client.get("/event/", headers=headers)
+    assert response.status_code == 200
+    phases = [
+        entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")
+    ]
+    assert {"auth", "serialize", "total"} <= set(phases)
+
+    response = await client.get("/metrics")
+    assert 'http_request_duration_seconds_count{method="GET",route="/event/"}' in (
+        response.text
+    )
+    assert 'http_request_phase_seconds_count{route="/event/",phase="auth"}' in (
+        response.text
+    )
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.events import EVENT_IDS_FUNCTION, EVENT_IDS_TRIGGER
+from models.stats import SUMMARY_FUNCTION, SUMMARY_TRIGGER
+from models.users import User
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def revision(id: str):
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    return ScriptDirectory.from_config(config).get_revision(id).module
+
+
+def normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def test_summary_trigger_matches_migrations() -> None:
+    # Tests build the schema from the models, production from the migrations,
+    # which keep their own copies of the DDL. These are the latest copies; a
+    # migration that changes the function or trigger takes their place here.
+    migration = revision("cd158959429c")
+    assert normalize(migration.SUMMARY_FUNCTION) == normalize(
+        SUMMARY_FUNCTION.statement
+    )
+    assert normalize(migration.SUMMARY_TRIGGER) == normalize(SUMMARY_TRIGGER.statement)
+
+
+def test_event_ids_trigger_matches_migrations() -> None:
+    migration = revision("ad53d2564b0e")
+    assert normalize(migration.EVENT_IDS_FUNCTION) == normalize(
+        EVENT_IDS_FUNCTION.statement
+    )
+    assert normalize(migration.EVENT_IDS_TRIGGER) == normalize(
+        EVENT_IDS_TRIGGER.statement
+    )
+
+
+async def test_email_index_lists_case_duplicates(engine: AsyncEngine) -> None:
+    migration = revision("ab1435bd35d9")
+    async with engine.connect() as connection:
+        await connection.run_sync(migration.reject_case_duplicates)
+        await connection.execute(text("DROP INDEX ix_users_email_lower"))
+        await connection.execute(
+            insert(User),
+            [
+                {"email": "Twice@server.com", "password": "x"},
+                {"email": "twice@server.com", "password": "x"},
+            ],
+        )
+        with pytest.raises(RuntimeError, match="Twice@server.com, twice@server.com"):
+            await connection.run_sync(migration.reject_case_duplicates)
+        await connection.rollback()
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from models.outbox import OutboxMessage
+from outbox.publisher import enqueue
+from outbox.worker import OutboxWorker
+
+
+@pytest.fixture
+async def make_session(test_session_maker) -> async_sessionmaker[AsyncSession]:
+    async with test_session_maker() as session:
+        await session.execute(delete(OutboxMessage))
+        await session.commit()
+    return test_session_maker
+
+
+async def test_worker_delivers_in_batches(make_session) -> None:
+    async with make_session() as session:
+        await enqueue(session, "test.topic", [{"n": n} for n in range(5)])
+        await session.commit()
+
+    delivered = []
+
+    async def handler(topic: str, payload: dict) -> None:
+        delivered.append(payload["n"])
+
+    worker = OutboxWorker(make_session, {"test.topic": [handler]}, batch_size=2)
+    assert await worker.process_batch() == 2
+    assert await worker.drain() == 3
+    assert delivered == [0, 1, 2, 3, 4]
+    assert (await worker.backlog())["pending"] == 0
+
+
+async def test_worker_retries_with_backoff(make_session) -> None:
+    async with make_session() as session:
+        await enqueue(session, "test.topic", [{"n": 1}])
+        await session.commit()
+
+    async def failing(topic: str, payload: dict) -> None:
+        raise RuntimeError("unavailable")
+
+    worker = OutboxWorker(
+        make_session, {"test.topic": [failing]}, max_attempts=2, backoff_base=3600
+    )
+    assert await worker.drain() == 1
+    async with make_session() as session:
+        message = await session.scalar(select(OutboxMessage))
+        assert message.attempts == 1
+        assert message.failed_at is None
+        assert message.available_at > message.created_at
+        assert "unavailable" in message.last_error
+
+    worker.backoff_base = 0
+    async with make_session() as session:
+        message.available_at = message.created_at
+        await session.merge(message)
+        await session.commit()
+    assert await worker.drain() == 1
+    async with make_session() as session:
+        message = await session.scalar(select(OutboxMessage))
+        assert message.attempts == 2
+        assert message.failed_at is not None
+    assert await worker.backlog() == {
+        "pending": 0,
+        "oldest_age_seconds": 0.0,
+        "failed": 1,
+    }
+
+
+async def test_rolled_back_messages_are_discarded(make_session) -> None:
+    async with make_session() as session:
+        await enqueue(session, "test.topic", [{"n": 1}])
+        await session.rollback()
+    worker = OutboxWorker(make_session, {})
+    assert await worker.drain() == 0
@@ -0,0 +1,79 @@
+import httpx
+import pytest
+from middleware.rate_limit import (
+    AUTH_PATHS,
+    Limit,
+    MemoryBuckets,
+    RateLimitMiddleware,
+    Rule,
+)
+
+
+def test_parse_limit() -> None:
+    assert Limit.parse("10/60") == Limit(rate=10 / 60, burst=10)
+    assert Limit.parse("") is None
+    for value in ("0/60", "10/0", "-1/60", "10/-60", "10/inf"):
+        with pytest.raises(ValueError, match="Invalid rate limit"):
+            Limit.parse(value)
+
+
+async def test_memory_buckets_refill() -> None:
+    buckets = MemoryBuckets(maxsize=10)
+    limit = Limit(rate=1000, burst=2)
+    assert await buckets.take("key", limit) == 0
+    assert await buckets.take("key", limit) == 0
+    assert 0 < await buckets.take("key", limit) <= 0.001
+    assert await buckets.take("other", limit) == 0
+
+
+@pytest.fixture
+def limited_client():
+    received = []
+
+    async def app(scope, receive, send):
+        message = await receive()
+        received.append(message["body"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    rules = [
+        Rule("auth_email", "email", Limit(rate=0.01, burst=2), AUTH_PATHS),
+        Rule("auth_ip", "ip", Limit(rate=0.01, burst=3), AUTH_PATHS),
+    ]
+    middleware = RateLimitMiddleware(app, rules=rules, backend=MemoryBuckets(100))
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(middleware), base_url="http://localhost"
+    )
+    return client, received
+
+
+async def test_login_attempts_are_throttled_per_email(limited_client) -> None:
+    client, received = limited_client
+    form = {"username": "Victim@server.com", "password": "guess"}
+    for _ in range(2):
+        response = await client.post("/user/signin", data=form)
+        assert response.status_code == 200
+    response = await client.post(
+        "/user/signin", data={**form, "username": "victim@server.com"}
+    )
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "100"
+    assert len(received) == 2
+    assert received[0] == b"username=Victim%40server.com&password=guess"
+
+    response = await client.post(
+        "/user/signup", json={"email": "other@server.com", "password": "secret"}
+    )
+    assert response.status_code == 200
+    response = await client.post(
+        "/user/signup", json={"email": "new@server.com", "password": "secret"}
+    )
+    assert response.status_code == 429
+    assert len(received) == 3
+
+
+async def test_unlimited_paths_pass_through(limited_client) -> None:
+    client, received = limited_client
+    for _ in range(5):
+        response = await client.post("/event/new", json={"email": "a@server.com"})
+        assert response.status_code == 200
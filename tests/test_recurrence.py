@@ -0,0 +1,133 @@
+from datetime import datetime
+from itertools import islice
+import pytest
+from scheduling.recurrence import (
+    expand,
+    last_occurrence,
+    occurrences,
+    parse_rrule,
+    series_end,
+)
+
+START = datetime(2024, 1, 1, 9, 0)
+
+
+def test_occurrences_follow_rule() -> None:
+    assert list(occurrences("FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4", START)) == [
+        datetime(2024, 1, 1, 9),
+        datetime(2024, 1, 3, 9),
+        datetime(2024, 1, 8, 9),
+        datetime(2024, 1, 10, 9),
+    ]
+    # Months without a 31st are skipped.
+    window = occurrences("FREQ=MONTHLY;BYMONTHDAY=31", START, end=datetime(2024, 6, 1))
+    assert [occurrence.month for occurrence in window] == [1, 3, 5]
+    last_fridays = occurrences(
+        "RRULE:FREQ=MONTHLY;BYDAY=-1FR;UNTIL=20240331", START, START
+    )
+    assert [occurrence.day for occurrence in last_fridays] == [26, 23, 29]
+
+
+def test_occurrences_window_far_from_start() -> None:
+    window = occurrences(
+        "FREQ=DAILY;INTERVAL=3", START, datetime(2090, 1, 1), datetime(2090, 1, 10)
+    )
+    assert list(window) == [
+        datetime(2090, 1, 2, 9),
+        datetime(2090, 1, 5, 9),
+        datetime(2090, 1, 8, 9),
+    ]
+
+
+def test_expand_applies_exdates_and_overrides() -> None:
+    overrides = {
+        "2024-01-02T09:00:00": {"date": "2024-01-09T09:00:00"},
+        "2024-01-04T09:00:00": {"title": "Renamed"},
+    }
+    exdates = [datetime(2024, 1, 3, 9)]
+    assert list(expand("FREQ=DAILY;COUNT=5", START, exdates, overrides)) == [
+        (datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 9)),
+        (datetime(2024, 1, 4, 9), datetime(2024, 1, 4, 9)),
+        (datetime(2024, 1, 5, 9), datetime(2024, 1, 5, 9)),
+        (datetime(2024, 1, 9, 9), datetime(2024, 1, 2, 9)),
+    ]
+    assert series_end("FREQ=DAILY;COUNT=5", START, overrides) == datetime(2024, 1, 9, 9)
+    assert series_end("FREQ=DAILY", START, overrides) is None
+
+
+@pytest.mark.parametrize(
+    "rrule, days",
+    [
+        ("FREQ=DAILY;BYMONTH=3", ["2026-03-01", "2026-03-02", "2026-03-03"]),
+        ("FREQ=DAILY;BYMONTHDAY=15", ["2026-01-15", "2026-02-15", "2026-03-15"]),
+        ("FREQ=DAILY;BYDAY=MO", ["2026-01-05", "2026-01-12", "2026-01-19"]),
+        ("FREQ=WEEKLY;BYMONTH=6", ["2026-06-04", "2026-06-11", "2026-06-18"]),
+        ("FREQ=WEEKLY;BYMONTHDAY=15", ["2026-01-15", "2026-10-15", "2027-04-15"]),
+        ("FREQ=WEEKLY;BYDAY=MO,FR", ["2026-01-02", "2026-01-05", "2026-01-09"]),
+        (
+            "FREQ=WEEKLY;BYDAY=MO,FR;BYMONTH=6;BYMONTHDAY=1,5",
+            ["2026-06-01", "2026-06-05", "2028-06-05"],
+        ),
+        ("FREQ=MONTHLY;BYMONTH=3", ["2026-03-01", "2027-03-01", "2028-03-01"]),
+        ("FREQ=MONTHLY;BYMONTHDAY=15", ["2026-01-15", "2026-02-15", "2026-03-15"]),
+        ("FREQ=MONTHLY;BYDAY=1MO", ["2026-01-05", "2026-02-02", "2026-03-02"]),
+        ("FREQ=YEARLY;BYMONTH=3", ["2026-03-01", "2027-03-01", "2028-03-01"]),
+        ("FREQ=YEARLY;BYMONTHDAY=15", ["2026-01-15", "2027-01-15", "2028-01-15"]),
+        ("FREQ=YEARLY;BYDAY=1FR", ["2026-01-02", "2027-01-01", "2028-01-07"]),
+    ],
+)
+def test_by_parts_for_each_frequency(rrule: str, days: list[str]) -> None:
+    # 2026-01-01 is a Thursday.
+    start = datetime(2026, 1, 1, 9)
+    assert [
+        occurrence.date().isoformat()
+        for occurrence in islice(occurrences(rrule, start), 3)
+    ] == days
+
+
+def test_daily_bymonth_window_far_from_start() -> None:
+    window = occurrences(
+        "FREQ=DAILY;BYMONTH=3", START, datetime(2030, 2, 27), datetime(2030, 3, 3)
+    )
+    assert [occurrence.day for occurrence in window] == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "rrule, count",
+    [
+        ("FREQ=DAILY;INTERVAL=3", 40),
+        ("FREQ=WEEKLY", 1),
+        ("FREQ=MONTHLY;INTERVAL=5", 30),
+        ("FREQ=YEARLY", 12),
+        ("FREQ=WEEKLY;BYDAY=MO,WE", 7),
+    ],
+)
+def test_last_occurrence_of_count(rrule: str, count: int) -> None:
+    # Rules with one occurrence per period compute it without generating them.
+    for start in (START, datetime(2024, 1, 31, 9)):
+        *_, last = islice(occurrences(rrule, start), count)
+        assert last_occurrence(f"{rrule};COUNT={count}", start) == last
+
+
+@pytest.mark.parametrize(
+    "rrule",
+    [
+        "FREQ=HOURLY",
+        "FREQ=DAILY;COUNT=2;UNTIL=20240101",
+        "FREQ=WEEKLY;BYDAY=2MO",
+        "FREQ=DAILY;BYSETPOS=1",
+        "FREQ=DAILY;INTERVAL=0",
+    ],
+)
+def test_parse_rrule_rejects_unsupported_rules(rrule: str) -> None:
+    with pytest.raises(ValueError):
+        parse_rrule(rrule)
+
+
+def test_series_end_rejects_unknown_occurrences() -> None:
+    with pytest.raises(ValueError):
+        series_end("FREQ=DAILY", START, {"2024-01-02T10:00:00": {"title": "x"}})
+    with pytest.raises(ValueError):
+        series_end(
+            "FREQ=DAILY", START, {"2024-01-02T09:00:00": {"date": "2023-12-31T09:00"}}
+        )
@@ -1,10 +1,25 @@
+import asyncio
+import csv
+import gzip
+import json
 import httpx
 import pytest
 from auth.jwt_handler import create_access_token
-from sqlalchemy.ext.asyncio import AsyncSession
-from models.events import Event
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from config import get_settings
+from database.connection import get_read_session
+from main import app
+from cache.events import get_event_cache
+from database.maintenance import start_maintenance
+from database.partitions import archive_partitions, ensure_partitions
+from models.events import Event, EventId, EventRequest
+from models.outbox import OutboxMessage
+from models.stats import EventTagDayCount
+from models.users import User
 from typing import AsyncGenerator
-from datetime import datetime
+from datetime import date, datetime
 
 
 @pytest.fixture
@@ -35,7 +50,7 @@ async def test_get_events(
     headers = {"Authorization": f"Bearer {access_token}"}
     response = await client.get("/event/", headers=headers)
     assert response.status_code == 200
-    assert response.json()[0]["title"] == mock_event.title
+    assert response.json()["items"][0]["title"] == mock_event.title
 
 
 async def test_get_event(
@@ -95,3 +110,1066 @@ async def test_get_event_again(client: httpx.AsyncClient, access_token: str) ->
     headers = {"Authorization": f"Bearer {access_token}"}
     response = await client.get("/event/1", headers=headers)
     assert response.status_code == 404
+
+
+async def test_get_events_paginated(
+    client: httpx.AsyncClient, test_session: AsyncSession, access_token: str
+) -> None:
+    test_session.add_all(
+        Event(
+            creator="testuser@server.com",
+            title=f"Paged event {day}",
+            date=datetime(2024, 9, day, 10, 0, 0),
+            description="Event description",
+            tags=["paged"],
+            location="Paged location",
+        )
+        for day in (1, 2, 3)
+    )
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {access_token}"}
+    params = {"location": "Paged location", "tag": "paged", "limit": 2}
+
+    response = await client.get("/event/", params=params, headers=headers)
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [e["title"] for e in first_page["items"]] == [
+        "Paged event 1",
+        "Paged event 2",
+    ]
+    assert first_page["prev_cursor"] is None
+
+    params["cursor"] = first_page["next_cursor"]
+    response = await client.get("/event/", params=params, headers=headers)
+    second_page = response.json()
+    assert [e["title"] for e in second_page["items"]] == ["Paged event 3"]
+    assert second_page["next_cursor"] is None
+
+    params["cursor"] = second_page["prev_cursor"]
+    response = await client.get("/event/", params=params, headers=headers)
+    assert response.json()["items"] == first_page["items"]
+
+
+async def test_get_events_invalid_cursor(
+    client: httpx.AsyncClient, access_token: str
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = await client.get("/event/?cursor=garbage", headers=headers)
+    assert response.status_code == 400
+
+
+async def test_export_events_ndjson(
+    client: httpx.AsyncClient, access_token: str
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = await client.get("/event/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert lines
+    assert {"id", "title", "date"} <= json.loads(lines[0]).keys()
+    assert all("creator" not in json.loads(line) for line in lines)
+
+
+async def test_export_events_json(client: httpx.AsyncClient, access_token: str) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = await client.get("/event/export?format=json", headers=headers)
+    assert response.status_code == 200
+    ids = [event["id"] for event in response.json()]
+    assert ids == sorted(ids)
+
+
+async def test_get_event_not_modified(
+    client: httpx.AsyncClient, mock_event: Event, access_token: str
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = await client.get(f"/event/{mock_event.id}", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    headers["If-None-Match"] = etag
+    response = await client.get(f"/event/{mock_event.id}", headers=headers)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    await client.patch(
+        f"/event/edit/{mock_event.id}", json={"title": "Changed"}, headers=headers
+    )
+    response = await client.get(f"/event/{mock_event.id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Changed"
+    assert response.headers["ETag"] != etag
+
+
+async def test_bulk_create_update_delete(
+    client: httpx.AsyncClient, test_session: AsyncSession, access_token: str
+) -> None:
+    foreign_event = Event(
+        creator="other@server.com",
+        title="Foreign event",
+        date=datetime(2024, 8, 28, 14, 38, 4),
+        description="Event description",
+        tags=[],
+        location="Event location",
+    )
+    test_session.add(foreign_event)
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {access_token}"}
+    payload = [
+        {
+            "title": f"Bulk event {n}",
+            "date": "2024-08-28T14:38:04",
+            "description": "Event description",
+            "tags": ["bulk"],
+            "location": "Event location",
+        }
+        for n in range(3)
+    ]
+
+    response = await client.post("/event/bulk/new", json=payload, headers=headers)
+    assert response.status_code == 200
+    ids = [item["id"] for item in response.json()]
+    assert len(ids) == 3
+    assert all(item["status"] == 200 for item in response.json())
+
+    payload = [
+        {"id": ids[0], "title": "Bulk updated"},
+        {"id": foreign_event.id, "title": "Hijacked"},
+        {"id": 999999, "title": "Missing"},
+    ]
+    response = await client.patch("/event/bulk/edit", json=payload, headers=headers)
+    assert [item["status"] for item in response.json()] == [200, 403, 404]
+    response = await client.get(f"/event/{ids[0]}", headers=headers)
+    assert response.json()["title"] == "Bulk updated"
+
+    payload = [ids[1], foreign_event.id, 999999]
+    response = await client.post("/event/bulk/delete", json=payload, headers=headers)
+    assert [item["status"] for item in response.json()] == [200, 403, 404]
+    response = await client.get(f"/event/{ids[1]}", headers=headers)
+    assert response.status_code == 404
+
+
+async def test_bulk_update_rejects_repeated_ids(
+    client: httpx.AsyncClient, access_token: str
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    event = {
+        "title": "Repeated event",
+        "date": "2024-08-28T14:38:04",
+        "description": "Event description",
+        "tags": [],
+        "location": "Event location",
+    }
+    response = await client.post(
+        "/event/bulk/new", json=[event, event], headers=headers
+    )
+    ids = [item["id"] for item in response.json()]
+    response = await client.get(f"/event/{ids[0]}", headers=headers)
+    etag = response.headers["ETag"]
+
+    payload = [
+        {"id": ids[0], "title": "First"},
+        {"id": ids[1], "title": "Other"},
+        {"id": ids[0], "title": "Second"},
+    ]
+    response = await client.patch("/event/bulk/edit", json=payload, headers=headers)
+    assert [item["status"] for item in response.json()] == [409, 200, 409]
+
+    response = await client.get(f"/event/{ids[0]}", headers=headers)
+    assert response.json()["title"] == "Repeated event"
+    assert response.headers["ETag"] == etag
+    response = await client.get(f"/event/{ids[1]}", headers=headers)
+    assert response.json()["title"] == "Other"
+
+
+async def test_search_events(
+    client: httpx.AsyncClient, test_session: AsyncSession, access_token: str
+) -> None:
+    test_session.add_all(
+        [
+            Event(
+                creator="testuser@server.com",
+                title="Python meetup",
+                date=datetime(2024, 10, 1, 18, 0, 0),
+                description="Talks about asyncio and databases",
+                tags=["python", "meetup"],
+                location="Berlin, Mitte",
+            ),
+            Event(
+                creator="testuser@server.com",
+                title="Rust workshop",
+                date=datetime(2024, 10, 2, 18, 0, 0),
+                description="Hands-on session, bring a laptop with Python",
+                tags=["rust", "workshop"],
+                location="Berlin, Kreuzberg",
+            ),
+        ]
+    )
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = await client.get("/event/search?q=python", headers=headers)
+    assert response.status_code == 200
+    titles = [hit["title"] for hit in response.json()]
+    assert titles == ["Python meetup", "Rust workshop"]
+
+    response = await client.get(
+        "/event/search?tags_all=python&tags_all=meetup", headers=headers
+    )
+    assert [hit["title"] for hit in response.json()] == ["Python meetup"]
+
+    response = await client.get(
+        "/event/search?tags_any=rust&tags_any=go&location_prefix=Berlin",
+        headers=headers,
+    )
+    assert [hit["title"] for hit in response.json()] == ["Rust workshop"]
+
+    response = await client.get("/event/search", headers=headers)
+    assert response.status_code == 400
+
+
+async def test_update_and_delete_foreign_event(
+    client: httpx.AsyncClient, test_session: AsyncSession, access_token: str
+) -> None:
+    foreign_event = Event(
+        creator="other@server.com",
+        title="Foreign event",
+        date=datetime(2024, 8, 28, 14, 38, 4),
+        description="Event description",
+        tags=[],
+        location="Event location",
+    )
+    test_session.add(foreign_event)
+    await test_session.commit()
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = await client.patch(
+        f"/event/edit/{foreign_event.id}", json={"title": "Hijacked"}, headers=headers
+    )
+    assert response.status_code == 403
+    response = await client.patch(
+        "/event/edit/999999", json={"title": "Missing"}, headers=headers
+    )
+    assert response.status_code == 404
+    response = await client.delete(f"/event/delete/{foreign_event.id}", headers=headers)
+    assert response.status_code == 403
+    response = await client.delete("/event/delete/999999", headers=headers)
+    assert response.status_code == 404
+
+
+async def test_fast_serialization_matches_schema(
+    client: httpx.AsyncClient,
+    mock_event: Event,
+    access_token: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    params = {"location": "Event location", "limit": 5}
+    expected = (await client.get("/event/", params=params, headers=headers)).json()
+    search = {"location_prefix": "Event loc"}
+    expected_hits = (
+        await client.get("/event/search", params=search, headers=headers)
+    ).json()
+
+    monkeypatch.setattr(get_settings(), "events_fast_serialization", True)
+    response = await client.get("/event/", params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == expected
+    response = await client.get("/event/search", params=search, headers=headers)
+    assert response.json() == expected_hits
+
+    cache = get_event_cache()
+    await cache.backend.delete(cache._key(mock_event.id))
+    response = await client.get(f"/event/{mock_event.id}", headers=headers)
+    assert response.json() == EventRequest.model_validate(
+        mock_event, from_attributes=True
+    ).model_dump(mode="json")
+
+
+async def test_event_stats(
+    client: httpx.AsyncClient, access_token: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    events = [
+        {
+            "title": f"Stats event {n}",
+            "date": f"2031-03-0{n + 1}T10:00:00",
+            "description": "Event description",
+            "tags": ["stats", f"stats{n % 2}"],
+            "location": "Lisbon" if n < 3 else "Porto",
+        }
+        for n in range(5)
+    ]
+    response = await client.post("/event/bulk/new", json=events, headers=headers)
+    ids = [item["id"] for item in response.json()]
+    await client.patch(
+        "/event/bulk/edit",
+        json=[{"id": ids[0], "location": "Porto", "tags": ["stats"]}],
+        headers=headers,
+    )
+    await client.post("/event/bulk/delete", json=[ids[4]], headers=headers)
+
+    window = {"start": "2031-03-01", "end": "2031-04-01"}
+    response = await client.get(
+        "/event/stats/buckets", params={**window, "unit": "month"}, headers=headers
+    )
+    assert response.status_code == 200
+    # ids are listed in ascending order.
+    assert response.json() == [
+        {"bucket": "2031-03-01T00:00:00", "count": 4, "ids": ids[:4]}
+    ]
+    response = await client.get(
+        "/event/stats/locations", params=window, headers=headers
+    )
+    stats = {item["key"]: item for item in response.json()}
+    assert {key: item["count"] for key, item in stats.items()} == {
+        "Lisbon": 2,
+        "Porto": 2,
+    }
+    assert stats["Porto"]["ids"] == [ids[0], ids[3]]
+    response = await client.get("/event/stats/tags", params=window, headers=headers)
+    expected_tags = {"stats": 4, "stats0": 1, "stats1": 2}
+    assert {item["key"]: item["count"] for item in response.json()} == expected_tags
+
+    monkeypatch.setattr(get_settings(), "events_stats_from_summary", True)
+    summary = {**window, "include_ids": "false"}
+    response = await client.get(
+        "/event/stats/buckets", params={**summary, "unit": "week"}, headers=headers
+    )
+    assert sum(item["count"] for item in response.json()) == 4
+    assert all(item["ids"] is None for item in response.json())
+    response = await client.get(
+        "/event/stats/locations", params=summary, headers=headers
+    )
+    assert {item["key"]: item["count"] for item in response.json()} == {
+        "Lisbon": 2,
+        "Porto": 2,
+    }
+    response = await client.get("/event/stats/tags", params=summary, headers=headers)
+    assert {item["key"]: item["count"] for item in response.json()} == expected_tags
+
+    response = await client.get(
+        "/event/stats/buckets", params={**window, "unit": "year"}, headers=headers
+    )
+    assert response.status_code == 422
+
+
+async def test_event_writes_enqueue_outbox_messages(
+    client: httpx.AsyncClient, access_token: str, test_session: AsyncSession
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    payload = {
+        "title": "Outbox event",
+        "date": "2024-08-28T14:38:04",
+        "description": "Event description",
+        "tags": ["outbox"],
+        "location": "Event location",
+    }
+    response = await client.post("/event/new", json=payload, headers=headers)
+    assert response.status_code == 200
+    statement = select(OutboxMessage.payload).where(
+        OutboxMessage.topic == "event.created"
+    )
+    id = (await test_session.scalars(statement)).all()[-1]["id"]
+
+    await client.patch(f"/event/edit/{id}", json={"title": "Moved"}, headers=headers)
+    await client.delete(f"/event/delete/{id}", headers=headers)
+    statement = (
+        select(OutboxMessage.topic, OutboxMessage.payload)
+        .where(OutboxMessage.payload["id"].as_integer() == id)
+        .order_by(OutboxMessage.id)
+    )
+    messages = (await test_session.execute(statement)).all()
+    assert [tuple(message) for message in messages] == [
+        ("event.created", {"id": id, "creator": "testuser@server.com"}),
+        (
+            "event.updated",
+            {"id": id, "creator": "testuser@server.com", "fields": ["title"]},
+        ),
+        ("event.deleted", {"id": id, "creator": "testuser@server.com"}),
+    ]
+
+
+async def test_get_events_expands_recurring_events(
+    client: httpx.AsyncClient, access_token: str
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    base = {"description": "Event description", "tags": [], "location": "Expand"}
+    series = {
+        **base,
+        "title": "Standup",
+        "date": "2035-01-01T09:00:00",
+        "rrule": "FREQ=WEEKLY;COUNT=6",
+        "exdates": ["2035-01-15T09:00:00"],
+        "overrides": {
+            "2035-01-22T09:00:00": {"date": "2035-01-23T12:00:00", "title": "Moved"}
+        },
+    }
+    single = {**base, "title": "Review", "date": "2035-01-09T10:00:00"}
+    response = await client.post(
+        "/event/bulk/new", json=[series, single], headers=headers
+    )
+    series_id, single_id = [item["id"] for item in response.json()]
+
+    params = {
+        "location": "Expand",
+        "expand": "true",
+        "date_from": "2035-01-05T00:00:00",
+        "date_to": "2035-02-01T00:00:00",
+        "limit": 2,
+    }
+    pages = []
+    response = await client.get("/event/", params=params, headers=headers)
+    while True:
+        assert response.status_code == 200
+        pages.append(response.json()["items"])
+        cursor = response.json()["next_cursor"]
+        if not cursor:
+            break
+        response = await client.get(
+            "/event/", params={**params, "cursor": cursor}, headers=headers
+        )
+    occurrences = [
+        (item["id"], item["title"], item["date"], item["occurrence"])
+        for page in pages
+        for item in page
+    ]
+    assert occurrences == [
+        (series_id, "Standup", "2035-01-08T09:00:00", "2035-01-08T09:00:00"),
+        (single_id, "Review", "2035-01-09T10:00:00", "2035-01-09T10:00:00"),
+        (series_id, "Moved", "2035-01-23T12:00:00", "2035-01-22T09:00:00"),
+        (series_id, "Standup", "2035-01-29T09:00:00", "2035-01-29T09:00:00"),
+    ]
+
+    # The override would no longer match an occurrence of the shorter series.
+    edit = {"rrule": "FREQ=WEEKLY;COUNT=2"}
+    response = await client.patch(
+        f"/event/edit/{series_id}", json=edit, headers=headers
+    )
+    assert response.status_code == 422
+    edit["overrides"] = {}
+    response = await client.patch(
+        f"/event/edit/{series_id}", json=edit, headers=headers
+    )
+    assert response.status_code == 200
+    response = await client.get("/event/", params=params, headers=headers)
+    assert [item["date"] for item in response.json()["items"]] == [
+        "2035-01-08T09:00:00",
+        "2035-01-09T10:00:00",
+    ]
+
+    response = await client.post(
+        "/event/new", json={**single, "rrule": "FREQ=HOURLY"}, headers=headers
+    )
+    assert response.status_code == 422
+
+
+async def test_conditional_requests(
+    client: httpx.AsyncClient, access_token: str
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    event = {
+        "title": "Conditional",
+        "date": "2036-01-01T09:00:00",
+        "description": "Event description",
+        "tags": [],
+        "location": "Conditional",
+    }
+    response = await client.post("/event/bulk/new", json=[event], headers=headers)
+    id = response.json()[0]["id"]
+
+    params = {"location": "Conditional"}
+    response = await client.get("/event/", params=params, headers=headers)
+    list_etag = response.headers["ETag"]
+    response = await client.get(
+        "/event/", params=params, headers={**headers, "If-None-Match": list_etag}
+    )
+    assert response.status_code == 304
+
+    response = await client.get(f"/event/{id}", headers=headers)
+    assert response.headers["ETag"] == '"1"'
+    last_modified = response.headers["Last-Modified"]
+    response = await client.get(
+        f"/event/{id}", headers={**headers, "If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    # The list's Last-Modified is that of the latest event on the page.
+    response = await client.get("/event/", params=params, headers=headers)
+    assert response.headers["Last-Modified"] == last_modified
+    response = await client.get(
+        "/event/",
+        params=params,
+        headers={**headers, "If-Modified-Since": last_modified},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == list_etag
+    assert response.headers["Last-Modified"] == last_modified
+    earlier = "Mon, 01 Jan 2024 00:00:00 GMT"
+    response = await client.get(
+        "/event/", params=params, headers={**headers, "If-Modified-Since": earlier}
+    )
+    assert response.status_code == 200
+    # If-None-Match takes precedence over If-Modified-Since.
+    response = await client.get(
+        "/event/",
+        params=params,
+        headers={
+            **headers,
+            "If-None-Match": '"stale"',
+            "If-Modified-Since": last_modified,
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["items"][0]["id"] == id
+
+    stale = {**headers, "If-Match": '"1"'}
+    response = await client.patch(
+        f"/event/edit/{id}", json={"title": "First"}, headers=stale
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+    response = await client.patch(
+        f"/event/edit/{id}", json={"title": "Second"}, headers=stale
+    )
+    assert response.status_code == 412
+    response = await client.delete(f"/event/delete/{id}", headers=stale)
+    assert response.status_code == 412
+
+    # Cache misses read the primary, never a replica that may still hold the
+    # version the edit invalidated.
+    replica = app.dependency_overrides[get_read_session]
+    app.dependency_overrides[get_read_session] = lambda: None
+    response = await client.get(f"/event/{id}", headers=headers)
+    assert response.headers["ETag"] == '"2"'
+    app.dependency_overrides[get_read_session] = replica
+
+    response = await client.get(
+        "/event/", params=params, headers={**headers, "If-None-Match": list_etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["items"][0]["title"] == "First"
+    response = await client.delete(
+        f"/event/delete/{id}", headers={**headers, "If-Match": '"2"'}
+    )
+    assert response.status_code == 200
+
+
+async def test_sync_events(client: httpx.AsyncClient, access_token: str) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    async def sync(token: str | None, limit: int) -> tuple[list, list, str]:
+        events, deleted = [], []
+        while True:
+            params = {"limit": limit, **({"token": token} if token else {})}
+            response = await client.get("/event/sync", params=params, headers=headers)
+            assert response.status_code == 200
+            page = response.json()
+            events += page["events"]
+            deleted += page["deleted"]
+            token = page["token"]
+            if not page["has_more"]:
+                return events, deleted, token
+
+    events, deleted, token = await sync(None, 200)
+    assert deleted == []
+    assert len({event["id"] for event in events}) == len(events)
+
+    event = {
+        "title": "Synced",
+        "date": "2037-01-01T09:00:00",
+        "description": "Event description",
+        "tags": [],
+        "location": "Sync",
+    }
+    response = await client.post(
+        "/event/bulk/new", json=[event, event, event], headers=headers
+    )
+    kept, removed, unchanged = [item["id"] for item in response.json()]
+    events, _, token = await sync(token, 200)
+    assert {kept, removed, unchanged} <= {event["id"] for event in events}
+
+    await client.patch(f"/event/edit/{kept}", json={"title": "Edited"}, headers=headers)
+    await client.delete(f"/event/delete/{removed}", headers=headers)
+    events, deleted, token = await sync(token, 1)
+    assert [(event["id"], event["title"]) for event in events] == [(kept, "Edited")]
+    assert deleted == [removed]
+    response = await client.get(f"/event/{removed}", headers=headers)
+    assert response.status_code == 404
+
+    assert (await sync(token, 200))[:2] == ([], [])
+    response = await client.get("/event/sync", params={"token": "x"}, headers=headers)
+    assert response.status_code == 400
+
+
+async def test_event_conflicts(client: httpx.AsyncClient, access_token: str) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    base = {"description": "Event description", "tags": [], "location": "Room 7"}
+    meeting = {**base, "title": "Meeting", "date": "2040-03-01T10:00:00"}
+    series = {
+        **base,
+        "title": "Weekly",
+        "date": "2040-02-02T14:00:00",
+        "end_date": "2040-02-02T15:00:00",
+        "rrule": "FREQ=WEEKLY",
+    }
+    response = await client.post(
+        "/event/bulk/new",
+        json=[{**meeting, "duration": "PT1H"}, series],
+        headers=headers,
+    )
+    meeting_id, series_id = [item["id"] for item in response.json()]
+
+    async def conflicts(**params) -> list:
+        params = {"location": "Room 7", **params}
+        response = await client.get("/event/conflicts", params=params, headers=headers)
+        assert response.status_code == 200
+        return [
+            (item["id"], item["date"], item["end_date"]) for item in response.json()
+        ]
+
+    assert await conflicts(start="2040-03-01T10:30:00", end="2040-03-01T14:30:00") == [
+        (meeting_id, "2040-03-01T10:00:00", "2040-03-01T11:00:00"),
+        (series_id, "2040-03-01T14:00:00", "2040-03-01T15:00:00"),
+    ]
+    # Ranges are half-open, and events elsewhere never clash.
+    assert await conflicts(start="2040-03-01T11:00:00", end="2040-03-01T14:00:00") == []
+    assert await conflicts(start="2040-03-01T10:00:00", exclude=meeting_id) == []
+    assert await conflicts(location="Room 8", start="2040-03-01T10:00:00") == []
+
+    clash = {**meeting, "date": "2040-03-08T14:30:00"}
+    response = await client.post(
+        "/event/new", params={"reject_conflicts": "true"}, json=clash, headers=headers
+    )
+    assert response.status_code == 409
+    response = await client.post(
+        "/event/new",
+        params={"reject_conflicts": "true"},
+        json={**clash, "date": "2040-03-08T15:00:00", "duration": "PT30M"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    # Moving the meeting keeps its length, and into the series' slot clashes.
+    move = {"date": "2040-03-15T14:15:00"}
+    response = await client.patch(
+        f"/event/edit/{meeting_id}",
+        params={"reject_conflicts": "true"},
+        json=move,
+        headers=headers,
+    )
+    assert response.status_code == 409
+    response = await client.patch(
+        f"/event/edit/{meeting_id}", json=move, headers=headers
+    )
+    assert response.json()["end_date"] == "2040-03-15T15:15:00"
+
+    response = await client.patch(
+        f"/event/edit/{meeting_id}",
+        json={"end_date": "2040-03-15T14:00:00"},
+        headers=headers,
+    )
+    assert response.status_code == 422
+
+    # A new series clashes at a later occurrence, not only at its first.
+    single = {**meeting, "location": "Room 9", "date": "2040-06-04T09:00:00"}
+    await client.post(
+        "/event/new", json={**single, "duration": "PT1H"}, headers=headers
+    )
+    mondays = {
+        **series,
+        "location": "Room 9",
+        "date": "2040-04-02T09:30:00",
+        "end_date": "2040-04-02T10:30:00",
+    }
+    response = await client.post(
+        "/event/new", params={"reject_conflicts": "true"}, json=mondays, headers=headers
+    )
+    assert response.status_code == 409
+    response = await client.post(
+        "/event/new",
+        params={"reject_conflicts": "true"},
+        json={**mondays, "rrule": "FREQ=WEEKLY;COUNT=5"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    # An override moving an occurrence to the location counts there.
+    moved = {
+        **mondays,
+        "location": "Room 10",
+        "rrule": "FREQ=WEEKLY",
+        "overrides": {"2040-04-09T09:30:00": {"location": "Room 7"}},
+    }
+    response = await client.post("/event/bulk/new", json=[moved], headers=headers)
+    moved_id = response.json()[0]["id"]
+    assert await conflicts(start="2040-04-09T10:00:00") == [
+        (moved_id, "2040-04-09T09:30:00", "2040-04-09T10:30:00")
+    ]
+    assert await conflicts(location="Room 10", start="2040-04-09T10:00:00") == []
+    response = await client.post(
+        "/event/new",
+        params={"reject_conflicts": "true"},
+        json={**meeting, "date": "2040-04-09T10:00:00"},
+        headers=headers,
+    )
+    assert response.status_code == 409
+
+
+async def test_event_partitions(
+    client: httpx.AsyncClient, access_token: str, engine: AsyncEngine, tmp_path
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    event = {
+        "title": "Archived",
+        "date": "1990-01-10T10:00:00",
+        "description": "Event description",
+        "tags": ["archived"],
+        "location": "Archive",
+    }
+    response = await client.post(
+        "/event/bulk/new",
+        json=[
+            event,
+            {**event, "date": "1990-01-20T10:00:00"},
+            {**event, "date": "1990-02-10T10:00:00"},
+            # Still live after January, so never archived with it.
+            {
+                **event,
+                "date": "1990-01-05T10:00:00",
+                "tags": ["live"],
+                "rrule": "FREQ=WEEKLY",
+            },
+            {
+                **event,
+                "date": "1990-01-25T10:00:00",
+                "end_date": "1990-02-05T10:00:00",
+                "tags": ["live"],
+            },
+        ],
+        headers=headers,
+    )
+    moved, archived, kept, series, running = [item["id"] for item in response.json()]
+
+    async def tag_counts(tag: str = "archived") -> dict:
+        count = func.sum(EventTagDayCount.count)
+        statement = (
+            select(EventTagDayCount.day, count)
+            .where(EventTagDayCount.tag == tag)
+            .group_by(EventTagDayCount.day)
+            .having(count > 0)
+        )
+        async with engine.connect() as connection:
+            rows = await connection.execute(statement)
+        return {str(day): count for day, count in rows}
+
+    # The rows wait in the default partition until their months get one.
+    async with engine.begin() as connection:
+        created = await ensure_partitions(connection, 0, date(1990, 1, 1))
+    assert {"events_p199001", "events_p199002"} <= set(created)
+    async with engine.begin() as connection:
+        assert await ensure_partitions(connection, 0, date(1990, 1, 1)) == []
+        statement = text("SELECT count(*) FROM events_default")
+        assert await connection.scalar(statement) == 0
+        statement = text(
+            "EXPLAIN SELECT id FROM events"
+            " WHERE date >= '1990-01-01' AND date < '1990-02-01'"
+        )
+        plan = "\n".join((await connection.execute(statement)).scalars())
+    assert "events_p199001" in plan and "events_p199002" not in plan
+    assert await tag_counts() == {"1990-01-10": 1, "1990-01-20": 1, "1990-02-10": 1}
+
+    response = await client.patch(
+        "/event/bulk/edit",
+        json=[{"id": moved, "date": "1990-02-11T10:00:00"}],
+        headers=headers,
+    )
+    assert response.json()[0]["status"] == 200
+    assert await tag_counts() == {"1990-01-20": 1, "1990-02-10": 1, "1990-02-11": 1}
+
+    paths = await archive_partitions(engine, date(1990, 2, 1), tmp_path)
+    assert paths == [tmp_path / "events_p199001.csv.gz"]
+    with gzip.open(paths[0], "rt") as file:
+        rows = list(csv.DictReader(file))
+    assert [(int(row["id"]), row["date"]) for row in rows] == [
+        (archived, "1990-01-20 10:00:00")
+    ]
+    assert await tag_counts() == {"1990-02-10": 1, "1990-02-11": 1}
+    response = await client.get(f"/event/{archived}", headers=headers)
+    assert response.status_code == 404
+    for id in (moved, kept, series, running):
+        response = await client.get(f"/event/{id}", headers=headers)
+        assert response.status_code == 200
+    # The series is expanded by the stats endpoints, not summarized.
+    assert await tag_counts("live") == {"1990-01-25": 1}
+    async with engine.begin() as connection:
+        statement = text("SELECT to_regclass('events_p199001')")
+        assert await connection.scalar(statement) is None
+        statement = text("SELECT id FROM events_default ORDER BY id")
+        assert (await connection.execute(statement)).scalars().all() == [
+            series,
+            running,
+        ]
+        # The live rows' month does not get a partition back.
+        assert await ensure_partitions(connection, 0, date(1990, 2, 1)) == []
+
+
+async def test_calendar_feeds(
+    client: httpx.AsyncClient, access_token: str, test_session: AsyncSession
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    # Feed tokens are issued to, and revoked by, a registered user.
+    test_session.add(User(email="Feeds@server.com", password="x"))
+    await test_session.commit()
+    feed_headers = {
+        "Authorization": f"Bearer {create_access_token('feeds@server.com')}"
+    }
+    description = "Long agenda; ünïcode, and more " * 5
+    event = {
+        "title": "Feed meetup",
+        "date": "2041-05-04T18:00:00",
+        "end_date": "2041-05-04T20:00:00",
+        "description": description,
+        "tags": ["feed"],
+        "location": "Hall, 2nd floor",
+    }
+    series = {
+        **event,
+        "title": "Feed standup",
+        "rrule": "FREQ=DAILY;COUNT=5",
+        "exdates": ["2041-05-06T18:00:00"],
+        "overrides": {"2041-05-07T18:00:00": {"date": "2041-05-07T19:00:00"}},
+    }
+    response = await client.post(
+        "/event/bulk/new", json=[event, series], headers=headers
+    )
+    event_id, series_id = [item["id"] for item in response.json()]
+
+    response = await client.get("/event/feed/tag/feed/token", headers=feed_headers)
+    assert response.status_code == 200
+    url = response.json()["url"]
+    assert url.startswith("http://localhost/event/feed/tag/feed.ics?token=")
+    response = await client.get(url)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/calendar; charset=utf-8"
+    etag = response.headers["ETag"]
+    body = response.content
+    lines = body.split(b"\r\n")
+    assert lines[0] == b"BEGIN:VCALENDAR" and lines[-2] == b"END:VCALENDAR"
+    assert max(len(line) for line in lines) <= 75
+    unfolded = body.decode().replace("\r\n ", "").split("\r\n")
+    assert unfolded.count("BEGIN:VEVENT") == 3
+    assert f"UID:event-{series_id}@planner" in unfolded
+    assert "LOCATION:Hall\\, 2nd floor" in unfolded
+    escaped = description.replace(";", "\\;").replace(",", "\\,")
+    assert f"DESCRIPTION:{escaped}" in unfolded
+    assert "RRULE:FREQ=DAILY;COUNT=5" in unfolded
+    assert "EXDATE:20410506T180000Z" in unfolded
+    assert "RECURRENCE-ID:20410507T180000Z" in unfolded
+    assert "DTSTART:20410507T190000Z" in unfolded
+    assert "DTEND:20410507T210000Z" in unfolded
+
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    response = await client.get(url)
+    assert response.headers["ETag"] == etag and response.content == body
+
+    response = await client.patch(
+        f"/event/edit/{event_id}", json={"title": "Moved meetup"}, headers=headers
+    )
+    assert response.status_code == 200
+    response = await client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert b"SUMMARY:Moved meetup\r\n" in response.content
+    response = await client.delete(f"/event/delete/{event_id}", headers=headers)
+    assert response.status_code == 200
+    response = await client.get(url)
+    assert response.content.count(b"BEGIN:VEVENT") == 2
+
+    response = await client.get("/event/feed/creator/testuser@server.com/token")
+    assert response.status_code == 401
+    token = url.partition("token=")[2]
+    response = await client.get(
+        "/event/feed/creator/testuser@server.com.ics", params={"token": token}
+    )
+    assert response.status_code == 403
+    response = await client.get(
+        "/event/feed/tag/feed.ics", params={"token": access_token}
+    )
+    assert response.status_code == 403
+
+    # Revoking stops every URL handed out before; new ones work.
+    unknown = {"Authorization": f"Bearer {create_access_token('nobody@server.com')}"}
+    response = await client.get("/event/feed/tag/feed/token", headers=unknown)
+    assert response.status_code == 403
+    response = await client.post("/event/feed/revoke", headers=feed_headers)
+    assert response.status_code == 200
+    response = await client.get(url)
+    assert response.status_code == 403
+    response = await client.get("/event/feed/tag/feed/token", headers=feed_headers)
+    response = await client.get(response.json()["url"])
+    assert response.status_code == 200
+
+
+async def test_partition_maintenance_gives_way(engine: AsyncEngine) -> None:
+    # A reader holds events; creating a partition waits only lock_timeout_ms.
+    async with engine.connect() as reader:
+        await reader.execute(text("SELECT count(*) FROM events"))
+        async with engine.connect() as connection:
+            with pytest.raises(DBAPIError, match="lock timeout"):
+                await ensure_partitions(
+                    connection, 0, date(2100, 1, 1), lock_timeout_ms=100
+                )
+            await connection.rollback()
+        await reader.rollback()
+
+    # A database that is down is logged and retried, never fatal.
+    broken = create_async_engine("postgresql+asyncpg://nobody@127.0.0.1:1/none")
+    tasks = start_maintenance(broken)
+    await asyncio.sleep(0.2)
+    assert tasks and not any(task.done() for task in tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_event_ids_stay_unique(
+    client: httpx.AsyncClient, access_token: str, engine: AsyncEngine
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    event = {
+        "title": "Unique",
+        "date": "2047-01-10T10:00:00",
+        "description": "Event description",
+        "tags": [],
+        "location": "Unique",
+    }
+    response = await client.post("/event/bulk/new", json=[event], headers=headers)
+    id = response.json()[0]["id"]
+
+    # Moving the event to another month moves its id along.
+    response = await client.patch(
+        f"/event/edit/{id}", json={"date": "2047-03-10T10:00:00"}, headers=headers
+    )
+    assert response.status_code == 200
+    response = await client.get(f"/event/{id}", headers=headers)
+    assert response.json()["date"] == "2047-03-10T10:00:00"
+    async with engine.connect() as connection:
+        date = await connection.scalar(select(EventId.date).where(EventId.id == id))
+    assert date == datetime(2047, 3, 10, 10)
+
+    # The primary key of events includes date; event_ids still rejects the id.
+    copy = {**event, "id": id, "date": datetime(2047, 5, 1), "creator": "x"}
+    async with engine.connect() as connection:
+        with pytest.raises(IntegrityError):
+            await connection.execute(insert(Event).values(**copy))
+
+
+async def test_stale_read_does_not_outlive_update(
+    client: httpx.AsyncClient, access_token: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    import routes.events
+
+    headers = {"Authorization": f"Bearer {access_token}"}
+    event = {
+        "title": "Raced",
+        "date": "2047-02-10T10:00:00",
+        "description": "Event description",
+        "tags": [],
+        "location": "Raced",
+    }
+    response = await client.post("/event/bulk/new", json=[event], headers=headers)
+    id = response.json()[0]["id"]
+    load_event = routes.events._load_event
+
+    async def load_then_update(session, id):
+        # The read finishes first, the update commits and invalidates, and
+        # only then does the read try to cache what it saw.
+        loaded = await load_event(session, id)
+        monkeypatch.setattr(routes.events, "_load_event", load_event)
+        response = await client.patch(
+            f"/event/edit/{id}", json={"title": "Updated"}, headers=headers
+        )
+        assert response.headers["ETag"] == '"2"'
+        return loaded
+
+    monkeypatch.setattr(routes.events, "_load_event", load_then_update)
+    response = await client.get(f"/event/{id}", headers=headers)
+    assert response.headers["ETag"] == '"1"'
+
+    response = await client.get(f"/event/{id}", headers=headers)
+    assert response.headers["ETag"] == '"2"'
+    assert response.json()["title"] == "Updated"
+
+
+async def test_event_stats_expand_series(
+    client: httpx.AsyncClient, access_token: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    headers = {"Authorization": f"Bearer {access_token}"}
+    window = {"start": "2036-02-01", "end": "2036-04-01"}
+
+    async def stats(path: str, field: str = "key", **params) -> dict:
+        # Open-ended series from other tests recur in the window too.
+        params = {**window, **params}
+        response = await client.get(path, params=params, headers=headers)
+        return {item[field]: (item["count"], item["ids"]) for item in response.json()}
+
+    def added(before: dict, after: dict) -> dict:
+        return {
+            key: count - before.get(key, (0,))[0]
+            for key, (count, _) in after.items()
+            if count != before.get(key, (0,))[0]
+        }
+
+    paths = {
+        "buckets": ("/event/stats/buckets", "bucket"),
+        "locations": ("/event/stats/locations", "key"),
+        "tags": ("/event/stats/tags", "key"),
+    }
+    params = {"unit": "month"}
+    before = {name: await stats(*path, **params) for name, path in paths.items()}
+    monkeypatch.setattr(get_settings(), "events_stats_from_summary", True)
+    params["include_ids"] = "false"
+    summary = {name: await stats(*path, **params) for name, path in paths.items()}
+    monkeypatch.setattr(get_settings(), "events_stats_from_summary", False)
+
+    base = {"description": "Event description", "tags": ["series"]}
+    series = {
+        **base,
+        "title": "Weekly",
+        "date": "2036-02-25T09:00:00",
+        "location": "Series",
+        "rrule": "FREQ=WEEKLY;COUNT=6",
+        "exdates": ["2036-03-10T09:00:00"],
+        "overrides": {
+            "2036-03-17T09:00:00": {"location": "Elsewhere", "tags": ["moved"]}
+        },
+    }
+    single = {**base, "title": "Once", "date": "2036-03-05T10:00:00"}
+    single["location"] = "Series"
+    response = await client.post(
+        "/event/bulk/new", json=[series, single], headers=headers
+    )
+    series_id, single_id = [item["id"] for item in response.json()]
+
+    # Every occurrence in the window counts, the moved one under its override.
+    expected = {
+        "buckets": {"2036-02-01T00:00:00": 1, "2036-03-01T00:00:00": 5},
+        "locations": {"Elsewhere": 1, "Series": 5},
+        "tags": {"moved": 1, "series": 5},
+    }
+    params = {"unit": "month"}
+    for name, path in paths.items():
+        after = await stats(*path, **params)
+        assert added(before[name], after) == expected[name]
+    after = await stats(*paths["locations"])
+    assert {series_id, single_id} <= set(after["Series"][1])
+    assert series_id in after["Elsewhere"][1]
+    assert single_id not in after["Elsewhere"][1]
+
+    # The summaries hold the single event only and the series is added on top.
+    monkeypatch.setattr(get_settings(), "events_stats_from_summary", True)
+    params["include_ids"] = "false"
+    for name, path in paths.items():
+        after = await stats(*path, **params)
+        assert added(summary[name], after) == expected[name]
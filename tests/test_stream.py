@@ -0,0 +1,135 @@
+import asyncio
+import json
+import signal
+import httpx
+import pytest
+import uvicorn
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from auth.authenticate import authenticate_with_query_token
+from auth.jwt_handler import create_access_token
+from config import get_settings
+from routes.events import _stream_events
+from server import Server
+from streaming.broker import Broker
+from streaming.changes import RESET, ChangeStream, get_change_stream, notify_changes
+from tests.conftest import DATABASE_URL
+
+EVENT = {
+    "title": "Streamed",
+    "date": "2045-01-01T10:00:00",
+    "description": "Event description",
+    "tags": [],
+    "location": "Stream",
+}
+
+
+@pytest.fixture
+async def headers() -> dict:
+    return {"Authorization": f"Bearer {create_access_token('testuser@server.com')}"}
+
+
+def parse_frame(frame: bytes) -> tuple[str, dict]:
+    event, data = frame.decode().strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+async def test_broker_drops_subscribers_that_fall_behind() -> None:
+    broker = Broker(queue_size=2)
+    fast, slow = broker.subscribe(), broker.subscribe()
+    for n in range(3):
+        broker.publish(n)
+        assert await fast.get() == n
+    assert len(broker) == 1
+    assert [await slow.get(), await slow.get(), await slow.get()] == [0, 1, None]
+    assert slow.missed_messages and not fast.missed_messages
+
+    broker.close()
+    assert await fast.get() is None
+    assert not fast.missed_messages
+
+
+async def test_change_stream_listens_for_notifications(
+    client: httpx.AsyncClient, headers: dict
+) -> None:
+    stream = ChangeStream(Broker(queue_size=1000), DATABASE_URL)
+    subscription = stream.subscribe()
+    try:
+        await asyncio.wait_for(stream.listening.wait(), 5)
+        response = await client.post("/event/new", json=EVENT, headers=headers)
+        assert response.status_code == 200
+        response = await client.post(
+            "/event/bulk/new", json=[EVENT] * 300, headers=headers
+        )
+        frames = [
+            parse_frame(await asyncio.wait_for(subscription.get(), 5))
+            for _ in range(301)
+        ]
+    finally:
+        await stream.close()
+    assert {topic for topic, _ in frames} == {"event.created"}
+    ids = [payload["id"] for _, payload in frames]
+    assert ids[1:] == [item["id"] for item in response.json()]
+    assert await subscription.get() is None
+
+
+async def test_local_stream_publishes_committed_changes(
+    client: httpx.AsyncClient,
+    headers: dict,
+    test_session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_settings(), "event_stream_backend", "local")
+    get_change_stream.cache_clear()
+    stream = get_change_stream()
+    frames = _stream_events(stream, heartbeat=0.05)
+    try:
+        assert await anext(frames) == b": keepalive\n\n"
+        await test_session.execute(text("SELECT 1"))
+        await notify_changes(test_session, "event.deleted", [{"id": 0}])
+        await test_session.rollback()
+        response = await client.post("/event/new", json=EVENT, headers=headers)
+        assert response.status_code == 200
+        topic, payload = parse_frame(await anext(frames))
+        assert topic == "event.created"
+        assert set(payload) == {"id"}
+
+        stream.broker.drop_all()
+        assert await anext(frames) == RESET
+        with pytest.raises(StopAsyncIteration):
+            await anext(frames)
+    finally:
+        await frames.aclose()
+        get_change_stream.cache_clear()
+
+
+async def test_stream_ends_when_server_starts_shutting_down(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_settings(), "event_stream_backend", "local")
+    get_change_stream.cache_clear()
+    frames = _stream_events(get_change_stream(), heartbeat=60)
+    try:
+        waiting = asyncio.ensure_future(anext(frames))
+        await asyncio.sleep(0)
+        Server(uvicorn.Config("main:app")).handle_exit(signal.SIGTERM, None)
+        # The stream ends long before its next heartbeat.
+        assert await asyncio.wait_for(waiting, 1) == RESET
+        with pytest.raises(StopAsyncIteration):
+            await anext(frames)
+
+        later = _stream_events(get_change_stream(), heartbeat=60)
+        assert [frame async for frame in later] == [RESET]
+    finally:
+        await frames.aclose()
+        get_change_stream.cache_clear()
+
+
+async def test_stream_accepts_query_token() -> None:
+    token = create_access_token("testuser@server.com")
+    assert await authenticate_with_query_token(token, None) == "testuser@server.com"
+    assert await authenticate_with_query_token(None, token) == "testuser@server.com"
+    with pytest.raises(HTTPException) as error:
+        await authenticate_with_query_token(None, None)
+    assert error.value.status_code == 403
@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from database.maintenance import run_job
+from database.summaries import compact_summaries
+from models.events import Event
+from models.stats import EventLocationDayCount
+
+DAY = datetime(2046, 5, 4, 10)
+
+
+async def location_counts(engine: AsyncEngine) -> dict:
+    statement = (
+        select(EventLocationDayCount.location, func.sum(EventLocationDayCount.count))
+        .where(EventLocationDayCount.location.like("Swap %"))
+        .group_by(EventLocationDayCount.location)
+    )
+    async with engine.connect() as connection:
+        return dict((await connection.execute(statement)).all())
+
+
+async def test_location_swap_does_not_wait(
+    engine: AsyncEngine, test_session_maker: async_sessionmaker
+) -> None:
+    event = {"title": "Swap", "date": DAY, "description": "", "tags": []}
+    async with test_session_maker() as session:
+        statement = insert(Event).returning(Event.id)
+        rows = [
+            {**event, "location": location, "creator": "swap@server.com"}
+            for location in ("Swap A", "Swap B")
+        ]
+        first, second = (await session.scalars(statement, rows)).all()
+        await session.commit()
+
+    # Both moves touch the counts of both locations on the same day. Neither
+    # may wait for the other: with shared counter rows, two such transactions
+    # that each edit a second event deadlock.
+    async with test_session_maker() as one, test_session_maker() as two:
+        move = update(Event).where(Event.id == first).values(location="Swap B")
+        await one.execute(move)
+        move = update(Event).where(Event.id == second).values(location="Swap A")
+        await asyncio.wait_for(two.execute(move), 5)
+        await asyncio.gather(one.commit(), two.commit())
+    assert await location_counts(engine) == {"Swap A": 1, "Swap B": 1}
+
+    assert await run_job(engine, "compact_summaries", compact_summaries)
+    assert await location_counts(engine) == {"Swap A": 1, "Swap B": 1}
+    statement = select(func.count()).where(
+        EventLocationDayCount.location.like("Swap %")
+    )
+    async with engine.connect() as connection:
+        assert await connection.scalar(statement) == 2
+
+
+async def test_maintenance_job_skips_while_locked(engine: AsyncEngine) -> None:
+    runs = []
+
+    async def job(connection) -> None:
+        runs.append(await run_job(engine, "blocked", record))
+
+    async def record(connection) -> None:
+        runs.append("ran")
+
+    assert await run_job(engine, "blocked", job)
+    assert runs == [False]
@@ -0,0 +1,58 @@
+import time
+import pytest
+from fastapi import HTTPException
+from auth.jwt_handler import (
+    create_access_token,
+    get_token_cache,
+    invalidate_access_token,
+    verify_access_token,
+)
+from auth.token_cache import TokenCache
+from config import get_settings
+
+
+def test_verify_access_token_is_cached() -> None:
+    token_cache = get_token_cache()
+    token = create_access_token("cached@server.com")
+    hits = token_cache.hits
+
+    assert verify_access_token(token)["user"] == "cached@server.com"
+    assert verify_access_token(token)["user"] == "cached@server.com"
+    assert token_cache.hits == hits + 1
+
+    invalidate_access_token(token)
+    assert token_cache.get(token) is None
+
+
+def test_invalid_token_is_not_cached() -> None:
+    with pytest.raises(HTTPException):
+        verify_access_token("not-a-token")
+    assert get_token_cache().get("not-a-token") is None
+
+
+def test_token_cache_expiry_and_eviction() -> None:
+    cache = TokenCache(maxsize=2)
+    cache.set("expired", {"user": "a"}, time.time() - 1)
+    assert cache.get("expired") is None
+
+    cache.set("first", {"user": "a"}, time.time() + 60)
+    cache.set("second", {"user": "b"}, time.time() + 60)
+    cache.get("first")
+    cache.set("third", {"user": "c"}, time.time() + 60)
+    assert cache.get("second") is None
+    assert cache.get("first") == {"user": "a"}
+    assert cache.stats()["size"] == 2
+
+
+def test_token_cache_size_is_read_on_first_use(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(get_settings(), "token_cache_size", 0)
+    get_token_cache.cache_clear()
+    try:
+        token = create_access_token("uncached@server.com")
+        verify_access_token(token)
+        assert get_token_cache().get(token) is None
+        assert get_token_cache().maxsize == 0
+    finally:
+        get_token_cache.cache_clear()